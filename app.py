@@ -66,6 +66,10 @@ def create_app():
     # 👇 Inicializar Flask-Mail con la aplicación
     mail.init_app(app)
 
+    # 👇 Una conexión y una transacción de BD por request
+    from database.connection import init_app as init_db_unit_of_work
+    init_db_unit_of_work(app)
+
     # 🔥 INICIALIZACIÓN AUTOMÁTICA DE BASE DE DATOS (SOLO EN PRODUCCIÓN)
     if app.config['FLASK_ENV'] == 'production':
         with app.app_context():
@@ -131,6 +135,7 @@ def create_app():
     @app.route('/health')
     def health_check():
         from database.setup import DatabaseSetup
+        from database.connection import get_pool_stats
         setup = DatabaseSetup()
         
         db_status = "healthy" if setup.check_database_connection() else "unhealthy"
@@ -141,6 +146,7 @@ def create_app():
             'service': 'pws-backend',
             'database': db_status,
             'tables': tables_status,
+            'db_pool': get_pool_stats(),
             'environment': app.config['FLASK_ENV'],
             'timestamp': datetime.now().isoformat()
         })
@@ -161,6 +167,45 @@ def create_app():
                 'message': f'Error: {str(e)}'
             }), 500
 
+    # Comando CLI: flask rebuild-rollups
+    @app.cli.command("rebuild-rollups")
+    def rebuild_rollups_command():
+        """Recalcular las tablas de resumen diario desde el historial de ventas"""
+        from database.setup import DatabaseSetup
+        DatabaseSetup().rebuild_rollups()
+
+    # Comando CLI: flask mine-itemsets
+    @app.cli.command("mine-itemsets")
+    def mine_itemsets_command():
+        """Minar conjuntos frecuentes de productos (FP-Growth) para los bundles"""
+        from services.ml_service import refresh_frequent_itemsets
+        count = refresh_frequent_itemsets()
+        print(f"✅ {count} conjuntos frecuentes guardados")
+
+    # Comando CLI: flask backfill-demand
+    @app.cli.command("backfill-demand")
+    def backfill_demand_command():
+        """Recalcular demand_series (demanda diaria por producto) con todo el historial"""
+        from models.demand_series import DemandSeriesStore
+        count = DemandSeriesStore().backfill()
+        print(f"✅ {count} bloques de demanda guardados")
+
+    # Comando CLI: flask backtest-forecast
+    @app.cli.command("backtest-forecast")
+    def backtest_forecast_command():
+        """Medir la precisión real de la predicción de demanda (origen móvil)"""
+        from services.forecast_service import run_backtest
+        count = run_backtest()
+        print(f"✅ Precisión calculada para {count} productos")
+
+    # Comando CLI: flask rebuild-similarity
+    @app.cli.command("rebuild-similarity")
+    def rebuild_similarity_command():
+        """Recalcular los productos similares por contenido (TF-IDF)"""
+        from services.ml_service import rebuild_content_similarity
+        count = rebuild_content_similarity()
+        print(f"✅ Similitud calculada para {count} productos")
+
     # Manejo de errores global
     @app.errorhandler(404)
     def not_found(error):
@@ -0,0 +1,70 @@
+"""
+Benchmark del conteo de pares: bucle anidado con Counter (implementación
+anterior de get_frequently_bought_together) contra BasketMatrix.
+
+    python -m benchmarks.basket_engine --baskets 1000000 --products 50000
+"""
+import argparse
+import resource
+import time
+from collections import Counter, defaultdict
+import numpy as np
+from models.basket_engine import BasketMatrix, pair_statistics
+
+
+def synthetic_sales(n_baskets, n_products, max_items, seed=0):
+    """Filas (venta, producto) con popularidad tipo Zipf"""
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(1, max_items + 1, n_baskets)
+    baskets = np.repeat(np.arange(n_baskets), sizes)
+    weights = 1.0 / np.arange(1, n_products + 1) ** 1.1
+    products = rng.choice(n_products, baskets.size, p=weights / weights.sum())
+    return baskets, products
+
+
+def counter_pairs(baskets, products):
+    """Conteo par a par como lo hacía get_frequently_bought_together"""
+    transaction_products = defaultdict(list)
+    for sale_id, product_id in zip(baskets.tolist(), products.tolist()):
+        transaction_products[sale_id].append(product_id)
+
+    product_pairs = Counter()
+    for items in transaction_products.values():
+        items = list(set(items))
+        for i in range(len(items)):
+            for j in range(i + 1, len(items)):
+                product_pairs[tuple(sorted([items[i], items[j]]))] += 1
+    return product_pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--baskets", type=int, default=1_000_000)
+    parser.add_argument("--products", type=int, default=50_000)
+    parser.add_argument("--max-items", type=int, default=7)
+    parser.add_argument("--chunk", type=int, default=200_000, help="Canastas por bloque")
+    parser.add_argument("--skip-counter", action="store_true", help="No medir la implementación anterior")
+    args = parser.parse_args()
+
+    baskets, products = synthetic_sales(args.baskets, args.products, args.max_items)
+    print(f"{args.baskets} canastas, {args.products} productos, {baskets.size} líneas")
+
+    start = time.perf_counter()
+    matrix = BasketMatrix.from_rows(baskets, products)
+    built = time.perf_counter()
+    stats = pair_statistics(matrix, chunk_baskets=args.chunk)
+    done = time.perf_counter()
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"BasketMatrix: matriz {built - start:.2f}s, pares {done - built:.2f}s, "
+          f"{len(stats)} pares, pico {peak_mb:.0f} MB")
+
+    if not args.skip_counter:
+        start = time.perf_counter()
+        pairs = counter_pairs(baskets, products)
+        elapsed = time.perf_counter() - start
+        print(f"Counter: {elapsed:.2f}s, {len(pairs)} pares")
+        assert len(pairs) == len(stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 import urllib.parse
 from dotenv import load_dotenv
 
@@ -34,6 +35,74 @@ class Config:
     
     # 🔥 AGREGAR PARA COMPATIBILIDAD CON CÓDIGO EXISTENTE
     DATABASE = get_database_config.__func__()
+
+    # Pool de conexiones (uno por worker de gunicorn)
+    DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 1))
+    DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 10))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))
+    DB_POOL_PING_INTERVAL = float(os.getenv("DB_POOL_PING_INTERVAL", 30))
+
+    # Zonas horarias: en la que se guardan los TIMESTAMP y la de la tienda (días de reportes)
+    DB_TIMEZONE = os.getenv("DB_TIMEZONE", "UTC")
+    STORE_TIMEZONE = os.getenv("STORE_TIMEZONE", "UTC")
+
+    # Hilos para las consultas paralelas de /reports/dashboard (se limita a DB_POOL_MAX_SIZE - 1)
+    REPORTS_DASHBOARD_WORKERS = int(os.getenv("REPORTS_DASHBOARD_WORKERS", 4))
+
+    # "Comprados juntos" (product_pairs): ventana en días (0 = todo el historial)
+    # y vida media en días para dar más peso a pares recientes (0 = sin decaimiento)
+    RECO_PAIR_WINDOW_DAYS = int(os.getenv("RECO_PAIR_WINDOW_DAYS", 0))
+    RECO_PAIR_HALF_LIFE_DAYS = float(os.getenv("RECO_PAIR_HALF_LIFE_DAYS", 0))
+
+    # Bundles (FP-Growth): soporte mínimo como fracción de canastas, tamaño
+    # máximo de los conjuntos y días de historial analizados
+    FP_MIN_SUPPORT = float(os.getenv("FP_MIN_SUPPORT", 0.001))
+    FP_MAX_LENGTH = int(os.getenv("FP_MAX_LENGTH", 4))
+    FP_WINDOW_DAYS = int(os.getenv("FP_WINDOW_DAYS", 180))
+
+    # Instantánea de /ml/recommendations: antigüedad máxima antes de recalcular
+    # y cada cuánto se revisa si cambiaron los datos (0 = sin revisión periódica)
+    RECO_SNAPSHOT_REFRESH_SECONDS = int(os.getenv("RECO_SNAPSHOT_REFRESH_SECONDS", 900))
+    RECO_SNAPSHOT_CHECK_SECONDS = int(os.getenv("RECO_SNAPSHOT_CHECK_SECONDS", 30))
+
+    # Índice de vecinos en disco (mmap) compartido por los workers y vecinos por producto
+    RECO_INDEX_PATH = os.getenv("RECO_INDEX_PATH", os.path.join(tempfile.gettempdir(), "pos_reco_neighbors.bin"))
+    RECO_INDEX_NEIGHBORS = int(os.getenv("RECO_INDEX_NEIGHBORS", 20))
+
+    # Productos similares por contenido: vecinos guardados por producto y
+    # productos por bloque al calcular la similitud (memoria ≈ bloque × catálogo)
+    RECO_SIMILAR_K = int(os.getenv("RECO_SIMILAR_K", 10))
+    RECO_SIMILAR_BATCH = int(os.getenv("RECO_SIMILAR_BATCH", 128))
+
+    # Upsell: aumento máximo de precio sobre el original (0.5 = hasta 50% más caro),
+    # niveles de marca por categoría y marcas mínimas para separarlos
+    UPSELL_MAX_PRICE_STEP = float(os.getenv("UPSELL_MAX_PRICE_STEP", 0.5))
+    UPSELL_BRAND_TIERS = int(os.getenv("UPSELL_BRAND_TIERS", 3))
+    UPSELL_MIN_BRANDS = int(os.getenv("UPSELL_MIN_BRANDS", 3))
+
+    # Predicción de demanda (Holt-Winters): días de historial y nivel de
+    # confianza de los intervalos (0.8, 0.9, 0.95 o 0.99)
+    FORECAST_HISTORY_DAYS = int(os.getenv("FORECAST_HISTORY_DAYS", 182))
+    FORECAST_INTERVAL_LEVEL = float(os.getenv("FORECAST_INTERVAL_LEVEL", 0.9))
+
+    # Ajuste en paralelo por fragmentos (categoría y tramos de productos):
+    # procesos (0 = todos los núcleos), productos por fragmento y mínimo de
+    # productos para usar el pool (con menos se ajusta en el proceso web)
+    FORECAST_WORKERS = int(os.getenv("FORECAST_WORKERS", 0))
+    FORECAST_SHARD_ROWS = int(os.getenv("FORECAST_SHARD_ROWS", 5000))
+    FORECAST_PARALLEL_MIN_SERIES = int(os.getenv("FORECAST_PARALLEL_MIN_SERIES", 2000))
+
+    # demand_series: días ya cerrados que se recalculan en cada cierre (ventas corregidas tarde)
+    DEMAND_SERIES_RESYNC_DAYS = int(os.getenv("DEMAND_SERIES_RESYNC_DAYS", 3))
+
+    # Backtesting con origen móvil: días predichos por pliegue, cantidad de
+    # pliegues y días entre orígenes
+    FORECAST_BACKTEST_HORIZON = int(os.getenv("FORECAST_BACKTEST_HORIZON", 7))
+    FORECAST_BACKTEST_FOLDS = int(os.getenv("FORECAST_BACKTEST_FOLDS", 8))
+    FORECAST_BACKTEST_STEP = int(os.getenv("FORECAST_BACKTEST_STEP", 7))
+
+    # Exportaciones en streaming: filas leídas del cursor por lote
+    EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 2000))
     
     # Seguridad
     SECRET_KEY = os.getenv("SECRET_KEY", "fallback-secret-key-for-development-only")
@@ -0,0 +1,324 @@
+import os
+import threading
+import time
+import logging
+import uuid
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import pool as pg_pool
+from flask import g, has_app_context, has_request_context, current_app, jsonify
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class ManagedConnectionPool(pg_pool.ThreadedConnectionPool):
+    """Pool de conexiones con espera acotada, health check y estadísticas"""
+
+    def __init__(self, minconn, maxconn, timeout=10.0, ping_interval=30.0, **kwargs):
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self.stats = {
+            "created": 0,
+            "checkouts": 0,
+            "discarded": 0,
+            "wait_timeouts": 0
+        }
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._last_used = {}
+        super().__init__(minconn, maxconn, **kwargs)
+
+    def _connect(self, key=None):
+        conn = super()._connect(key)
+        self.stats["created"] += 1
+        return conn
+
+    def _is_healthy(self, conn):
+        """Verifica la conexión: cerrada, o inactiva demasiado tiempo → ping"""
+        if conn.closed:
+            return False
+
+        idle_since = self._last_used.get(id(conn))
+        if idle_since is None or time.monotonic() - idle_since < self.ping_interval:
+            return True
+
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            return True
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            return False
+
+    def checkout(self):
+        """Obtener una conexión sana del pool (espera hasta `timeout` segundos)"""
+        if not self._slots.acquire(timeout=self.timeout):
+            self.stats["wait_timeouts"] += 1
+            raise pg_pool.PoolError("connection pool exhausted")
+
+        try:
+            conn = self.getconn()
+            # La reemplazante también se revisa; el ciclo termina porque cada
+            # descarte saca una inactiva y, sin inactivas, se abre una nueva
+            while not self._is_healthy(conn):
+                logger.warning("Conexión inválida descartada del pool")
+                self.stats["discarded"] += 1
+                self._last_used.pop(id(conn), None)
+                self.putconn(conn, close=True)
+                conn = self.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+        self.stats["checkouts"] += 1
+        return conn
+
+    def release(self, conn, close=False):
+        """Devolver una conexión al pool"""
+        try:
+            self.putconn(conn, close=close)
+            if conn.closed:
+                self._last_used.pop(id(conn), None)
+            else:
+                self._last_used[id(conn)] = time.monotonic()
+        finally:
+            self._slots.release()
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                **self.stats,
+                "min_size": self.minconn,
+                "max_size": self.maxconn,
+                "in_use": len(self._used),
+                "idle": len(self._pool),
+                "pid": os.getpid()
+            }
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Devuelve el pool del proceso actual, creándolo bajo demanda.
+
+    Cada worker de gunicorn tiene su propio pool: si el proceso cambió
+    (fork) se crea uno nuevo en lugar de heredar sockets del padre.
+    """
+    global _pool, _pool_pid
+
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            _pool = ManagedConnectionPool(
+                Config.DB_POOL_MIN_SIZE,
+                Config.DB_POOL_MAX_SIZE,
+                timeout=Config.DB_POOL_TIMEOUT,
+                ping_interval=Config.DB_POOL_PING_INTERVAL,
+                **Config.DATABASE
+            )
+            _pool_pid = pid
+            logger.info(
+                f"Pool de conexiones creado (min={Config.DB_POOL_MIN_SIZE}, "
+                f"max={Config.DB_POOL_MAX_SIZE}, pid={pid})"
+            )
+    return _pool
+
+
+def get_connection():
+    """Obtener una conexión del pool"""
+    return get_pool().checkout()
+
+
+def release_connection(conn, close=False):
+    """Devolver una conexión al pool"""
+    get_pool().release(conn, close=close)
+
+
+# ---------- UNIDAD DE TRABAJO POR REQUEST ----------
+
+def _unit_of_work_enabled():
+    return (
+        has_request_context()
+        and has_app_context()
+        and current_app.extensions.get("db_unit_of_work", False)
+    )
+
+
+def _get_request_connection():
+    """Conexión de la request actual; se toma del pool en el primer uso"""
+    if "_db_conn" not in g:
+        g._db_conn = get_connection()
+        g._db_failed = False
+    return g._db_conn
+
+
+def _run_callback(callback):
+    try:
+        callback()
+    except Exception:
+        logger.exception("Error en tarea posterior al commit")
+
+
+def _finish_unit_of_work(commit):
+    """Confirma o revierte la transacción de la request y libera la conexión"""
+    conn = g.pop("_db_conn", None)
+    failed = g.pop("_db_failed", False)
+    callbacks = g.pop("_db_after_commit", [])
+    if conn is None:
+        return
+
+    committed = False
+    try:
+        if commit and not failed:
+            conn.commit()
+            committed = True
+        else:
+            conn.rollback()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        release_connection(conn)
+
+    if committed:
+        for callback in callbacks:
+            threading.Thread(target=_run_callback, args=(callback,), daemon=True).start()
+
+
+def run_after_commit(callback):
+    """Ejecutar `callback` cuando la transacción de la request quede confirmada.
+
+    Corre en un hilo propio (con sus propias conexiones) después del commit,
+    así ve los datos ya escritos y no retrasa la respuesta; si la request se
+    revierte no se ejecuta. Fuera de una request se ejecuta de inmediato.
+    """
+    if not _unit_of_work_enabled():
+        _run_callback(callback)
+        return
+    g.setdefault("_db_after_commit", []).append(callback)
+
+
+def init_app(app):
+    """Registra la unidad de trabajo: una conexión y una transacción por request.
+
+    Los modelos reutilizan la conexión de `g` y no confirman por su cuenta;
+    la transacción se confirma una sola vez al final de la request, o se
+    revierte si hubo un error de base de datos o la respuesta es 5xx.
+    """
+    app.extensions["db_unit_of_work"] = True
+
+    @app.after_request
+    def _commit_unit_of_work(response):
+        if "_db_conn" not in g:
+            return response
+        try:
+            _finish_unit_of_work(commit=response.status_code < 500)
+        except Exception as e:
+            logger.error(f"Error confirmando la transacción de la request: {e}")
+            response = jsonify({"error": "Error interno del servidor"})
+            response.status_code = 500
+        return response
+
+    @app.teardown_request
+    def _rollback_unit_of_work(exc):
+        # Solo queda conexión si after_request no se ejecutó (excepción no manejada)
+        if "_db_conn" in g:
+            _finish_unit_of_work(commit=False)
+
+
+@contextmanager
+def get_cursor(commit=False, own_connection=False):
+    """Cursor sobre una conexión del pool.
+
+    Dentro de una request usa la conexión de la unidad de trabajo y el
+    commit se difiere al final de la request. Fuera de ella, o con
+    `own_connection=True` (transacciones cortas que no deben esperar a la
+    request, p. ej. mantenimiento con locks), toma una conexión propia:
+    hace rollback si ocurre un error, confirma al salir si `commit=True` y
+    siempre devuelve la conexión al pool.
+    """
+    if not own_connection and _unit_of_work_enabled():
+        cur = _get_request_connection().cursor()
+        try:
+            yield cur
+        except Exception:
+            g._db_failed = True
+            raise
+        finally:
+            cur.close()
+        return
+
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        yield cur
+        if commit:
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        release_connection(conn)
+
+
+def stream_query(query, params=None, batch_size=None):
+    """Itera el resultado de `query` en lotes de `batch_size` filas.
+
+    Usa un cursor con nombre (del lado del servidor), así la memoria no
+    crece con el tamaño del resultado. Toma una conexión propia del pool
+    y no la de la unidad de trabajo: el generador se consume al enviar la
+    respuesta, cuando la request ya terminó. La conexión se libera al
+    agotarse el generador o al cerrarse (p. ej. si el cliente se desconecta).
+    """
+    batch_size = batch_size or Config.EXPORT_BATCH_SIZE
+    conn = get_connection()
+    broken = False
+    try:
+        cur = conn.cursor(name=f"stream_{uuid.uuid4().hex}")
+        cur.itersize = batch_size
+        try:
+            cur.execute(query, params)
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cur.close()
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
+    finally:
+        # Solo lectura: se cierra la transacción abierta por el cursor con nombre
+        try:
+            if not broken:
+                conn.rollback()
+        except psycopg2.Error:
+            broken = True
+        release_connection(conn, close=broken)
+
+
+def get_pool_stats():
+    """Estadísticas del pool del proceso actual"""
+    if _pool is None or _pool_pid != os.getpid():
+        return {"initialized": False}
+    return {"initialized": True, **_pool.get_stats()}
+
+
+def close_pool():
+    """Cerrar todas las conexiones del pool (tests, apagado del worker)"""
+    global _pool, _pool_pid
+
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid() and not _pool.closed:
+            _pool.closeall()
+        _pool = None
+        _pool_pid = None
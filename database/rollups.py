@@ -0,0 +1,713 @@
+"""
+Resúmenes mantenidos por triggers.
+
+Totales por venta (columnas de sales):
+- item_count, units, total: renglones, unidades y suma de subtotales de
+  sale_details; se recalculan en la misma transacción que modifica los detalles.
+
+Co-ocurrencia de productos (product_pairs):
+- (product_a < product_b) → canastas que contienen ambos y última venta en
+  que aparecieron juntos; base de "comprados juntos" con todo el historial.
+
+Tablas de resumen diario para los reportes:
+
+- sales_daily:          día → transacciones, ingreso (sales.total) y renglones vendidos
+- sales_daily_product:  día × producto → unidades e ingreso (sale_details.subtotal)
+- sales_daily_category: día × categoría → unidades e ingreso
+- sales_total_product:  producto → unidades e ingreso de todo el historial
+- sales_total_category: categoría → unidades e ingreso de todo el historial
+
+Se mantienen de forma incremental con triggers en la misma transacción que
+escribe en sales, sale_details o products, así cualquier escritura (modelos,
+datos de ejemplo, SQL manual) queda reflejada. rebuild_rollups() recalcula
+todo desde cero para cargar el historial existente.
+
+Los días son días de la tienda: store_day(ts) convierte de DB_TIMEZONE a
+STORE_TIMEZONE con la configuración incrustada en la definición; si cambia
+se redefine y se recalcula todo. Los reportes filtran por día sobre los
+resúmenes, así que sales no se indexa por store_day(date).
+"""
+from config import Config
+from utils.store_time import validate_timezone
+
+UNCATEGORIZED = "Sin categoría"
+
+ROLLUP_TABLES = [
+    "sales_daily", "sales_daily_product", "sales_daily_category", "sales_total_product",
+    "sales_total_category", "product_pairs", "frequent_itemsets",
+    "product_similarity", "forecast_accuracy", "forecast_results", "demand_series", "demand_series_state",
+    "data_version"
+]
+
+STORE_DAY_SQL = """
+    CREATE OR REPLACE FUNCTION store_day_config() RETURNS text AS $$
+        SELECT '{db_tz}>{store_tz}'::text
+    $$ LANGUAGE sql IMMUTABLE;
+
+    CREATE OR REPLACE FUNCTION store_day(ts TIMESTAMP) RETURNS DATE AS $$
+        SELECT ((ts AT TIME ZONE '{db_tz}') AT TIME ZONE '{store_tz}')::date
+    $$ LANGUAGE sql IMMUTABLE;
+
+    -- Sin lectores: solo encarecía cada escritura en sales
+    DROP INDEX IF EXISTS idx_sales_store_day;
+"""
+
+SALE_TOTALS_SQL = """
+    CREATE OR REPLACE FUNCTION sale_totals_refresh(p_sale_id INTEGER) RETURNS void AS $$
+        UPDATE sales s
+        SET item_count = t.item_count, units = t.units, total = t.total
+        FROM (
+            SELECT COUNT(*) AS item_count,
+                   COALESCE(SUM(quantity), 0) AS units,
+                   COALESCE(SUM(subtotal), 0) AS total
+            FROM sale_details
+            WHERE sale_id = p_sale_id
+        ) t
+        WHERE s.sale_id = p_sale_id
+          AND (s.item_count, s.units, s.total) IS DISTINCT FROM (t.item_count, t.units, t.total);
+    $$ LANGUAGE sql;
+
+    CREATE OR REPLACE FUNCTION sale_details_totals_trg() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM sale_totals_refresh(OLD.sale_id);
+        END IF;
+        IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.sale_id <> OLD.sale_id) THEN
+            PERFORM sale_totals_refresh(NEW.sale_id);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS trg_sale_details_totals ON sale_details;
+    CREATE TRIGGER trg_sale_details_totals
+        AFTER INSERT OR UPDATE OR DELETE ON sale_details
+        FOR EACH ROW EXECUTE FUNCTION sale_details_totals_trg();
+"""
+
+BACKFILL_SALE_TOTALS_SQL = """
+    UPDATE sales s
+    SET item_count = t.item_count, units = t.units, total = t.total
+    FROM (
+        SELECT sale_id, COUNT(*) AS item_count, SUM(quantity) AS units, SUM(subtotal) AS total
+        FROM sale_details
+        GROUP BY sale_id
+    ) t
+    WHERE s.sale_id = t.sale_id
+      AND (s.item_count, s.units, s.total) IS DISTINCT FROM (t.item_count, t.units, t.total)
+"""
+
+PRODUCT_PAIRS_SQL = """
+    CREATE TABLE IF NOT EXISTS product_pairs (
+        product_a INTEGER NOT NULL,
+        product_b INTEGER NOT NULL,
+        pair_count INTEGER NOT NULL DEFAULT 0,
+        last_seen TIMESTAMP,
+        PRIMARY KEY (product_a, product_b),
+        CHECK (product_a < product_b)
+    );
+    CREATE INDEX IF NOT EXISTS idx_product_pairs_b ON product_pairs(product_b);
+    CREATE INDEX IF NOT EXISTS idx_product_pairs_count ON product_pairs(pair_count DESC);
+
+    -- Aplica la diferencia de pares entre la canasta antes y después del cambio.
+    -- Cuenta canastas, no renglones: repetir un producto en la venta no suma.
+    -- Recibe los renglones como JSON [{detail_id, sale_id, product_id}].
+    CREATE OR REPLACE FUNCTION product_pairs_sync(p_old JSONB, p_new JSONB) RETURNS void AS $$
+        WITH old_rows AS (
+            SELECT * FROM jsonb_to_recordset(p_old) AS x(detail_id INTEGER, sale_id INTEGER, product_id INTEGER)
+        ),
+        new_rows AS (
+            SELECT * FROM jsonb_to_recordset(p_new) AS x(detail_id INTEGER, sale_id INTEGER, product_id INTEGER)
+        ),
+        affected AS (
+            SELECT sale_id FROM old_rows UNION SELECT sale_id FROM new_rows
+        ),
+        after_basket AS (
+            SELECT DISTINCT sale_id, product_id
+            FROM sale_details
+            WHERE sale_id IN (SELECT sale_id FROM affected)
+        ),
+        before_basket AS (
+            SELECT DISTINCT sale_id, product_id FROM (
+                SELECT sale_id, product_id
+                FROM sale_details
+                WHERE sale_id IN (SELECT sale_id FROM affected)
+                  AND detail_id NOT IN (SELECT detail_id FROM new_rows)
+                UNION ALL
+                SELECT sale_id, product_id FROM old_rows
+            ) b
+        ),
+        delta AS (
+            SELECT a.product_id AS pa, b.product_id AS pb, a.sale_id, 1 AS d
+            FROM after_basket a
+            JOIN after_basket b ON b.sale_id = a.sale_id AND a.product_id < b.product_id
+            UNION ALL
+            SELECT a.product_id, b.product_id, a.sale_id, -1
+            FROM before_basket a
+            JOIN before_basket b ON b.sale_id = a.sale_id AND a.product_id < b.product_id
+        ),
+        changes AS (
+            SELECT d.pa, d.pb, SUM(d.d) AS n, MAX(s.date) FILTER (WHERE d.d > 0) AS seen
+            FROM delta d
+            LEFT JOIN sales s ON s.sale_id = d.sale_id
+            GROUP BY d.pa, d.pb
+            HAVING SUM(d.d) <> 0
+        )
+        INSERT INTO product_pairs AS p (product_a, product_b, pair_count, last_seen)
+        SELECT pa, pb, n, seen FROM changes
+        ON CONFLICT (product_a, product_b) DO UPDATE
+        SET pair_count = p.pair_count + EXCLUDED.pair_count,
+            last_seen = GREATEST(p.last_seen, EXCLUDED.last_seen);
+    $$ LANGUAGE sql;
+
+    -- Triggers por sentencia: un INSERT de varios renglones se procesa junto
+    CREATE OR REPLACE FUNCTION product_pairs_insert_trg() RETURNS trigger AS $$
+    BEGIN
+        PERFORM product_pairs_sync(
+            '[]'::jsonb,
+            (SELECT COALESCE(jsonb_agg(jsonb_build_object(
+                'detail_id', detail_id, 'sale_id', sale_id, 'product_id', product_id)), '[]')
+             FROM new_rows)
+        );
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION product_pairs_update_trg() RETURNS trigger AS $$
+    BEGIN
+        PERFORM product_pairs_sync(
+            (SELECT COALESCE(jsonb_agg(jsonb_build_object(
+                'detail_id', detail_id, 'sale_id', sale_id, 'product_id', product_id)), '[]')
+             FROM old_rows),
+            (SELECT COALESCE(jsonb_agg(jsonb_build_object(
+                'detail_id', detail_id, 'sale_id', sale_id, 'product_id', product_id)), '[]')
+             FROM new_rows)
+        );
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION product_pairs_delete_trg() RETURNS trigger AS $$
+    BEGIN
+        PERFORM product_pairs_sync(
+            (SELECT COALESCE(jsonb_agg(jsonb_build_object(
+                'detail_id', detail_id, 'sale_id', sale_id, 'product_id', product_id)), '[]')
+             FROM old_rows),
+            '[]'::jsonb
+        );
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS trg_product_pairs_insert ON sale_details;
+    CREATE TRIGGER trg_product_pairs_insert
+        AFTER INSERT ON sale_details
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION product_pairs_insert_trg();
+
+    DROP TRIGGER IF EXISTS trg_product_pairs_update ON sale_details;
+    CREATE TRIGGER trg_product_pairs_update
+        AFTER UPDATE ON sale_details
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION product_pairs_update_trg();
+
+    DROP TRIGGER IF EXISTS trg_product_pairs_delete ON sale_details;
+    CREATE TRIGGER trg_product_pairs_delete
+        AFTER DELETE ON sale_details
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION product_pairs_delete_trg();
+"""
+
+REBUILD_PAIRS_SQL = """
+    LOCK TABLE sale_details IN SHARE MODE;
+    TRUNCATE product_pairs;
+
+    INSERT INTO product_pairs (product_a, product_b, pair_count, last_seen)
+    SELECT a.product_id, b.product_id, COUNT(*), MAX(s.date)
+    FROM (SELECT DISTINCT sale_id, product_id FROM sale_details) a
+    JOIN (SELECT DISTINCT sale_id, product_id FROM sale_details) b
+      ON b.sale_id = a.sale_id AND a.product_id < b.product_id
+    JOIN sales s ON s.sale_id = a.sale_id
+    GROUP BY a.product_id, b.product_id;
+"""
+
+FREQUENT_ITEMSETS_SQL = """
+    CREATE TABLE IF NOT EXISTS frequent_itemsets (
+        items INTEGER[] PRIMARY KEY,
+        size SMALLINT NOT NULL,
+        support_count INTEGER NOT NULL,
+        support DOUBLE PRECISION NOT NULL,
+        mined_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX IF NOT EXISTS idx_frequent_itemsets_size
+        ON frequent_itemsets(size, support_count DESC);
+"""
+
+PRODUCT_SIMILARITY_SQL = """
+    CREATE TABLE IF NOT EXISTS product_similarity (
+        product_id INTEGER NOT NULL,
+        similar_id INTEGER NOT NULL,
+        score REAL NOT NULL,
+        PRIMARY KEY (product_id, similar_id)
+    );
+    CREATE INDEX IF NOT EXISTS idx_product_similarity_score
+        ON product_similarity(product_id, score DESC);
+    CREATE INDEX IF NOT EXISTS idx_product_similarity_similar
+        ON product_similarity(similar_id);
+"""
+
+FORECAST_ACCURACY_SQL = """
+    CREATE TABLE IF NOT EXISTS forecast_accuracy (
+        product_id INTEGER PRIMARY KEY,
+        category VARCHAR(50) NOT NULL,
+        horizon SMALLINT NOT NULL,
+        folds SMALLINT NOT NULL,
+        abs_error DOUBLE PRECISION NOT NULL,
+        actual DOUBLE PRECISION NOT NULL,
+        forecast DOUBLE PRECISION NOT NULL,
+        ape_sum DOUBLE PRECISION NOT NULL,
+        ape_count INTEGER NOT NULL,
+        sape_sum DOUBLE PRECISION NOT NULL,
+        sape_count INTEGER NOT NULL,
+        evaluated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX IF NOT EXISTS idx_forecast_accuracy_category ON forecast_accuracy(category);
+"""
+
+# Último resultado de /ml/forecast por período, compartido por los workers:
+# vale mientras coincidan la versión 'forecast' de data_version y el día
+FORECAST_RESULTS_SQL = """
+    CREATE TABLE IF NOT EXISTS forecast_results (
+        period VARCHAR(10) PRIMARY KEY,
+        version BIGINT,
+        day DATE,
+        data JSONB NOT NULL,
+        built_at TIMESTAMPTZ NOT NULL,
+        build_seconds DOUBLE PRECISION NOT NULL
+    );
+"""
+
+# Demanda diaria por producto en bloques de 28 días (units[1] = block_start):
+# cerrada día a día desde sales_daily_product, se lee con un rango por block_start
+DEMAND_SERIES_SQL = """
+    CREATE TABLE IF NOT EXISTS demand_series (
+        block_start DATE NOT NULL,
+        product_id INTEGER NOT NULL,
+        units INTEGER[] NOT NULL,
+        PRIMARY KEY (block_start, product_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS demand_series_state (
+        id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+        closed_through DATE NOT NULL
+    );
+"""
+
+# Versiones de datos para invalidar cachés (p. ej. la de /ml/forecast): una
+# fila por nombre. La suben triggers diferidos, una sola vez por transacción
+# y al confirmarla (la marca local evita repetir el UPDATE), así la fila
+# solo queda bloqueada mientras se hace el commit y no durante toda la venta
+DATA_VERSION_SQL = """
+    CREATE TABLE IF NOT EXISTS data_version (
+        name VARCHAR(30) PRIMARY KEY,
+        version BIGINT NOT NULL DEFAULT 0,
+        changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE OR REPLACE FUNCTION data_version_trg() RETURNS trigger AS $$
+    DECLARE
+        v_flag TEXT := 'data_version.' || TG_ARGV[0];
+    BEGIN
+        IF COALESCE(current_setting(v_flag, true), '') = 'on' THEN
+            RETURN NULL;
+        END IF;
+        PERFORM set_config(v_flag, 'on', true);
+        UPDATE data_version SET version = version + 1, changed_at = CURRENT_TIMESTAMP
+        WHERE name = TG_ARGV[0];
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    -- Reemplazada por data_version: sus triggers subían la fila en cada sentencia
+    DROP TABLE IF EXISTS forecast_version;
+    DROP FUNCTION IF EXISTS forecast_version_trg() CASCADE;
+"""
+
+DATA_VERSION_TRIGGER_SQL = """
+    INSERT INTO data_version (name) VALUES ('{name}') ON CONFLICT (name) DO NOTHING;
+
+    DROP TRIGGER IF EXISTS trg_{table}_{name}_version ON {table};
+    CREATE CONSTRAINT TRIGGER trg_{table}_{name}_version
+        AFTER {events} ON {table}
+        DEFERRABLE INITIALLY DEFERRED
+        FOR EACH ROW EXECUTE FUNCTION data_version_trg('{name}');
+
+    DROP TRIGGER IF EXISTS trg_{table}_{name}_version_truncate ON {table};
+    CREATE TRIGGER trg_{table}_{name}_version_truncate
+        AFTER TRUNCATE ON {table}
+        FOR EACH STATEMENT EXECUTE FUNCTION data_version_trg('{name}');
+"""
+
+# Nombre de versión → (tabla, eventos que la suben)
+DATA_VERSIONS = {
+    # Entradas de la predicción de demanda y de su respuesta
+    "forecast": [
+        ("sale_details", "INSERT OR UPDATE OR DELETE"),
+        ("sales", "UPDATE OF date OR DELETE"),
+        ("movements", "INSERT OR UPDATE OR DELETE"),
+        ("products", "INSERT OR UPDATE OR DELETE"),
+        ("forecast_accuracy", "INSERT OR UPDATE OR DELETE")
+    ],
+    # Ventas que alimentan pares, vecinos e itemsets de las recomendaciones
+    "sales": [
+        ("sale_details", "INSERT OR UPDATE OR DELETE"),
+        ("sales", "UPDATE OF date OR DELETE")
+    ],
+    # Resto de la instantánea de recomendaciones: catálogo y resultados minados
+    "recommendations": [
+        ("products", "INSERT OR UPDATE OR DELETE"),
+        ("frequent_itemsets", "INSERT OR UPDATE OR DELETE"),
+        ("product_similarity", "INSERT OR UPDATE OR DELETE")
+    ]
+}
+
+ROLLUP_SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS sales_daily (
+        day DATE PRIMARY KEY,
+        transactions INTEGER NOT NULL DEFAULT 0,
+        revenue NUMERIC(14,2) NOT NULL DEFAULT 0,
+        items INTEGER NOT NULL DEFAULT 0
+    );
+
+    CREATE TABLE IF NOT EXISTS sales_daily_product (
+        day DATE NOT NULL,
+        product_id INTEGER NOT NULL,
+        units INTEGER NOT NULL DEFAULT 0,
+        revenue NUMERIC(14,2) NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, product_id)
+    );
+    CREATE INDEX IF NOT EXISTS idx_sales_daily_product_product ON sales_daily_product(product_id);
+
+    CREATE TABLE IF NOT EXISTS sales_daily_category (
+        day DATE NOT NULL,
+        category VARCHAR(50) NOT NULL,
+        units INTEGER NOT NULL DEFAULT 0,
+        revenue NUMERIC(14,2) NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, category)
+    );
+
+    -- Totales de todo el historial: los reportes sin rango no suman los días
+    CREATE TABLE IF NOT EXISTS sales_total_product (
+        product_id INTEGER PRIMARY KEY,
+        units INTEGER NOT NULL DEFAULT 0,
+        revenue NUMERIC(14,2) NOT NULL DEFAULT 0
+    );
+
+    CREATE TABLE IF NOT EXISTS sales_total_category (
+        category VARCHAR(50) PRIMARY KEY,
+        units INTEGER NOT NULL DEFAULT 0,
+        revenue NUMERIC(14,2) NOT NULL DEFAULT 0
+    );
+
+    -- Aplica (p_sign = 1) o revierte (p_sign = -1) un renglón de venta
+    CREATE OR REPLACE FUNCTION rollup_apply_detail(
+        p_day DATE, p_product_id INTEGER, p_units INTEGER, p_revenue NUMERIC, p_sign INTEGER
+    ) RETURNS void AS $$
+    DECLARE
+        v_category VARCHAR(50);
+    BEGIN
+        IF p_day IS NULL THEN
+            RETURN;
+        END IF;
+
+        SELECT NULLIF(category, '') INTO v_category FROM products WHERE product_id = p_product_id;
+        v_category := COALESCE(v_category, 'Sin categoría');
+
+        INSERT INTO sales_daily_product AS r (day, product_id, units, revenue)
+        VALUES (p_day, p_product_id, p_sign * p_units, p_sign * COALESCE(p_revenue, 0))
+        ON CONFLICT (day, product_id) DO UPDATE
+        SET units = r.units + EXCLUDED.units, revenue = r.revenue + EXCLUDED.revenue;
+
+        INSERT INTO sales_daily_category AS r (day, category, units, revenue)
+        VALUES (p_day, v_category, p_sign * p_units, p_sign * COALESCE(p_revenue, 0))
+        ON CONFLICT (day, category) DO UPDATE
+        SET units = r.units + EXCLUDED.units, revenue = r.revenue + EXCLUDED.revenue;
+
+        INSERT INTO sales_total_product AS r (product_id, units, revenue)
+        VALUES (p_product_id, p_sign * p_units, p_sign * COALESCE(p_revenue, 0))
+        ON CONFLICT (product_id) DO UPDATE
+        SET units = r.units + EXCLUDED.units, revenue = r.revenue + EXCLUDED.revenue;
+
+        INSERT INTO sales_total_category AS r (category, units, revenue)
+        VALUES (v_category, p_sign * p_units, p_sign * COALESCE(p_revenue, 0))
+        ON CONFLICT (category) DO UPDATE
+        SET units = r.units + EXCLUDED.units, revenue = r.revenue + EXCLUDED.revenue;
+
+        INSERT INTO sales_daily AS r (day, items)
+        VALUES (p_day, p_sign)
+        ON CONFLICT (day) DO UPDATE SET items = r.items + EXCLUDED.items;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION rollup_sale_details_trg() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM rollup_apply_detail(
+                (SELECT store_day(date) FROM sales WHERE sale_id = OLD.sale_id),
+                OLD.product_id, OLD.quantity, OLD.subtotal, -1
+            );
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM rollup_apply_detail(
+                (SELECT store_day(date) FROM sales WHERE sale_id = NEW.sale_id),
+                NEW.product_id, NEW.quantity, NEW.subtotal, 1
+            );
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION rollup_sales_trg() RETURNS trigger AS $$
+    DECLARE
+        d RECORD;
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.date IS NOT NULL THEN
+            INSERT INTO sales_daily AS r (day, transactions, revenue)
+            VALUES (store_day(OLD.date), -1, -COALESCE(OLD.total, 0))
+            ON CONFLICT (day) DO UPDATE
+            SET transactions = r.transactions + EXCLUDED.transactions,
+                revenue = r.revenue + EXCLUDED.revenue;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.date IS NOT NULL THEN
+            INSERT INTO sales_daily AS r (day, transactions, revenue)
+            VALUES (store_day(NEW.date), 1, COALESCE(NEW.total, 0))
+            ON CONFLICT (day) DO UPDATE
+            SET transactions = r.transactions + EXCLUDED.transactions,
+                revenue = r.revenue + EXCLUDED.revenue;
+        END IF;
+
+        -- Si la venta cambia de día, sus renglones se mueven con ella
+        IF TG_OP = 'UPDATE' AND store_day(NEW.date) IS DISTINCT FROM store_day(OLD.date) THEN
+            FOR d IN SELECT product_id, quantity, subtotal FROM sale_details WHERE sale_id = NEW.sale_id LOOP
+                PERFORM rollup_apply_detail(store_day(OLD.date), d.product_id, d.quantity, d.subtotal, -1);
+                PERFORM rollup_apply_detail(store_day(NEW.date), d.product_id, d.quantity, d.subtotal, 1);
+            END LOOP;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    -- Si un producto cambia de categoría, su historial se mueve con él
+    CREATE OR REPLACE FUNCTION rollup_products_trg() RETURNS trigger AS $$
+    DECLARE
+        v_old VARCHAR(50) := COALESCE(NULLIF(OLD.category, ''), 'Sin categoría');
+        v_new VARCHAR(50) := COALESCE(NULLIF(NEW.category, ''), 'Sin categoría');
+    BEGIN
+        IF v_old = v_new THEN
+            RETURN NULL;
+        END IF;
+
+        INSERT INTO sales_daily_category AS r (day, category, units, revenue)
+        SELECT day, v_old, -units, -revenue FROM sales_daily_product WHERE product_id = NEW.product_id
+        ON CONFLICT (day, category) DO UPDATE
+        SET units = r.units + EXCLUDED.units, revenue = r.revenue + EXCLUDED.revenue;
+
+        INSERT INTO sales_daily_category AS r (day, category, units, revenue)
+        SELECT day, v_new, units, revenue FROM sales_daily_product WHERE product_id = NEW.product_id
+        ON CONFLICT (day, category) DO UPDATE
+        SET units = r.units + EXCLUDED.units, revenue = r.revenue + EXCLUDED.revenue;
+
+        INSERT INTO sales_total_category AS r (category, units, revenue)
+        SELECT v_old, -units, -revenue FROM sales_total_product WHERE product_id = NEW.product_id
+        ON CONFLICT (category) DO UPDATE
+        SET units = r.units + EXCLUDED.units, revenue = r.revenue + EXCLUDED.revenue;
+
+        INSERT INTO sales_total_category AS r (category, units, revenue)
+        SELECT v_new, units, revenue FROM sales_total_product WHERE product_id = NEW.product_id
+        ON CONFLICT (category) DO UPDATE
+        SET units = r.units + EXCLUDED.units, revenue = r.revenue + EXCLUDED.revenue;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS trg_sale_details_rollup ON sale_details;
+    CREATE TRIGGER trg_sale_details_rollup
+        AFTER INSERT OR UPDATE OR DELETE ON sale_details
+        FOR EACH ROW EXECUTE FUNCTION rollup_sale_details_trg();
+
+    DROP TRIGGER IF EXISTS trg_sales_rollup ON sales;
+    CREATE TRIGGER trg_sales_rollup
+        AFTER INSERT OR UPDATE OF date, total OR DELETE ON sales
+        FOR EACH ROW EXECUTE FUNCTION rollup_sales_trg();
+
+    DROP TRIGGER IF EXISTS trg_products_rollup ON products;
+    CREATE TRIGGER trg_products_rollup
+        AFTER UPDATE OF category ON products
+        FOR EACH ROW EXECUTE FUNCTION rollup_products_trg();
+
+    -- Bases con resúmenes diarios anteriores a los totales: se cargan una vez
+    INSERT INTO sales_total_product (product_id, units, revenue)
+    SELECT product_id, SUM(units), SUM(revenue)
+    FROM sales_daily_product
+    WHERE NOT EXISTS (SELECT 1 FROM sales_total_product)
+    GROUP BY product_id;
+
+    INSERT INTO sales_total_category (category, units, revenue)
+    SELECT category, SUM(units), SUM(revenue)
+    FROM sales_daily_category
+    WHERE NOT EXISTS (SELECT 1 FROM sales_total_category)
+    GROUP BY category;
+"""
+
+REBUILD_SQL = """
+    -- Bloquea escrituras durante el recálculo para no perder ventas concurrentes
+    LOCK TABLE sales, sale_details IN SHARE MODE;
+    TRUNCATE sales_daily, sales_daily_product, sales_daily_category, sales_total_product, sales_total_category;
+
+    INSERT INTO sales_daily (day, transactions, revenue)
+    SELECT store_day(date), COUNT(*), COALESCE(SUM(total), 0)
+    FROM sales
+    WHERE date IS NOT NULL
+    GROUP BY store_day(date);
+
+    INSERT INTO sales_daily AS r (day, items)
+    SELECT store_day(s.date), COUNT(*)
+    FROM sale_details sd
+    JOIN sales s ON s.sale_id = sd.sale_id
+    WHERE s.date IS NOT NULL
+    GROUP BY store_day(s.date)
+    ON CONFLICT (day) DO UPDATE SET items = EXCLUDED.items;
+
+    INSERT INTO sales_daily_product (day, product_id, units, revenue)
+    SELECT store_day(s.date), sd.product_id, SUM(sd.quantity), COALESCE(SUM(sd.subtotal), 0)
+    FROM sale_details sd
+    JOIN sales s ON s.sale_id = sd.sale_id
+    WHERE s.date IS NOT NULL
+    GROUP BY store_day(s.date), sd.product_id;
+
+    INSERT INTO sales_daily_category (day, category, units, revenue)
+    SELECT r.day, COALESCE(NULLIF(p.category, ''), 'Sin categoría'), SUM(r.units), SUM(r.revenue)
+    FROM sales_daily_product r
+    LEFT JOIN products p ON p.product_id = r.product_id
+    GROUP BY r.day, COALESCE(NULLIF(p.category, ''), 'Sin categoría');
+
+    INSERT INTO sales_total_product (product_id, units, revenue)
+    SELECT product_id, SUM(units), SUM(revenue)
+    FROM sales_daily_product
+    GROUP BY product_id;
+
+    INSERT INTO sales_total_category (category, units, revenue)
+    SELECT category, SUM(units), SUM(revenue)
+    FROM sales_daily_category
+    GROUP BY category;
+"""
+
+
+def _store_day_config():
+    db_tz = validate_timezone(Config.DB_TIMEZONE)
+    store_tz = validate_timezone(Config.STORE_TIMEZONE)
+    return db_tz, store_tz
+
+
+def create_sale_totals(cur):
+    """Agregar item_count/units a sales y el trigger que mantiene los totales.
+
+    Si las columnas no existían se calculan para el historial existente.
+    """
+    cur.execute("""
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_name = 'sales' AND column_name IN ('item_count', 'units')
+    """)
+    missing = cur.fetchone()[0] < 2
+
+    cur.execute("""
+        ALTER TABLE sales
+        ADD COLUMN IF NOT EXISTS item_count INTEGER NOT NULL DEFAULT 0,
+        ADD COLUMN IF NOT EXISTS units INTEGER NOT NULL DEFAULT 0
+    """)
+    cur.execute(SALE_TOTALS_SQL)
+
+    if missing:
+        cur.execute(BACKFILL_SALE_TOTALS_SQL)
+
+
+def create_product_pairs(cur):
+    """Crear product_pairs y sus triggers; se llena con el historial al crearla"""
+    cur.execute("SELECT to_regclass('product_pairs') IS NULL")
+    is_new = cur.fetchone()[0]
+
+    cur.execute(PRODUCT_PAIRS_SQL)
+
+    if is_new:
+        cur.execute(REBUILD_PAIRS_SQL)
+
+
+def create_frequent_itemsets(cur):
+    """Crear frequent_itemsets (se llena con flask mine-itemsets)"""
+    cur.execute(FREQUENT_ITEMSETS_SQL)
+
+
+def create_product_similarity(cur):
+    """Crear product_similarity (se llena con flask rebuild-similarity o en segundo plano al primer uso)"""
+    cur.execute(PRODUCT_SIMILARITY_SQL)
+
+
+def create_forecast_accuracy(cur):
+    """Crear forecast_accuracy (se llena con flask backtest-forecast o al primer uso)"""
+    cur.execute(FORECAST_ACCURACY_SQL)
+
+
+def create_forecast_results(cur):
+    """Crear forecast_results (se llena al calcular /ml/forecast)"""
+    cur.execute(FORECAST_RESULTS_SQL)
+
+
+def create_demand_series(cur):
+    """Crear demand_series (se carga al primer uso o con flask backfill-demand)"""
+    cur.execute(DEMAND_SERIES_SQL)
+
+
+def create_data_versions(cur):
+    """Crear data_version y los triggers de DATA_VERSIONS (después de crear sus tablas)"""
+    cur.execute(DATA_VERSION_SQL)
+    for name, tables in DATA_VERSIONS.items():
+        for table, events in tables:
+            cur.execute(DATA_VERSION_TRIGGER_SQL.format(name=name, table=table, events=events))
+
+
+def create_rollup_schema(cur):
+    """Crear store_day(), tablas de resumen y triggers.
+
+    Carga el historial si los resúmenes están vacíos, y lo recalcula si
+    cambió la zona horaria configurada (los días agrupados ya no valen).
+    """
+    db_tz, store_tz = _store_day_config()
+
+    cur.execute("SELECT to_regprocedure('store_day_config()') IS NOT NULL")
+    previous = None
+    if cur.fetchone()[0]:
+        cur.execute("SELECT store_day_config()")
+        previous = cur.fetchone()[0]
+    tz_changed = previous is not None and previous != f"{db_tz}>{store_tz}"
+
+    cur.execute(STORE_DAY_SQL.format(db_tz=db_tz, store_tz=store_tz))
+    cur.execute(ROLLUP_SCHEMA_SQL)
+
+    if tz_changed:
+        rebuild_rollups(cur)
+        return
+
+    cur.execute("""
+        SELECT NOT EXISTS (SELECT 1 FROM sales_daily)
+           AND EXISTS (SELECT 1 FROM sales)
+    """)
+    if cur.fetchone()[0]:
+        rebuild_rollups(cur)
+
+
+def rebuild_rollups(cur):
+    """Recalcular las tablas de resumen y los pares desde sales y sale_details"""
+    cur.execute(REBUILD_SQL)
+    cur.execute(REBUILD_PAIRS_SQL)
+    # Las series se vuelven a cerrar desde el resumen recalculado en el próximo uso
+    cur.execute("TRUNCATE demand_series, demand_series_state")
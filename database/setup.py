@@ -3,6 +3,12 @@ import os
 import logging
 from datetime import datetime, timedelta
 from config import Config
+from database.rollups import (
+    ROLLUP_TABLES, create_sale_totals, create_product_pairs, create_frequent_itemsets,
+    create_product_similarity, create_forecast_accuracy, create_forecast_results, create_demand_series,
+    create_data_versions,
+    create_rollup_schema, rebuild_rollups
+)
 from werkzeug.security import generate_password_hash  # ✅ IMPORTAR para hashes modernos
 
 logging.basicConfig(level=logging.INFO)
@@ -79,9 +85,17 @@ class DatabaseSetup:
                     sale_id SERIAL PRIMARY KEY,
                     date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     user_id INTEGER REFERENCES users(id),
-                    total NUMERIC(12,2) DEFAULT 0
+                    total NUMERIC(12,2) DEFAULT 0,
+                    payment_method VARCHAR(30) NOT NULL DEFAULT 'Efectivo',
+                    item_count INTEGER NOT NULL DEFAULT 0,
+                    units INTEGER NOT NULL DEFAULT 0
                 )
             """)
+            # Bases existentes creadas antes de la columna payment_method
+            cur.execute("""
+                ALTER TABLE sales
+                ADD COLUMN IF NOT EXISTS payment_method VARCHAR(30) NOT NULL DEFAULT 'Efectivo'
+            """)
             logger.info("✅ Tabla 'sales' creada")
             
             # 5. Tabla sale_details
@@ -97,6 +111,30 @@ class DatabaseSetup:
             """)
             logger.info("✅ Tabla 'sale_details' creada")
             
+            # Totales por venta (item_count, units, total) mantenidos por trigger
+            create_sale_totals(cur)
+            logger.info("✅ Totales por venta sincronizados con sale_details")
+            
+            # Co-ocurrencia de productos ("comprados juntos"), mantenida por trigger
+            create_product_pairs(cur)
+            logger.info("✅ Tabla 'product_pairs' creada")
+            
+            # Conjuntos frecuentes de productos (FP-Growth) para los bundles
+            create_frequent_itemsets(cur)
+            logger.info("✅ Tabla 'frequent_itemsets' creada")
+            
+            # Productos similares por contenido (TF-IDF)
+            create_product_similarity(cur)
+            logger.info("✅ Tabla 'product_similarity' creada")
+            
+            # Precisión real de la predicción de demanda (backtesting)
+            create_forecast_accuracy(cur)
+            logger.info("✅ Tabla 'forecast_accuracy' creada")
+            
+            # Resultados de /ml/forecast compartidos por los workers
+            create_forecast_results(cur)
+            logger.info("✅ Tabla 'forecast_results' creada")
+            
             # 6. Tabla movements
             cur.execute("""
                 CREATE TABLE IF NOT EXISTS movements (
@@ -142,14 +180,28 @@ class DatabaseSetup:
             
             # Crear índices para mejor performance
             cur.execute("CREATE INDEX IF NOT EXISTS idx_sales_date ON sales(date)")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_sales_user_date ON sales(user_id, date)")
             cur.execute("CREATE INDEX IF NOT EXISTS idx_products_category ON products(category)")
             cur.execute("CREATE INDEX IF NOT EXISTS idx_sale_details_product ON sale_details(product_id)")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_sale_details_sale ON sale_details(sale_id)")
             cur.execute("CREATE INDEX IF NOT EXISTS idx_movements_product ON movements(product_id)")
             cur.execute("CREATE INDEX IF NOT EXISTS idx_user_sessions_token ON user_sessions(session_token)")
             cur.execute("CREATE INDEX IF NOT EXISTS idx_user_sessions_user ON user_sessions(user_id)")
             
             logger.info("✅ Índices creados")
             
+            # Demanda diaria por producto para la predicción (se cierra desde sales_daily_product)
+            create_demand_series(cur)
+            logger.info("✅ Tabla 'demand_series' creada")
+            
+            # Versiones de datos que invalidan las cachés (p. ej. /ml/forecast)
+            create_data_versions(cur)
+            logger.info("✅ Tabla 'data_version' creada")
+            
+            # Tablas de resumen diario para /reports (mantenidas por triggers)
+            create_rollup_schema(cur)
+            logger.info("✅ Tablas de resumen diario creadas")
+            
             conn.commit()
             logger.info("🎉 ¡Todas las tablas creadas exitosamente!")
             
@@ -407,6 +459,7 @@ class DatabaseSetup:
             
             # Eliminar tablas en orden inverso (por dependencias)
             tables = [
+                *ROLLUP_TABLES,
                 'sale_details', 'sales', 'movements',
                 'password_resets', 'user_sessions',
                 'products', 'suppliers', 'users'
@@ -431,6 +484,28 @@ class DatabaseSetup:
                 cur.close()
                 conn.close()
     
+    def rebuild_rollups(self):
+        """Recalcular las tablas de resumen diario (backfill del historial)"""
+        conn = None
+        try:
+            conn = psycopg2.connect(**self.conn_params)
+            cur = conn.cursor()
+            
+            logger.info("🔄 Recalculando tablas de resumen diario...")
+            rebuild_rollups(cur)
+            conn.commit()
+            logger.info("🎉 Tablas de resumen diario recalculadas")
+            
+        except Exception as e:
+            logger.error(f"❌ Error recalculando resúmenes: {e}")
+            if conn:
+                conn.rollback()
+            raise
+        finally:
+            if conn:
+                cur.close()
+                conn.close()
+    
     def verify_tables_structure(self):
         """Verificar que todas las tablas tienen la estructura correcta"""
         conn = None
@@ -440,7 +515,8 @@ class DatabaseSetup:
             
             expected_tables = [
                 'users', 'products', 'sales', 'sale_details', 
-                'movements', 'suppliers', 'password_resets', 'user_sessions'
+                'movements', 'suppliers', 'password_resets', 'user_sessions',
+                *ROLLUP_TABLES
             ]
             
             cur.execute("""
@@ -28,6 +28,12 @@ accesslog = "-"
 errorlog = "-"
 loglevel = "info"
 
+# ==================== HOOKS ====================
+def worker_exit(server, worker):
+    """Cerrar el pool de conexiones del worker al terminar"""
+    from database.connection import close_pool
+    close_pool()
+
 # ==================== DEBUG INFO ====================
 print(f"🚀 Gunicorn configurado para Render:")
 print(f"   • Workers: {workers}")
@@ -1,77 +1,158 @@
-import psycopg2
+from database.connection import get_cursor
 from config import Config
-from typing import List, Dict
-from datetime import datetime, timedelta
+from models.demand_series import DemandSeriesStore
+from models.demand_engine import (
+    DemandMatrix, ForecastResult, Z_SCORES, accuracy_metrics, holt_winters, rolling_origin
+)
+from models.demand_shards import fit_sharded
+from psycopg2.extras import execute_values
+from utils.store_time import day_start, store_today
+from typing import Callable, List, Dict, Optional
+from datetime import timedelta
 import logging
+import numpy as np
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+PERIOD_DAYS = {'week': 7, 'month': 30, 'quarter': 90}
+ACCURACY_SUMS = ("abs_error", "actual", "forecast", "ape_sum", "ape_count", "sape_sum", "sape_count")
+
+def _metrics(sums: Dict) -> Dict:
+    """MAPE, sMAPE, sesgo y WAPE redondeados (None sin datos) y precisión = 100 - WAPE"""
+    metrics = {
+        name: (None if np.isnan(value) else round(float(value), 1))
+        for name, value in accuracy_metrics(sums).items()
+    }
+    metrics["accuracy"] = None if metrics["wape"] is None else round(max(0.0, 100.0 - metrics["wape"]), 1)
+    return metrics
+
 class DemandForecast:
-    def __init__(self):
-        self.conn_params = Config.get_database_config()
+    def get_demand_matrix(self, days: Optional[int] = None,
+                          product_ids: Optional[List[int]] = None) -> DemandMatrix:
+        """Unidades vendidas por producto y día en los últimos `days` días cerrados (sin hoy).
 
-    def _get_connection(self):
-        """Obtener conexión a la base de datos"""
-        return psycopg2.connect(**self.conn_params)
+        Lee demand_series con un solo rango por bloque; antes cierra los días
+        terminados que falten.
+        """
+        days = days or Config.FORECAST_HISTORY_DAYS
+        store = DemandSeriesStore()
+        last_day = store.ensure_closed()
+        start = last_day - timedelta(days=days - 1)
+        return store.load_matrix(start, days, product_ids)
 
-    def get_sales_history(self, days: int = 180) -> List[Dict]:
-        """Obtener historial de ventas para análisis"""
-        conn = self._get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT 
-                s.date,
-                p.product_id,
-                p.name,
-                p.category,
-                SUM(sd.quantity) as total_quantity,
-                SUM(sd.subtotal) as total_revenue
-            FROM sales s
-            JOIN sale_details sd ON s.sale_id = sd.sale_id
-            JOIN products p ON sd.product_id = p.product_id
-            WHERE s.date >= CURRENT_DATE - INTERVAL '%s days'
-            GROUP BY s.date, p.product_id, p.name, p.category
-            ORDER BY s.date DESC
-        """, (days,))
-        
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
-        
-        sales = []
-        for row in rows:
-            sales.append({
-                "date": row[0],
-                "product_id": row[1],
-                "name": row[2],
-                "category": row[3],
-                "quantity": float(row[4]),
-                "revenue": float(row[5])
-            })
-        return sales
+    def run_backtest(self, horizon: Optional[int] = None, folds: Optional[int] = None,
+                     step: Optional[int] = None,
+                     progress: Optional[Callable[[int, int, int, int], None]] = None) -> int:
+        """Backtesting con origen móvil de todos los productos; reemplaza forecast_accuracy.
+
+        Devuelve la cantidad de productos evaluados (con ventas en los pliegues).
+        """
+        horizon = horizon or Config.FORECAST_BACKTEST_HORIZON
+        folds = folds or Config.FORECAST_BACKTEST_FOLDS
+        step = step or Config.FORECAST_BACKTEST_STEP
+
+        inventory = self.get_current_inventory()
+        # Historial suficiente para los pliegues además del de la predicción
+        days = max(Config.FORECAST_HISTORY_DAYS, horizon + (folds - 1) * step + 28)
+        matrix = self.get_demand_matrix(days, product_ids=[product['id'] for product in inventory])
+        backtest = fit_sharded(rolling_origin, matrix.values, horizon, folds, step,
+                               groups=[product['category'] for product in inventory], progress=progress)
+        sums = {name: values.tolist() for name, values in backtest.product_sums().items()}
+
+        rows = [
+            (product['id'], product['category'] or 'Sin categoría', horizon, backtest.n_folds,
+             *(sums[name][i] for name in ACCURACY_SUMS))
+            for i, product in enumerate(inventory)
+            if sums["sape_count"][i] > 0
+        ]
+        with get_cursor(commit=True) as cur:
+            cur.execute("DELETE FROM forecast_accuracy")
+            if rows:
+                execute_values(cur, f"""
+                    INSERT INTO forecast_accuracy (product_id, category, horizon, folds, {", ".join(ACCURACY_SUMS)})
+                    VALUES %s
+                """, rows)
+
+        logger.info(f"Backtesting: {len(rows)} productos, {backtest.n_folds} pliegues de {horizon} días")
+        return len(rows)
+
+    def get_accuracy_summary(self) -> Optional[Dict]:
+        """Precisión del último backtesting, total y por categoría; None si no hay.
+
+        `stale` indica que se calculó antes de hoy (hay días nuevos para evaluar).
+        """
+        with get_cursor() as cur:
+            cur.execute(f"""
+                SELECT
+                    GROUPING(category) AS is_total,
+                    category,
+                    COUNT(*),
+                    {", ".join(f"SUM({name})" for name in ACCURACY_SUMS)},
+                    MAX(horizon), MAX(folds), MAX(evaluated_at)
+                FROM forecast_accuracy
+                GROUP BY GROUPING SETS ((category), ())
+                ORDER BY is_total DESC, category
+            """)
+            rows = cur.fetchall()
+        today_start = day_start(store_today())
+        if not rows or not rows[0][2]:
+            return None
+
+        def entry(row):
+            sums = dict(zip(ACCURACY_SUMS, (float(value) for value in row[3:3 + len(ACCURACY_SUMS)])))
+            return {"products": row[2], **_metrics(sums)}
+
+        total = rows[0]
+        return {
+            **entry(total),
+            "horizon": total[-3],
+            "folds": total[-2],
+            "evaluatedAt": total[-1].isoformat() if total[-1] else None,
+            "stale": total[-1] is None or total[-1] < today_start,
+            "categories": [{"category": row[1], **entry(row)} for row in rows[1:]]
+        }
+
+    def get_product_accuracy(self, limit: int = 20) -> List[Dict]:
+        """Productos con mayor error relativo (WAPE) en el último backtesting"""
+        with get_cursor() as cur:
+            cur.execute(f"""
+                SELECT fa.product_id, p.name, fa.category, {", ".join(f"fa.{name}" for name in ACCURACY_SUMS)}
+                FROM forecast_accuracy fa
+                JOIN products p ON p.product_id = fa.product_id
+                WHERE fa.actual > 0
+                ORDER BY fa.abs_error / fa.actual DESC, fa.product_id
+                LIMIT %s
+            """, (limit,))
+            rows = cur.fetchall()
+        return [
+            {
+                "id": row[0],
+                "name": row[1],
+                "category": row[2],
+                **_metrics(dict(zip(ACCURACY_SUMS, (float(value) for value in row[3:]))))
+            }
+            for row in rows
+        ]
 
     def get_current_inventory(self) -> List[Dict]:
         """Obtener inventario actual"""
-        conn = self._get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT 
-                product_id,
-                name,
-                code as sku,
-                category,
-                current_stock,
-                minimum_stock,
-                maximum_stock
-            FROM products 
-            WHERE current_stock >= 0
-            ORDER BY name
-        """)
+        with get_cursor() as cur:
+            cur.execute("""
+                SELECT 
+                    product_id,
+                    name,
+                    code as sku,
+                    category,
+                    current_stock,
+                    minimum_stock,
+                    maximum_stock
+                FROM products 
+                WHERE current_stock >= 0
+                ORDER BY name
+            """)
         
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
+            rows = cur.fetchall()
         
         inventory = []
         for row in rows:
@@ -86,58 +167,52 @@ class DemandForecast:
             })
         return inventory
 
-    def calculate_demand_forecast(self, period: str = 'week') -> Dict:
-        """Calcular predicción de demanda basada en datos históricos"""
-        sales_data = self.get_sales_history(90)  # Últimos 3 meses
+    def calculate_demand_forecast(self, period: str = 'week',
+                                  progress: Optional[Callable[[int, int, int, int], None]] = None) -> Dict:
+        """Calcular predicción de demanda basada en datos históricos.
+
+        `progress(productos, total, fragmentos, total_fragmentos)` recibe el
+        avance del ajuste; por omisión se registra en el log.
+        """
         inventory = self.get_current_inventory()
+        matrix = self.get_demand_matrix(product_ids=[product['id'] for product in inventory])
         
-        if not sales_data:
+        if not matrix.values.any():
             return self._get_fallback_forecast(inventory)
         
-        # Análisis simple de tendencia (en producción usarías ARIMA, Prophet, etc.)
-        products_forecast = self._calculate_product_forecast(sales_data, inventory, period)
-        timeline_forecast = self._calculate_timeline_forecast(sales_data, period)
-        seasonal_patterns = self._detect_seasonal_patterns(sales_data)
+        # Holt-Winters con tendencia y estacionalidad semanal para todas las series a la vez
+        horizon = PERIOD_DAYS.get(period, 7)
+        # Holt-Winters por categoría en procesos aparte; el resultado no depende del reparto
+        result = fit_sharded(holt_winters, matrix.values, horizon, level=Config.FORECAST_INTERVAL_LEVEL,
+                             groups=[product['category'] for product in inventory], progress=progress)
+        products_forecast = self._calculate_product_forecast(result, inventory)
+        timeline_forecast = self._calculate_timeline_forecast(matrix, period)
+        seasonal_patterns = self._detect_seasonal_patterns(matrix)
         recommendations = self._generate_recommendations(products_forecast)
+        backtest = self.get_accuracy_summary()
         
         return {
             "products": products_forecast,
             "timeline": timeline_forecast,
             "seasonalPatterns": seasonal_patterns,
             "recommendations": recommendations,
-            "accuracy": self._calculate_accuracy(sales_data)
+            "accuracy": backtest["accuracy"] if backtest else None,
+            "backtest": backtest
         }
 
-    def _calculate_product_forecast(self, sales_data: List[Dict], inventory: List[Dict], period: str) -> List[Dict]:
-        """Calcular predicción por producto"""
-        # Agrupar ventas por producto
-        product_sales = {}
-        for sale in sales_data:
-            product_id = sale['product_id']
-            if product_id not in product_sales:
-                product_sales[product_id] = {
-                    'name': sale['name'],
-                    'category': sale['category'],
-                    'total_quantity': 0,
-                    'sales_count': 0
-                }
-            product_sales[product_id]['total_quantity'] += sale['quantity']
-            product_sales[product_id]['sales_count'] += 1
+    def _calculate_product_forecast(self, result: ForecastResult, inventory: List[Dict]) -> List[Dict]:
+        """Predicción por producto: demanda total del período y su intervalo.
+
+        `result` tiene una fila por producto de `inventory`, en el mismo orden.
+        """
+        totals = result.totals()
+        predicted = totals["forecast"].tolist()
+        lower = totals["lower"].tolist()
+        upper = totals["upper"].tolist()
         
-        # Calcular predicción
         forecasts = []
-        for product in inventory:
-            product_id = product['id']
-            sales_info = product_sales.get(product_id, {})
-            
-            # Promedio diario de ventas
-            avg_daily_sales = sales_info.get('total_quantity', 0) / 90 if sales_info else 0
-            
-            # Factor de período
-            period_factor = {'week': 7, 'month': 30, 'quarter': 90}.get(period, 7)
-            
-            # Predicción de demanda
-            predicted_demand = avg_daily_sales * period_factor * 1.1  # +10% de crecimiento
+        for i, product in enumerate(inventory):
+            predicted_demand = predicted[i]
             
             # Calcular diferencia con stock actual
             current_stock = product['current_stock'] or 0
@@ -152,57 +227,61 @@ class DemandForecast:
                 priority = 'medium'
             
             forecasts.append({
-                "id": product_id,
+                "id": product['id'],
                 "name": product['name'],
                 "sku": product['sku'],
                 "category": product['category'],
                 "current_stock": current_stock,
                 "predicted_demand": round(predicted_demand, 1),
+                "lower_bound": round(lower[i], 1),
+                "upper_bound": round(upper[i], 1),
                 "difference": round(difference, 1),
                 "priority": priority
             })
         
         return forecasts
 
-    def _calculate_timeline_forecast(self, sales_data: List[Dict], period: str) -> List[Dict]:
-        """Calcular línea de tiempo para gráfico"""
-        # Agrupar ventas por fecha
-        daily_sales = {}
-        for sale in sales_data:
-            date_str = sale['date'].strftime('%Y-%m-%d')
-            if date_str not in daily_sales:
-                daily_sales[date_str] = 0
-            daily_sales[date_str] += sale['quantity']
+    def _calculate_timeline_forecast(self, matrix: DemandMatrix, period: str) -> List[Dict]:
+        """Línea de tiempo para el gráfico: últimos días (real y ajuste) y próximos (predicción)"""
+        days_count = PERIOD_DAYS.get(period, 7)
+        level = Config.FORECAST_INTERVAL_LEVEL
         
-        # Generar datos para el gráfico
-        timeline = []
-        days_count = {'week': 7, 'month': 30, 'quarter': 90}.get(period, 7)
+        # La serie total se modela aparte: su intervalo no es la suma de los de cada producto
+        total = matrix.values.sum(axis=0)
+        result = holt_winters(total[None, :], days_count, level=level, keep_fitted=True)
+        spread = Z_SCORES[level] * float(result.sigma[0])
         
-        for i in range(days_count):
-            date = datetime.now() - timedelta(days=days_count - i - 1)
-            date_str = date.strftime('%Y-%m-%d')
-            
-            actual_sales = daily_sales.get(date_str, 0)
-            # Predicción simple: promedio móvil + tendencia
-            predicted_sales = actual_sales * 1.05  # +5% de crecimiento
-            
+        timeline = []
+        days = matrix.days
+        for offset in range(max(matrix.n_days - days_count, 0), matrix.n_days):
+            predicted_sales = float(result.fitted[0, offset])
             timeline.append({
-                "date": date_str,
-                "actual": round(actual_sales, 1),
+                "date": days[offset].strftime('%Y-%m-%d'),
+                "actual": round(float(total[offset]), 1),
                 "predicted": round(predicted_sales, 1),
-                "upperBound": round(predicted_sales * 1.15, 1),  # +15%
-                "lowerBound": round(predicted_sales * 0.85, 1)   # -15%
+                "upperBound": round(predicted_sales + spread, 1),
+                "lowerBound": round(max(predicted_sales - spread, 0.0), 1)
+            })
+        
+        first_day = matrix.start + timedelta(days=matrix.n_days)
+        for step in range(days_count):
+            timeline.append({
+                "date": (first_day + timedelta(days=step)).strftime('%Y-%m-%d'),
+                "actual": None,
+                "predicted": round(float(result.forecast[0, step]), 1),
+                "upperBound": round(float(result.upper[0, step]), 1),
+                "lowerBound": round(float(result.lower[0, step]), 1)
             })
         
         return timeline
 
-    def _detect_seasonal_patterns(self, sales_data: List[Dict]) -> List[Dict]:
+    def _detect_seasonal_patterns(self, matrix: DemandMatrix) -> List[Dict]:
         """Detectar patrones estacionales"""
-        # Agrupar por día de la semana
-        weekday_sales = {i: 0 for i in range(7)}
-        for sale in sales_data:
-            weekday = sale['date'].weekday()
-            weekday_sales[weekday] += sale['quantity']
+        # Agrupar por día de la semana (columna i = matrix.start + i días)
+        daily = matrix.values.sum(axis=0)
+        weekdays = (matrix.start.weekday() + np.arange(matrix.n_days)) % 7
+        totals = np.bincount(weekdays, weights=daily, minlength=7)
+        weekday_sales = {i: float(totals[i]) for i in range(7)}
         
         # Encontrar días pico
         max_day = max(weekday_sales, key=weekday_sales.get)
@@ -264,16 +343,6 @@ class DemandForecast:
         
         return recommendations
 
-    def _calculate_accuracy(self, sales_data: List[Dict]) -> float:
-        """Calcular precisión del modelo (simulada)"""
-        # En producción, calcularías esto comparando predicciones pasadas con datos reales
-        if len(sales_data) > 100:
-            return 87.5
-        elif len(sales_data) > 50:
-            return 82.0
-        else:
-            return 75.0
-
     def _get_fallback_forecast(self, inventory: List[Dict]) -> Dict:
         """Datos de respaldo cuando no hay suficientes datos"""
         return {
@@ -301,12 +370,13 @@ class DemandForecast:
                     "impact": "Alto"
                 }
             ],
-            "accuracy": 65.0
+            "accuracy": None,
+            "backtest": None
         }
 
-    def export_forecast_data(self) -> str:
-        """Exportar datos de predicción a CSV"""
-        forecast = self.calculate_demand_forecast('month')
+    def export_forecast_data(self, forecast: Optional[Dict] = None) -> str:
+        """Exportar datos de predicción a CSV (por omisión calcula la mensual)"""
+        forecast = forecast or self.calculate_demand_forecast('month')
         
         csv_lines = ["Producto,SKU,Categoria,Stock Actual,Demanda Predicha,Diferencia,Prioridad"]
         
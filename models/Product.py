@@ -1,5 +1,4 @@
-import psycopg2
-from config import Config
+from database.connection import get_cursor
 
 class Product:
     def __init__(self, product_id=None, code=None, name=None, description=None,
@@ -26,20 +25,26 @@ class Product:
     # ---------- CRUD BÁSICO ----------
 
     @staticmethod
-    def get_all():
-        """Devuelve todos los productos"""
-        conn = psycopg2.connect(**Config.get_database_config())
-        cur = conn.cursor()
-        cur.execute("""
+    def get_all(after=None, limit=None):
+        """Devuelve todos los productos, o una página keyset (Product_ID > after)"""
+        query = """
             SELECT Product_ID, Code, Name, Description, Category, Unit, 
                    Minimum_Stock, Current_Stock, Price, Barcode, Brand, 
                    Cost_Price, Maximum_Stock, Tax_Rate, Supplier, Location
             FROM Products
-            ORDER BY Product_ID
-        """)
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
+        """
+        params = []
+        if after is not None:
+            query += " WHERE Product_ID > %s"
+            params.append(after)
+        query += " ORDER BY Product_ID"
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit)
+
+        with get_cursor() as cur:
+            cur.execute(query, params)
+            rows = cur.fetchall()
         
         products = []
         for row in rows:
@@ -68,17 +73,14 @@ class Product:
     @staticmethod
     def find_by_id(product_id):
         """Busca producto por ID"""
-        conn = psycopg2.connect(**Config.get_database_config())
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT Product_ID, Code, Name, Description, Category, Unit, 
-                   Minimum_Stock, Current_Stock, Price, Barcode, Brand, 
-                   Cost_Price, Maximum_Stock, Tax_Rate, Supplier, Location
-            FROM Products WHERE Product_ID=%s
-        """, (product_id,))
-        row = cur.fetchone()
-        cur.close()
-        conn.close()
+        with get_cursor() as cur:
+            cur.execute("""
+                SELECT Product_ID, Code, Name, Description, Category, Unit, 
+                       Minimum_Stock, Current_Stock, Price, Barcode, Brand, 
+                       Cost_Price, Maximum_Stock, Tax_Rate, Supplier, Location
+                FROM Products WHERE Product_ID=%s
+            """, (product_id,))
+            row = cur.fetchone()
         
         if row:
             return Product(
@@ -103,58 +105,46 @@ class Product:
 
     def save(self):
         """Inserta un nuevo producto"""
-        conn = psycopg2.connect(**Config.get_database_config())
-        cur = conn.cursor()
-        cur.execute("""
-            INSERT INTO Products 
-            (Code, Name, Description, Category, Unit, Minimum_Stock, Current_Stock, Price,
-             Barcode, Brand, Cost_Price, Maximum_Stock, Tax_Rate, Supplier, Location)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            RETURNING Product_ID
-        """, (
-            self.code, self.name, self.description, self.category, self.unit,
-            self.minimum_stock, self.current_stock, self.price,
-            self.barcode, self.brand, self.cost_price, self.maximum_stock,
-            self.tax_rate, self.supplier, self.location
-        ))
-        self.product_id = cur.fetchone()[0]
-        conn.commit()
-        cur.close()
-        conn.close()
+        with get_cursor(commit=True) as cur:
+            cur.execute("""
+                INSERT INTO Products 
+                (Code, Name, Description, Category, Unit, Minimum_Stock, Current_Stock, Price,
+                 Barcode, Brand, Cost_Price, Maximum_Stock, Tax_Rate, Supplier, Location)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                RETURNING Product_ID
+            """, (
+                self.code, self.name, self.description, self.category, self.unit,
+                self.minimum_stock, self.current_stock, self.price,
+                self.barcode, self.brand, self.cost_price, self.maximum_stock,
+                self.tax_rate, self.supplier, self.location
+            ))
+            self.product_id = cur.fetchone()[0]
         return self.product_id
 
     def update(self):
         """Actualiza producto existente"""
-        conn = psycopg2.connect(**Config.get_database_config())
-        cur = conn.cursor()
-        cur.execute("""
-            UPDATE Products
-            SET Code=%s, Name=%s, Description=%s, Category=%s, Unit=%s,
-                Minimum_Stock=%s, Current_Stock=%s, Price=%s,
-                Barcode=%s, Brand=%s, Cost_Price=%s, Maximum_Stock=%s,
-                Tax_Rate=%s, Supplier=%s, Location=%s
-            WHERE Product_ID=%s
-        """, (
-            self.code, self.name, self.description, self.category, self.unit,
-            self.minimum_stock, self.current_stock, self.price,
-            self.barcode, self.brand, self.cost_price, self.maximum_stock,
-            self.tax_rate, self.supplier, self.location, self.product_id
-        ))
-        conn.commit()
-        cur.close()
-        conn.close()
+        with get_cursor(commit=True) as cur:
+            cur.execute("""
+                UPDATE Products
+                SET Code=%s, Name=%s, Description=%s, Category=%s, Unit=%s,
+                    Minimum_Stock=%s, Current_Stock=%s, Price=%s,
+                    Barcode=%s, Brand=%s, Cost_Price=%s, Maximum_Stock=%s,
+                    Tax_Rate=%s, Supplier=%s, Location=%s
+                WHERE Product_ID=%s
+            """, (
+                self.code, self.name, self.description, self.category, self.unit,
+                self.minimum_stock, self.current_stock, self.price,
+                self.barcode, self.brand, self.cost_price, self.maximum_stock,
+                self.tax_rate, self.supplier, self.location, self.product_id
+            ))
         return self.product_id
 
     @staticmethod
     def delete(product_id):
         """Elimina producto por ID"""
-        conn = psycopg2.connect(**Config.get_database_config())
-        cur = conn.cursor()
-        cur.execute("DELETE FROM Products WHERE Product_ID=%s RETURNING Product_ID", (product_id,))
-        row = cur.fetchone()
-        conn.commit()
-        cur.close()
-        conn.close()
+        with get_cursor(commit=True) as cur:
+            cur.execute("DELETE FROM Products WHERE Product_ID=%s RETURNING Product_ID", (product_id,))
+            row = cur.fetchone()
         return bool(row)
 
     def to_dict(self):
@@ -0,0 +1,198 @@
+"""
+Motor vectorizado de análisis de canastas.
+
+Las ventas se representan como una matriz dispersa de incidencia
+canasta × producto en formato CSR (indptr, indices): la canasta i contiene
+los productos indices[indptr[i]:indptr[i + 1]]. La co-ocurrencia Xᵀ·X se
+obtiene generando los pares de cada canasta con operaciones de NumPy (sin
+bucles por canasta) y contándolos con np.unique, por bloques de canastas
+para acotar la memoria.
+"""
+from typing import Dict, List, Optional
+import numpy as np
+
+
+class BasketMatrix:
+    """Matriz de incidencia canasta × producto (CSR, un producto por canasta a lo sumo una vez)"""
+
+    def __init__(self, indptr, indices, product_ids):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.product_ids = np.asarray(product_ids)
+
+    @classmethod
+    def from_rows(cls, basket_keys, product_keys) -> "BasketMatrix":
+        """Arma la matriz desde filas (venta, producto), en cualquier orden y con repetidos"""
+        basket_keys = np.asarray(basket_keys)
+        product_keys = np.asarray(product_keys)
+        if basket_keys.size == 0:
+            return cls(np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+
+        product_ids, columns = np.unique(product_keys, return_inverse=True)
+        order = np.lexsort((columns, basket_keys))
+        baskets = basket_keys[order]
+        columns = columns[order]
+
+        # Un producto repetido en la misma venta cuenta una sola vez
+        keep = np.ones(baskets.size, dtype=bool)
+        keep[1:] = (baskets[1:] != baskets[:-1]) | (columns[1:] != columns[:-1])
+        baskets = baskets[keep]
+        columns = columns[keep]
+
+        starts = np.flatnonzero(np.r_[True, baskets[1:] != baskets[:-1]])
+        indptr = np.r_[starts, baskets.size]
+        return cls(indptr, columns, product_ids)
+
+    @classmethod
+    def from_batches(cls, batches) -> "BasketMatrix":
+        """Arma la matriz desde lotes de filas (venta, producto), p. ej. de stream_query"""
+        basket_keys, product_keys = [], []
+        for rows in batches:
+            if not rows:
+                continue
+            pairs = np.asarray(rows, dtype=np.int64).reshape(-1, 2)
+            basket_keys.append(pairs[:, 0])
+            product_keys.append(pairs[:, 1])
+        if not basket_keys:
+            return cls.from_rows([], [])
+        return cls.from_rows(np.concatenate(basket_keys), np.concatenate(product_keys))
+
+    @property
+    def n_baskets(self) -> int:
+        return self.indptr.size - 1
+
+    @property
+    def n_products(self) -> int:
+        return self.product_ids.size
+
+    def item_counts(self) -> np.ndarray:
+        """Canastas que contienen cada producto (diagonal de Xᵀ·X)"""
+        return np.bincount(self.indices, minlength=self.n_products)
+
+    def _chunk_pair_codes(self, lo: int, hi: int) -> np.ndarray:
+        """Pares (a < b) de las canastas [lo, hi) codificados como a * n_products + b"""
+        sizes = self.indptr[lo + 1:hi + 1] - self.indptr[lo:hi]
+        positions = np.arange(self.indptr[lo], self.indptr[hi], dtype=np.int64)
+        basket_end = np.repeat(self.indptr[lo + 1:hi + 1], sizes)
+
+        codes = []
+        offset = 1
+        # El par (p, p + offset) existe mientras p + offset siga en la misma canasta;
+        # las posiciones que quedan fuera ya no sirven para offsets mayores
+        while positions.size:
+            valid = positions + offset < basket_end
+            positions = positions[valid]
+            basket_end = basket_end[valid]
+            if not positions.size:
+                break
+            a = self.indices[positions]
+            b = self.indices[positions + offset]
+            codes.append(np.minimum(a, b) * self.n_products + np.maximum(a, b))
+            offset += 1
+
+        return np.concatenate(codes) if codes else np.zeros(0, dtype=np.int64)
+
+    def cooccurrence(self, min_count: int = 1, chunk_baskets: int = 200_000):
+        """Conteo de canastas por par de productos (triángulo superior de Xᵀ·X).
+
+        Devuelve (a, b, count) con índices de columna; solo pares con
+        count >= min_count.
+        """
+        codes = np.zeros(0, dtype=np.int64)
+        counts = np.zeros(0, dtype=np.int64)
+
+        for lo in range(0, self.n_baskets, chunk_baskets):
+            hi = min(lo + chunk_baskets, self.n_baskets)
+            chunk_codes, chunk_counts = np.unique(self._chunk_pair_codes(lo, hi), return_counts=True)
+            if not codes.size:
+                codes, counts = chunk_codes, chunk_counts
+                continue
+            merged, inverse = np.unique(np.concatenate([codes, chunk_codes]), return_inverse=True)
+            counts = np.bincount(inverse, weights=np.concatenate([counts, chunk_counts]),
+                                 minlength=merged.size).astype(np.int64)
+            codes = merged
+
+        keep = counts >= min_count
+        codes, counts = codes[keep], counts[keep]
+        return codes // self.n_products, codes % self.n_products, counts
+
+
+class PairStatistics:
+    """Support, confidence y lift de cada par (a, b) de productos, con a < b"""
+
+    def __init__(self, product_ids, columns_a, columns_b, count, item_counts, n_baskets):
+        self.product_ids = product_ids
+        self.columns_a = columns_a
+        self.columns_b = columns_b
+        self.count = count
+        self.item_counts = item_counts
+        self.n_baskets = n_baskets
+
+        n = float(max(n_baskets, 1))
+        count_f = count.astype(np.float64)
+        count_a = item_counts[columns_a].astype(np.float64)
+        count_b = item_counts[columns_b].astype(np.float64)
+
+        self.product_a = product_ids[columns_a]
+        self.product_b = product_ids[columns_b]
+        self.support = count_f / n
+        self.confidence_ab = count_f / count_a  # P(b | a)
+        self.confidence_ba = count_f / count_b  # P(a | b)
+        self.lift = count_f * n / (count_a * count_b)
+        # Pares ordenados por (a, b): búsqueda binaria sin armar un dict
+        self._codes = columns_a * product_ids.size + columns_b
+
+    def __len__(self) -> int:
+        return int(self.count.size)
+
+    def _column(self, product_id) -> Optional[int]:
+        i = int(np.searchsorted(self.product_ids, product_id))
+        if i < self.product_ids.size and self.product_ids[i] == product_id:
+            return i
+        return None
+
+    def _position(self, product_x, product_y) -> Optional[int]:
+        x, y = self._column(product_x), self._column(product_y)
+        if x is None or y is None or x == y:
+            return None
+        code = min(x, y) * self.product_ids.size + max(x, y)
+        i = int(np.searchsorted(self._codes, code))
+        if i < self._codes.size and self._codes[i] == code:
+            return i
+        return None
+
+    def rule(self, antecedent, consequent) -> Optional[Dict]:
+        """Métricas de la regla antecedent → consequent, o None si el par no aparece"""
+        i = self._position(antecedent, consequent)
+        if i is None:
+            return None
+        forward = self.product_a[i] == antecedent
+        return {
+            "count": int(self.count[i]),
+            "support": float(self.support[i]),
+            "confidence": float(self.confidence_ab[i] if forward else self.confidence_ba[i]),
+            "lift": float(self.lift[i])
+        }
+
+    def top(self, limit: int = 20, by: str = "count") -> List[Dict]:
+        """Los `limit` pares con mayor `by` (count, support, lift) como dicts"""
+        values = getattr(self, by)
+        order = np.argsort(-values, kind="stable")[:limit]
+        return [
+            {
+                "product_a": self.product_a[i].item(),
+                "product_b": self.product_b[i].item(),
+                "count": int(self.count[i]),
+                "support": float(self.support[i]),
+                "confidence_ab": float(self.confidence_ab[i]),
+                "confidence_ba": float(self.confidence_ba[i]),
+                "lift": float(self.lift[i])
+            }
+            for i in order
+        ]
+
+
+def pair_statistics(matrix: BasketMatrix, min_count: int = 1, chunk_baskets: int = 200_000) -> PairStatistics:
+    """Calcula support, confidence (en ambos sentidos) y lift para todos los pares"""
+    a, b, count = matrix.cooccurrence(min_count=min_count, chunk_baskets=chunk_baskets)
+    return PairStatistics(matrix.product_ids, a, b, count, matrix.item_counts(), matrix.n_baskets)
@@ -0,0 +1,193 @@
+"""
+Similitud de contenido entre productos (TF-IDF + coseno).
+
+Cada producto se representa con los términos de su nombre, descripción,
+marca y categoría (marca y categoría como términos propios, p. ej.
+"marca:hp"). Los vectores TF-IDF se normalizan a norma 1, así el coseno es
+un producto punto. La similitud de un bloque de productos contra todo el
+catálogo se calcula con el índice invertido (término → productos) y
+np.bincount, sin bucles por par de productos.
+
+El índice no se guarda entre peticiones: cada cálculo (completo o de un
+producto) lo arma de nuevo desde la tabla products, así ningún worker
+trabaja con un catálogo viejo.
+"""
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+STOPWORDS = {
+    "de", "la", "el", "los", "las", "en", "con", "para", "por", "y", "o", "a", "al",
+    "del", "un", "una", "sin", "se", "su", "sus", "the", "and", "for", "with", "of"
+}
+# Con catálogos grandes se omiten términos presentes en más de esta fracción
+MAX_DF = 0.5
+MAX_DF_MIN_DOCS = 1000
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def _normalize(text: Optional[str]) -> str:
+    text = unicodedata.normalize("NFKD", str(text or "").lower())
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def product_terms(product: Dict) -> List[str]:
+    """Términos de un producto: palabras de nombre y descripción, marca y categoría"""
+    terms = []
+    for field in ("name", "description"):
+        terms.extend(
+            token for token in _TOKEN.findall(_normalize(product.get(field)))
+            if len(token) > 1 and token not in STOPWORDS
+        )
+    for field, prefix in (("brand", "marca"), ("category", "categoria")):
+        value = _normalize(product.get(field)).strip()
+        if value:
+            terms.append(f"{prefix}:{value}")
+    return terms
+
+
+class ContentIndex:
+    """Vectores TF-IDF de los productos y similitud coseno por bloques"""
+
+    def __init__(self):
+        self.vocabulary: Dict[str, int] = {}
+        self.idf = np.zeros(0, dtype=np.float32)
+        self._rows: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        self._compiled = None
+
+    @classmethod
+    def fit(cls, products: Iterable[Dict]) -> "ContentIndex":
+        """Vocabulario, IDF y vectores a partir del catálogo completo"""
+        index = cls()
+        documents = {product["id"]: Counter(product_terms(product)) for product in products}
+        n_docs = len(documents)
+
+        df = Counter()
+        for terms in documents.values():
+            df.update(terms.keys())
+        max_df = MAX_DF * n_docs if n_docs >= MAX_DF_MIN_DOCS else n_docs
+        terms = sorted(term for term, count in df.items() if count <= max_df)
+
+        index.vocabulary = {term: i for i, term in enumerate(terms)}
+        # IDF suavizado: log((1 + n) / (1 + df)) + 1
+        index.idf = np.array(
+            [math.log((1 + n_docs) / (1 + df[term])) + 1 for term in terms], dtype=np.float32
+        )
+        for product_id, counts in documents.items():
+            index._rows[product_id] = index._vectorize(counts)
+        return index
+
+    def _vectorize(self, counts: Counter) -> Tuple[np.ndarray, np.ndarray]:
+        pairs = sorted(
+            (self.vocabulary[term], count) for term, count in counts.items() if term in self.vocabulary
+        )
+        columns = np.array([column for column, _ in pairs], dtype=np.int64)
+        # tf sublineal: 1 + log(tf)
+        weights = np.array([1 + math.log(count) for _, count in pairs], dtype=np.float32)
+        weights *= self.idf[columns] if columns.size else 1
+        norm = float(np.linalg.norm(weights))
+        if norm > 0:
+            weights /= norm
+        return columns, weights
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, product_id) -> bool:
+        return product_id in self._rows
+
+    def _compile(self):
+        """CSR por producto y CSC por término (índice invertido)"""
+        if self._compiled is not None:
+            return self._compiled
+
+        product_ids = np.array(sorted(self._rows), dtype=np.int64)
+        sizes = np.array([self._rows[pid][0].size for pid in product_ids.tolist()], dtype=np.int64)
+        indptr = np.zeros(product_ids.size + 1, dtype=np.int64)
+        np.cumsum(sizes, out=indptr[1:])
+        if product_ids.size:
+            indices = np.concatenate([self._rows[pid][0] for pid in product_ids.tolist()])
+            data = np.concatenate([self._rows[pid][1] for pid in product_ids.tolist()])
+        else:
+            indices, data = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        rows = np.repeat(np.arange(product_ids.size), sizes)
+        order = np.argsort(indices, kind="stable")
+        term_ptr = np.zeros(self.idf.size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(indices, minlength=self.idf.size), out=term_ptr[1:])
+
+        self._compiled = (product_ids, indptr, indices, data, term_ptr, rows[order], data[order])
+        return self._compiled
+
+    def _block_scores(self, rows: np.ndarray) -> np.ndarray:
+        """Coseno de los productos `rows` (posiciones) contra todo el catálogo: (len(rows), n)"""
+        product_ids, indptr, indices, data, term_ptr, term_rows, term_data = self._compile()
+        n = product_ids.size
+
+        starts, ends = indptr[rows], indptr[rows + 1]
+        lengths = ends - starts
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        block_row = np.repeat(np.arange(rows.size), lengths)
+        terms, weights = indices[positions], data[positions]
+
+        # Cada término del bloque se cruza con los productos que lo contienen
+        df = term_ptr[terms + 1] - term_ptr[terms]
+        offsets = np.repeat(term_ptr[terms] - np.cumsum(df) + df, df) + np.arange(df.sum())
+        keys = np.repeat(block_row * n, df) + term_rows[offsets]
+        values = np.repeat(weights, df) * term_data[offsets]
+
+        scores = np.bincount(keys, weights=values, minlength=rows.size * n)
+        return scores.reshape(rows.size, n)
+
+    def scores_for(self, product_id) -> Dict[int, float]:
+        """Similitud de `product_id` con cada producto con puntaje > 0 (sin sí mismo)"""
+        product_ids = self._compile()[0]
+        if product_id not in self._rows:
+            return {}
+        row = int(np.searchsorted(product_ids, product_id))
+        scores = self._block_scores(np.array([row]))[0]
+        scores[row] = 0
+        hits = np.flatnonzero(scores > 0)
+        return dict(zip(product_ids[hits].tolist(), scores[hits].tolist()))
+
+    def top_k(self, k: int, product_ids: Optional[Iterable[int]] = None,
+              batch_size: int = 128) -> Iterable[Tuple[int, List[Tuple[int, float]]]]:
+        """Top-K vecinos por coseno, por bloques de `batch_size` productos.
+
+        Genera (product_id, [(vecino, puntaje)]) para `product_ids` (todos por
+        omisión). La memoria por bloque es batch_size × n puntajes.
+        """
+        all_ids = self._compile()[0]
+        if product_ids is None:
+            rows = np.arange(all_ids.size)
+        else:
+            wanted = np.array(sorted(pid for pid in set(product_ids) if pid in self._rows), dtype=np.int64)
+            rows = np.searchsorted(all_ids, wanted)
+        n = all_ids.size
+        keep = min(k, n - 1)
+        if not rows.size or keep <= 0:
+            return
+
+        for lo in range(0, rows.size, batch_size):
+            block = rows[lo:lo + batch_size]
+            scores = self._block_scores(block)
+            scores[np.arange(block.size), block] = 0  # sin sí mismo
+
+            # Particionar sobre -puntaje: los ceros (sin términos en común) quedan al final
+            top = np.argpartition(-scores, keep - 1, axis=1)[:, :keep]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.lexsort((all_ids[top], -top_scores), axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+            for i, row in enumerate(block.tolist()):
+                yield int(all_ids[row]), [
+                    (int(all_ids[column]), float(score))
+                    for column, score in zip(top[i], top_scores[i])
+                    if score > 0
+                ]
+
@@ -0,0 +1,200 @@
+"""
+Serie diaria de demanda por producto (tabla demand_series).
+
+Las unidades vendidas se guardan en bloques de BLOCK_DAYS días alineados
+desde EPOCH (un lunes): una fila por (bloque, producto con ventas en el
+bloque) con un arreglo denso de unidades por día. Leer N días de todo el
+catálogo es un rango sobre la clave primaria (block_start, product_id) y
+cada fila se copia tal cual a la matriz producto × día.
+
+Los días se cierran de forma incremental desde sales_daily_product (que
+mantienen los triggers): al leer se cierran los días terminados desde el
+último cierre, y se recalculan los últimos DEMAND_SERIES_RESYNC_DAYS para
+recoger correcciones tardías. backfill() recalcula cualquier rango.
+
+Las escrituras usan una conexión propia y confirman al terminar cada tramo:
+llamadas desde una request no quedan dentro de su unidad de trabajo, así el
+lock y los bloques no se retienen mientras dura el ajuste del modelo.
+"""
+from datetime import date, timedelta
+from typing import List, Optional, Sequence, Tuple
+import logging
+import numpy as np
+from psycopg2.extras import execute_values
+from config import Config
+from database.connection import get_cursor
+from models.demand_engine import DemandMatrix
+from utils.store_time import store_today
+
+logger = logging.getLogger(__name__)
+
+BLOCK_DAYS = 28
+EPOCH = date(2000, 1, 3)
+# Bloques recalculados por transacción durante un backfill (~1 año)
+BACKFILL_BLOCKS = 13
+
+
+def block_start(day: date) -> date:
+    """Inicio del bloque que contiene `day`"""
+    return day - timedelta(days=(day - EPOCH).days % BLOCK_DAYS)
+
+
+def dense_blocks(rows: Sequence[Tuple[date, int, float]], first_block: date,
+                 last_day: date) -> List[Tuple[date, int, List[int]]]:
+    """Filas (día, producto, unidades) → [(block_start, producto, unidades por día)].
+
+    Los días posteriores a `last_day` quedan en 0. Se omiten los bloques sin ventas.
+    """
+    if not rows:
+        return []
+    days = np.array([(row[0] - first_block).days for row in rows], dtype=np.int64)
+    products = np.array([row[1] for row in rows], dtype=np.int64)
+    units = np.array([row[2] for row in rows], dtype=np.int64)
+    keep = (days >= 0) & (days <= (last_day - first_block).days)
+    days, products, units = days[keep], products[keep], units[keep]
+
+    keys = np.stack([days // BLOCK_DAYS, products], axis=1)
+    blocks, inverse = np.unique(keys, axis=0, return_inverse=True)
+    dense = np.zeros((blocks.shape[0], BLOCK_DAYS), dtype=np.int64)
+    np.add.at(dense, (inverse.ravel(), days % BLOCK_DAYS), units)
+
+    nonzero = dense.any(axis=1)
+    return [
+        (first_block + timedelta(days=int(block) * BLOCK_DAYS), int(product_id), values)
+        for (block, product_id), values in zip(blocks[nonzero].tolist(), dense[nonzero].tolist())
+    ]
+
+
+def blocks_to_matrix(rows: Sequence[Tuple[date, int, Sequence[int]]], start: date, n_days: int,
+                     product_ids: Optional[Sequence[int]] = None) -> DemandMatrix:
+    """Filas (block_start, producto, unidades) de demand_series → DemandMatrix desde `start`"""
+    if product_ids is None:
+        ids = np.unique(np.array([row[1] for row in rows], dtype=np.int64))
+    else:
+        ids = np.asarray(product_ids, dtype=np.int64)
+    values = np.zeros((ids.size, n_days))
+    if not rows or not ids.size:
+        return DemandMatrix(ids, start, values)
+
+    keys = np.array([row[1] for row in rows], dtype=np.int64)
+    offsets = np.array([(row[0] - start).days for row in rows], dtype=np.int64)
+    units = np.array([row[2] for row in rows], dtype=np.float64)
+
+    order = np.argsort(ids, kind="stable")
+    positions = np.searchsorted(ids[order], keys).clip(max=ids.size - 1)
+    matrix_rows = order[positions]
+    known = ids[matrix_rows] == keys
+
+    columns = offsets[:, None] + np.arange(BLOCK_DAYS)
+    inside = known[:, None] & (columns >= 0) & (columns < n_days)
+    # (bloque, producto) es único: cada celda se escribe una sola vez
+    values[np.broadcast_to(matrix_rows[:, None], columns.shape)[inside], columns[inside]] = units[inside]
+    return DemandMatrix(ids, start, values)
+
+
+class DemandSeriesStore:
+    """Lectura y cierre de demand_series"""
+
+    def closed_through(self) -> Optional[date]:
+        """Último día cerrado, o None si la serie nunca se cargó"""
+        with get_cursor() as cur:
+            cur.execute("SELECT closed_through FROM demand_series_state")
+            row = cur.fetchone()
+        return row[0] if row else None
+
+    def _write_blocks(self, cur, first_block: date, last_day: date):
+        """Recalcular los bloques desde `first_block` hasta el que contiene `last_day`"""
+        # Escrituras de a una (workers o backfill en paralelo); se libera con la transacción
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext('demand_series'))")
+        cur.execute("""
+            SELECT day, product_id, units
+            FROM sales_daily_product
+            WHERE day >= %s AND day <= %s AND units <> 0
+        """, (first_block, last_day))
+        blocks = dense_blocks(cur.fetchall(), first_block, last_day)
+
+        cur.execute("""
+            DELETE FROM demand_series
+            WHERE block_start >= %s AND block_start <= %s
+        """, (first_block, block_start(last_day)))
+        if blocks:
+            execute_values(cur, """
+                INSERT INTO demand_series (block_start, product_id, units)
+                VALUES %s
+            """, blocks)
+        return len(blocks)
+
+    def _set_closed_through(self, cur, day: date):
+        cur.execute("""
+            INSERT INTO demand_series_state (id, closed_through) VALUES (TRUE, %s)
+            ON CONFLICT (id) DO UPDATE SET closed_through = EXCLUDED.closed_through
+        """, (day,))
+
+    def backfill(self, start: Optional[date] = None, end: Optional[date] = None) -> int:
+        """Recalcular los bloques de [start, end] (por omisión todo el historial hasta ayer).
+
+        Se procesa por tramos de BACKFILL_BLOCKS bloques. Si `end` alcanza o
+        supera el último cierre, el cierre avanza hasta `end`.
+        """
+        end = end or store_today() - timedelta(days=1)
+        closed = self.closed_through()
+        # El último bloque se reescribe entero: no perder días ya cerrados después de `end`
+        write_end = end
+        if closed is not None and closed > end:
+            write_end = min(closed, block_start(end) + timedelta(days=BLOCK_DAYS - 1))
+        if start is None:
+            with get_cursor() as cur:
+                cur.execute("SELECT MIN(day) FROM sales_daily_product")
+                start = cur.fetchone()[0] or end
+        written = 0
+        first = block_start(start)
+        while first <= write_end:
+            last = min(first + timedelta(days=BACKFILL_BLOCKS * BLOCK_DAYS - 1), write_end)
+            with get_cursor(commit=True, own_connection=True) as cur:
+                written += self._write_blocks(cur, first, last)
+            first += timedelta(days=BACKFILL_BLOCKS * BLOCK_DAYS)
+
+        with get_cursor(commit=True, own_connection=True) as cur:
+            cur.execute("SELECT closed_through FROM demand_series_state FOR UPDATE")
+            row = cur.fetchone()
+            if row is None or row[0] <= end:
+                self._set_closed_through(cur, end)
+        logger.info(f"demand_series: {written} bloques recalculados del {start} al {end}")
+        return written
+
+    def ensure_closed(self, until: Optional[date] = None) -> date:
+        """Cerrar los días terminados hasta `until` (por omisión ayer) y devolver el último cierre.
+
+        Un lock de transacción evita que dos workers cierren a la vez; el que
+        espera vuelve a leer el estado y, si ya está al día, no hace nada.
+        """
+        until = until or store_today() - timedelta(days=1)
+        closed = self.closed_through()
+        if closed is not None and closed >= until:
+            return closed
+        if closed is None:
+            self.backfill(end=until)
+            return until
+
+        with get_cursor(commit=True, own_connection=True) as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext('demand_series'))")
+            cur.execute("SELECT closed_through FROM demand_series_state")
+            closed = cur.fetchone()[0]
+            if closed < until:
+                resync_from = closed + timedelta(days=1 - max(Config.DEMAND_SERIES_RESYNC_DAYS, 0))
+                self._write_blocks(cur, block_start(resync_from), until)
+                self._set_closed_through(cur, until)
+        return until
+
+    def load_matrix(self, start: date, n_days: int,
+                    product_ids: Optional[Sequence[int]] = None) -> DemandMatrix:
+        """Matriz producto × día de [start, start + n_days) con un rango sobre block_start"""
+        end = start + timedelta(days=n_days - 1)
+        with get_cursor() as cur:
+            cur.execute("""
+                SELECT block_start, product_id, units
+                FROM demand_series
+                WHERE block_start >= %s AND block_start <= %s
+            """, (block_start(start), end))
+            rows = cur.fetchall()
+        return blocks_to_matrix(rows, start, n_days, product_ids)
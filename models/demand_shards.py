@@ -0,0 +1,122 @@
+"""
+Ajuste de modelos de demanda en paralelo, por fragmentos de productos.
+
+Las series se reparten en fragmentos (por categoría y, dentro de cada una,
+en tramos de a lo sumo FORECAST_SHARD_ROWS productos) que se ajustan en un
+ProcessPoolExecutor. Como cada serie se ajusta de forma independiente, el
+resultado unido por índice de fila es idéntico al de una sola llamada, sin
+importar el orden en que terminen los fragmentos.
+
+El pool es del proceso actual (se recrea tras un fork) y usa forkserver:
+los procesos hijos no heredan hilos ni conexiones del worker web.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Optional, Sequence
+import numpy as np
+from config import Config
+from models.demand_engine import BacktestResult, ForecastResult
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_key = None
+_pool_lock = threading.Lock()
+
+
+def worker_count() -> int:
+    """Procesos del pool: FORECAST_WORKERS, o todos los núcleos si es 0"""
+    return Config.FORECAST_WORKERS or os.cpu_count() or 1
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Pool de procesos del proceso actual (se recrea tras un fork o si cambia el tamaño)"""
+    global _pool, _pool_key
+
+    key = (os.getpid(), workers)
+    with _pool_lock:
+        if _pool is None or _pool_key != key:
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+            _pool_key = key
+    return _pool
+
+
+def _reset_pool():
+    global _pool, _pool_key
+
+    with _pool_lock:
+        if _pool is not None and _pool_key[0] == os.getpid():
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool, _pool_key = None, None
+
+
+def shard_rows(groups: Optional[Sequence], n_series: int, max_rows: int) -> List[np.ndarray]:
+    """Filas de cada fragmento: por grupo (p. ej. categoría) y en tramos de `max_rows`.
+
+    El orden es determinista: grupos ordenados y filas ascendentes.
+    """
+    if groups is None:
+        blocks = [np.arange(n_series)]
+    else:
+        _, codes = np.unique(np.asarray(groups, dtype=object).astype(str), return_inverse=True)
+        order = np.argsort(codes, kind="stable")
+        bounds = np.flatnonzero(np.diff(codes[order])) + 1
+        blocks = np.split(order, bounds) if n_series else []
+    max_rows = max(max_rows, 1)
+    return [block[i:i + max_rows] for block in blocks for i in range(0, block.size, max_rows)]
+
+
+def _log_progress(done: int, total: int, shards_done: int, shards: int):
+    logger.info(f"Predicción de demanda: {done}/{total} productos ({shards_done}/{shards} fragmentos)")
+
+
+def fit_sharded(function: Callable, values, *args, groups: Optional[Sequence] = None,
+                workers: Optional[int] = None, max_rows: Optional[int] = None,
+                progress: Optional[Callable[[int, int, int, int], None]] = None, **kwargs):
+    """function(values[filas], *args, **kwargs) por fragmento en paralelo, con los resultados unidos.
+
+    `function` es holt_winters o rolling_origin (funciones de módulo, para
+    poder enviarlas a otro proceso). `progress(productos, total, fragmentos,
+    total_fragmentos)` se llama al terminar cada fragmento. Con un solo
+    worker o pocas series se ajusta todo en este proceso.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n_series = values.shape[0]
+    workers = workers or worker_count()
+    progress = progress or _log_progress
+    if workers <= 1 or n_series < Config.FORECAST_PARALLEL_MIN_SERIES:
+        result = function(values, *args, **kwargs)
+        progress(n_series, n_series, 1, 1)
+        return result
+
+    shards = shard_rows(groups, n_series, max_rows or Config.FORECAST_SHARD_ROWS)
+    started = time.perf_counter()
+    parts: List = [None] * len(shards)
+    try:
+        pool = _get_pool(workers)
+        # Los fragmentos grandes primero: el último en terminar es uno chico
+        order = sorted(range(len(shards)), key=lambda i: (-shards[i].size, i))
+        futures = {pool.submit(function, values[shards[i]], *args, **kwargs): i for i in order}
+        done = 0
+        for shards_done, future in enumerate(as_completed(futures), start=1):
+            i = futures[future]
+            parts[i] = future.result()
+            done += shards[i].size
+            progress(done, n_series, shards_done, len(shards))
+    except BrokenProcessPool:
+        # Un hijo murió (p. ej. por memoria): se descarta el pool y se ajusta aquí
+        logger.exception("Pool de predicción caído; se ajusta en el proceso actual")
+        _reset_pool()
+        return function(values, *args, **kwargs)
+
+    result_type = ForecastResult if isinstance(parts[0], ForecastResult) else BacktestResult
+    result = result_type.combine(parts, shards, n_series)
+    logger.info(f"Predicción de demanda: {n_series} productos en {len(shards)} fragmentos, "
+                f"{workers} procesos, {time.perf_counter() - started:.2f}s")
+    return result
@@ -0,0 +1,145 @@
+"""
+Minería de conjuntos frecuentes (FP-Growth).
+
+Las canastas se comprimen en un FP-tree: cada canasta es un camino desde
+la raíz con sus productos ordenados por frecuencia, y las canastas que
+comparten prefijo comparten nodos. Los conjuntos se extraen de forma
+recursiva con árboles condicionales; solo se visitan combinaciones cuyos
+prefijos ya son frecuentes, nunca todos los subconjuntos de cada canasta.
+"""
+import math
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+
+
+class _Node:
+    __slots__ = ("item", "count", "parent", "children")
+
+    def __init__(self, item, parent):
+        self.item = item
+        self.count = 0
+        self.parent = parent
+        self.children = {}
+
+
+class FPTree:
+    """FP-tree sobre rangos de frecuencia (0 = producto más frecuente)"""
+
+    def __init__(self):
+        self.root = _Node(None, None)
+        self.header: Dict[int, List[_Node]] = {}
+
+    def insert(self, ranks: Iterable[int], count: int = 1):
+        """Agrega un camino (rangos ya ordenados) con peso `count`"""
+        node = self.root
+        for rank in ranks:
+            child = node.children.get(rank)
+            if child is None:
+                child = _Node(rank, node)
+                node.children[rank] = child
+                self.header.setdefault(rank, []).append(child)
+            child.count += count
+            node = child
+
+    def prefix_paths(self, rank: int) -> List[Tuple[List[int], int]]:
+        """Base de patrones condicional de `rank`: caminos hacia la raíz y su peso"""
+        paths = []
+        for node in self.header[rank]:
+            path = []
+            parent = node.parent
+            while parent.item is not None:
+                path.append(parent.item)
+                parent = parent.parent
+            if path:
+                path.reverse()
+                paths.append((path, node.count))
+        return paths
+
+
+def _build_tree(paths: Iterable[Tuple[Iterable[int], int]], min_count: int) -> FPTree:
+    """Árbol condicional con los rangos que alcanzan `min_count` en `paths`"""
+    paths = list(paths)
+    counts = Counter()
+    for path, count in paths:
+        for rank in path:
+            counts[rank] += count
+
+    tree = FPTree()
+    for path, count in paths:
+        kept = [rank for rank in path if counts[rank] >= min_count]
+        if kept:
+            tree.insert(kept, count)
+    return tree
+
+
+def _mine(tree: FPTree, suffix: Tuple[int, ...], min_count: int, max_length: int,
+          out: List[Tuple[Tuple[int, ...], int]]):
+    # Del menos al más frecuente: cada conjunto se genera una sola vez
+    for rank in sorted(tree.header, reverse=True):
+        support = sum(node.count for node in tree.header[rank])
+        if support < min_count:
+            continue
+        itemset = (rank,) + suffix
+        out.append((itemset, support))
+        if len(itemset) < max_length:
+            conditional = _build_tree(tree.prefix_paths(rank), min_count)
+            if conditional.header:
+                _mine(conditional, itemset, min_count, max_length, out)
+
+
+def fp_growth(transactions: Iterable[Iterable[int]], min_count: int,
+              max_length: int = 4) -> List[Tuple[Tuple[int, ...], int]]:
+    """Conjuntos de productos presentes en al menos `min_count` canastas.
+
+    Devuelve [(productos ordenados, canastas)] con conjuntos de 1 a
+    `max_length` productos.
+    """
+    # Canastas idénticas se insertan una sola vez con su peso
+    baskets = Counter(frozenset(items) for items in transactions)
+    item_counts = Counter()
+    for items, count in baskets.items():
+        for item in items:
+            item_counts[item] += count
+
+    frequent = sorted(
+        (item for item, count in item_counts.items() if count >= min_count),
+        key=lambda item: (-item_counts[item], item)
+    )
+    if not frequent or max_length < 1:
+        return []
+    rank_of = {item: rank for rank, item in enumerate(frequent)}
+
+    tree = FPTree()
+    for items, count in baskets.items():
+        ranks = sorted(rank_of[item] for item in items if item in rank_of)
+        if ranks:
+            tree.insert(ranks, count)
+
+    mined: List[Tuple[Tuple[int, ...], int]] = []
+    _mine(tree, (), min_count, max_length, mined)
+    return [(tuple(sorted(frequent[rank] for rank in ranks)), count) for ranks, count in mined]
+
+
+def frequent_itemsets(matrix, min_support: float, max_length: int = 4,
+                      min_length: int = 2) -> List[Tuple[Tuple, int]]:
+    """FP-Growth sobre una BasketMatrix.
+
+    `min_support` es la fracción mínima de canastas (0–1). Devuelve
+    [(ids de producto, canastas)] de `min_length` a `max_length` productos,
+    de mayor a menor soporte.
+    """
+    min_count = max(1, math.ceil(min_support * matrix.n_baskets))
+    transactions = (
+        matrix.indices[matrix.indptr[i]:matrix.indptr[i + 1]].tolist()
+        for i in range(matrix.n_baskets)
+        if matrix.indptr[i + 1] - matrix.indptr[i] >= min_length
+    )
+    product_ids = np.asarray(matrix.product_ids)
+    itemsets = [
+        (tuple(product_ids[list(columns)].tolist()), count)
+        for columns, count in fp_growth(transactions, min_count, max_length)
+        if len(columns) >= min_length
+    ]
+    itemsets.sort(key=lambda entry: (-entry[1], -len(entry[0]), entry[0]))
+    return itemsets
@@ -0,0 +1,206 @@
+"""
+Índice de vecinos en disco, compartido entre workers con mmap.
+
+Para cada producto guarda sus K vecinos más fuertes (por confianza de la
+regla producto → vecino) en arreglos de ancho fijo:
+
+    encabezado (64 bytes)
+    product_ids  int64[n]        ordenados, para búsqueda binaria
+    neighbors    int64[n, k]     ids de vecinos, -1 = vacío
+    confidence   float32[n, k]   P(vecino | producto)
+    lift         float32[n, k]
+    count        int32[n, k]     canastas con ambos
+    item_counts  int32[n]        canastas con cada producto
+
+Con item_counts, rule() también responde si el par solo está en el top-K
+del otro producto (conteo del par / canastas del antecedente).
+
+El archivo se reemplaza de forma atómica (os.replace) y se abre de solo
+lectura con mmap: todos los workers comparten la misma copia en la caché
+de páginas del sistema y un worker reciclado lo abre sin recalcular nada.
+"""
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Dict, List, Optional
+import numpy as np
+
+MAGIC = b"RNX1"
+HEADER = struct.Struct("<4sIIIdQQ")
+HEADER_SIZE = 64
+EMPTY = -1
+# Formato 2: agrega item_counts; los archivos anteriores se regeneran
+FORMAT = 2
+
+
+def build_neighbor_arrays(stats, k: int) -> Dict[str, np.ndarray]:
+    """Top-K vecinos por producto a partir de un PairStatistics"""
+    n = int(stats.product_ids.size)
+    neighbors = np.full((n, k), EMPTY, dtype=np.int64)
+    confidence = np.zeros((n, k), dtype=np.float32)
+    lift = np.zeros((n, k), dtype=np.float32)
+    count = np.zeros((n, k), dtype=np.int32)
+
+    # Cada par aporta una regla en cada sentido
+    src = np.concatenate([stats.columns_a, stats.columns_b])
+    dst = np.concatenate([stats.columns_b, stats.columns_a])
+    conf = np.concatenate([stats.confidence_ab, stats.confidence_ba])
+    pair_lift = np.concatenate([stats.lift, stats.lift])
+    pair_count = np.concatenate([stats.count, stats.count])
+
+    if src.size and k > 0:
+        order = np.lexsort((dst, -pair_count, -conf, src))
+        src, dst = src[order], dst[order]
+        rank = np.arange(src.size) - np.searchsorted(src, src, side="left")
+        keep = rank < k
+        rows, cols = src[keep], rank[keep]
+        neighbors[rows, cols] = stats.product_ids[dst[keep]]
+        confidence[rows, cols] = conf[order][keep]
+        lift[rows, cols] = pair_lift[order][keep]
+        count[rows, cols] = pair_count[order][keep]
+
+    return {
+        "product_ids": np.asarray(stats.product_ids, dtype=np.int64),
+        "neighbors": neighbors,
+        "confidence": confidence,
+        "lift": lift,
+        "count": count,
+        "item_counts": np.asarray(stats.item_counts, dtype=np.int32),
+        "n_baskets": int(stats.n_baskets)
+    }
+
+
+def write_neighbor_index(path: str, arrays: Dict, data_version: int = 0):
+    """Escribir el índice en un temporal y reemplazar `path` de forma atómica"""
+    product_ids = arrays["product_ids"]
+    n, k = arrays["neighbors"].shape
+    header = HEADER.pack(MAGIC, FORMAT, n, k, time.time(), data_version, arrays["n_baskets"])
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header.ljust(HEADER_SIZE, b"\0"))
+        f.write(product_ids.astype("<i8").tobytes())
+        f.write(arrays["neighbors"].astype("<i8").tobytes())
+        f.write(arrays["confidence"].astype("<f4").tobytes())
+        f.write(arrays["lift"].astype("<f4").tobytes())
+        f.write(arrays["count"].astype("<i4").tobytes())
+        f.write(arrays["item_counts"].astype("<i4").tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class NeighborIndex:
+    """Vista de solo lectura (mmap) de un índice de vecinos"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.file_id = (stat.st_ino, stat.st_mtime_ns)
+
+        magic, fmt, n, k, built_at, data_version, n_baskets = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or fmt != FORMAT:
+            raise ValueError(f"Índice de vecinos con formato desconocido: {path}")
+        self.k = k
+        self.built_at = built_at
+        self.data_version = data_version
+        self.n_baskets = n_baskets
+
+        offset = HEADER_SIZE
+        self.product_ids, offset = self._array("<i8", n, offset)
+        self.neighbors, offset = self._array("<i8", n * k, offset, (n, k))
+        self.confidence, offset = self._array("<f4", n * k, offset, (n, k))
+        self.lift, offset = self._array("<f4", n * k, offset, (n, k))
+        self.count, offset = self._array("<i4", n * k, offset, (n, k))
+        self.item_counts, offset = self._array("<i4", n, offset)
+
+    def _array(self, dtype, size, offset, shape=None):
+        array = np.frombuffer(self._mmap, dtype=dtype, count=size, offset=offset)
+        if shape:
+            array = array.reshape(shape)
+        return array, offset + size * np.dtype(dtype).itemsize
+
+    def __len__(self) -> int:
+        return int(self.product_ids.size)
+
+    def _row(self, product_id) -> Optional[int]:
+        i = int(np.searchsorted(self.product_ids, product_id))
+        if i < self.product_ids.size and self.product_ids[i] == product_id:
+            return i
+        return None
+
+    def neighbors_of(self, product_id, limit: Optional[int] = None) -> List[Dict]:
+        """Vecinos de `product_id` de mayor a menor confianza"""
+        row = self._row(product_id)
+        if row is None:
+            return []
+        ids = self.neighbors[row]
+        size = int(np.count_nonzero(ids != EMPTY))
+        if limit is not None:
+            size = min(size, limit)
+        return [
+            {
+                "id": int(ids[j]),
+                "confidence": float(self.confidence[row, j]),
+                "lift": float(self.lift[row, j]),
+                "count": int(self.count[row, j])
+            }
+            for j in range(size)
+        ]
+
+    def rule(self, antecedent, consequent) -> Optional[Dict]:
+        """Métricas de antecedent → consequent si el par está en el top-K de alguno de los dos"""
+        row = self._row(antecedent)
+        if row is None:
+            return None
+        hits = np.flatnonzero(self.neighbors[row] == consequent)
+        if hits.size:
+            j = int(hits[0])
+            count = int(self.count[row, j])
+            confidence = float(self.confidence[row, j])
+            lift = float(self.lift[row, j])
+        else:
+            # El conteo y el lift del par son simétricos: se leen de la fila del consecuente
+            other = self._row(consequent)
+            if other is None:
+                return None
+            hits = np.flatnonzero(self.neighbors[other] == antecedent)
+            if not hits.size:
+                return None
+            j = int(hits[0])
+            count = int(self.count[other, j])
+            confidence = count / max(int(self.item_counts[row]), 1)
+            lift = float(self.lift[other, j])
+        return {
+            "count": count,
+            "support": count / max(self.n_baskets, 1),
+            "confidence": confidence,
+            "lift": lift
+        }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def open_neighbor_index(path: str) -> Optional[NeighborIndex]:
+    """Índice mapeado del proceso; se vuelve a abrir si el archivo fue reemplazado"""
+    global _index
+
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    with _index_lock:
+        if _index is None or _index.file_id != (stat.st_ino, stat.st_mtime_ns):
+            try:
+                _index = NeighborIndex(path)
+            except ValueError:
+                # Formato anterior: se trata como ausente y se regenera
+                _index = None
+                return None
+        return _index
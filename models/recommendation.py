@@ -1,38 +1,97 @@
-import psycopg2
+from database.connection import get_cursor, stream_query
 from config import Config
-from collections import defaultdict, Counter
-from typing import List, Dict, Tuple
+from utils.store_time import days_ago_start, store_now, to_db_timestamp
+from utils.product_index import ProductIndex
+from models.basket_engine import BasketMatrix, PairStatistics, pair_statistics
+from models.fp_growth import frequent_itemsets
+from models.neighbor_index import NeighborIndex, open_neighbor_index
+from models.content_similarity import ContentIndex
+from models import upsell
+from models.upsell import UpsellIndex
+from psycopg2.extras import execute_values
+from functools import cached_property
+from typing import List, Dict, Tuple, Optional
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class RecommendationSystem:
-    def __init__(self):
-        self.conn_params = Config.get_database_config()
+# Los cálculos de product_similarity (completos o por producto) se
+# serializan entre procesos con este advisory lock de transacción
+SIMILARITY_LOCK = "SELECT pg_advisory_xact_lock(hashtext('product_similarity'))"
+
+class RecommendationContext:
+    """Datos compartidos por un cálculo de recomendaciones.
+
+    Productos e historial de ventas se leen una sola vez (al primer uso) y
+    los pares frecuentes se calculan una sola vez; todas las secciones de
+    get_all_recommendations se derivan de esta misma instantánea.
+    """
+
+    def __init__(self, system: "RecommendationSystem"):
+        self._system = system
+
+    @cached_property
+    def products(self) -> List[Dict]:
+        return self._system.get_all_products()
+
+    @cached_property
+    def index(self) -> ProductIndex:
+        """Productos por id"""
+        return ProductIndex(self.products)
+
+    @cached_property
+    def frequent_pairs(self) -> List[Tuple]:
+        return self._system.get_frequently_bought_together()
+
+    @cached_property
+    def itemsets(self) -> List[Tuple[List[int], int]]:
+        return self._system.get_frequent_itemsets()
 
-    def _get_connection(self):
-        """Obtener conexión a la base de datos"""
-        return psycopg2.connect(**self.conn_params)
+    @cached_property
+    def pair_stats(self) -> PairStatistics:
+        """Support, confidence y lift de todos los pares"""
+        return self._system.get_pair_statistics()
 
+    @cached_property
+    def neighbor_index(self) -> Optional[NeighborIndex]:
+        """Índice de vecinos compartido (mmap), si ya fue generado"""
+        return self._system.get_neighbor_index()
+
+    @cached_property
+    def upsell_index(self) -> UpsellIndex:
+        """Alternativas más caras por categoría y nivel de marca"""
+        return self._system.build_upsell_index(self.products)
+
+    def rule(self, antecedent, consequent) -> Optional[Dict]:
+        """Métricas de antecedent → consequent, siempre con la misma escala.
+
+        Se leen del índice compartido; si el par no está en su top-K (o no
+        hay índice) se calculan los pares en memoria.
+        """
+        index = self.neighbor_index
+        if index is not None:
+            rule = index.rule(antecedent, consequent)
+            if rule is not None:
+                return rule
+        return self.pair_stats.rule(antecedent, consequent)
+
+class RecommendationSystem:
     # ---------- DATOS REALES DE LA BASE DE DATOS ----------
 
     def get_all_products(self) -> List[Dict]:
         """Obtener todos los productos activos"""
-        conn = self._get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT 
-                product_id, code, name, description, category, unit,
-                minimum_stock, current_stock, price, barcode, brand,
-                cost_price, maximum_stock, tax_rate, supplier, location
-            FROM products 
-            WHERE current_stock > 0 AND price > 0
-            ORDER BY name
-        """)
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
+        with get_cursor() as cur:
+            cur.execute("""
+                SELECT 
+                    product_id, code, name, description, category, unit,
+                    minimum_stock, current_stock, price, barcode, brand,
+                    cost_price, maximum_stock, tax_rate, supplier, location
+                FROM products 
+                WHERE current_stock > 0 AND price > 0
+                ORDER BY name
+            """)
+            rows = cur.fetchall()
         
         products = []
         for row in rows:
@@ -56,156 +115,396 @@ class RecommendationSystem:
             })
         return products
 
-    def get_sales_with_details(self, limit: int = 1000) -> List[Dict]:
-        """Obtener historial de ventas con detalles"""
-        conn = self._get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT 
-                s.sale_id, s.date, s.total,
-                sd.product_id, sd.quantity, sd.price as sale_price,
-                p.name, p.category, p.code
-            FROM sales s
-            JOIN sale_details sd ON s.sale_id = sd.sale_id
-            JOIN products p ON sd.product_id = p.product_id
-            WHERE s.date >= CURRENT_DATE - INTERVAL '180 days'
-            ORDER BY s.date DESC
-            LIMIT %s
-        """, (limit,))
-        
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
-        
-        sales = []
-        for row in rows:
-            sales.append({
-                "sale_id": row[0],
-                "date": row[1],
-                "total": float(row[2]),  # Convertir a float
-                "product_id": row[3],
-                "quantity": row[4],
-                "sale_price": float(row[5]),  # Convertir a float
-                "product_name": row[6],
-                "category": row[7],
-                "product_code": row[8]
-            })
-        return sales
-
     # ---------- ALGORITMOS DE RECOMENDACIÓN ----------
 
-    def get_frequently_bought_together(self) -> List[Tuple]:
-        """Market Basket Analysis - Productos que se compran juntos"""
-        sales_data = self.get_sales_with_details(1000)
-        
-        if not sales_data:
+    def _pair_filters(self) -> Tuple[str, str, list, list]:
+        """Condición de ventana y expresión de puntaje para product_pairs.
+
+        Con vida media configurada, el conteo se pondera por la antigüedad
+        de la última venta en que el par apareció junto.
+        """
+        where, where_params = "pair_count > 0", []
+        if Config.RECO_PAIR_WINDOW_DAYS > 0:
+            where += " AND last_seen >= %s"
+            where_params.append(days_ago_start(Config.RECO_PAIR_WINDOW_DAYS))
+
+        score, score_params = "pair_count", []
+        if Config.RECO_PAIR_HALF_LIFE_DAYS > 0:
+            score = ("pair_count * power(0.5, GREATEST(EXTRACT(EPOCH FROM (%s - last_seen)), 0)"
+                     " / 86400.0 / %s)")
+            score_params = [to_db_timestamp(store_now()), Config.RECO_PAIR_HALF_LIFE_DAYS]
+        return where, score, where_params, score_params
+
+    def get_frequently_bought_together(self, limit: int = 20) -> List[Tuple]:
+        """Market Basket Analysis - Pares de productos más comprados juntos.
+
+        Lee el top-K de product_pairs (mantenida por trigger con todo el
+        historial) en lugar de recalcular los pares en cada llamada.
+        """
+        where, score, where_params, score_params = self._pair_filters()
+        with get_cursor() as cur:
+            cur.execute(f"""
+                SELECT product_a, product_b, pair_count
+                FROM product_pairs
+                WHERE {where}
+                ORDER BY {score} DESC, product_a, product_b
+                LIMIT %s
+            """, (*where_params, *score_params, limit))
+            rows = cur.fetchall()
+        
+        if not rows:
             logger.warning("No hay datos de ventas para análisis")
+        return [((row[0], row[1]), row[2]) for row in rows]
+
+    def get_product_neighbors(self, product_id: int, limit: int = 10) -> List[Tuple[int, int]]:
+        """Productos más comprados junto con `product_id`: [(otro_id, conteo)]"""
+        where, score, where_params, score_params = self._pair_filters()
+        with get_cursor() as cur:
+            cur.execute(f"""
+                SELECT CASE WHEN product_a = %s THEN product_b ELSE product_a END, pair_count
+                FROM product_pairs
+                WHERE (product_a = %s OR product_b = %s) AND {where}
+                ORDER BY {score} DESC
+                LIMIT %s
+            """, (product_id, product_id, product_id, *where_params, *score_params, limit))
+            return [(row[0], row[1]) for row in cur.fetchall()]
+
+    def get_basket_matrix(self, days: int = 180) -> BasketMatrix:
+        """Matriz canasta × producto de las ventas de los últimos `days` días"""
+        batches = stream_query("""
+            SELECT sd.sale_id, sd.product_id
+            FROM sale_details sd
+            JOIN sales s ON s.sale_id = sd.sale_id
+            WHERE s.date >= %s
+        """, (days_ago_start(days),))
+        return BasketMatrix.from_batches(batches)
+
+    def get_pair_statistics(self, days: int = 180, min_count: int = 1) -> PairStatistics:
+        """Support, confidence y lift de cada par, calculados sobre la matriz de canastas"""
+        matrix = self.get_basket_matrix(days)
+        stats = pair_statistics(matrix, min_count=min_count)
+        logger.info(f"Encontrados {len(stats)} pares de productos de {matrix.n_baskets} ventas")
+        return stats
+
+    def refresh_frequent_itemsets(self, min_support: Optional[float] = None,
+                                  max_length: Optional[int] = None,
+                                  days: Optional[int] = None) -> int:
+        """Minar conjuntos frecuentes (FP-Growth) y reemplazar frequent_itemsets"""
+        min_support = Config.FP_MIN_SUPPORT if min_support is None else min_support
+        max_length = Config.FP_MAX_LENGTH if max_length is None else max_length
+        days = Config.FP_WINDOW_DAYS if days is None else days
+
+        matrix = self.get_basket_matrix(days)
+        itemsets = frequent_itemsets(matrix, min_support, max_length)
+        n_baskets = max(matrix.n_baskets, 1)
+
+        with get_cursor(commit=True) as cur:
+            cur.execute("DELETE FROM frequent_itemsets")
+            if itemsets:
+                execute_values(cur, """
+                    INSERT INTO frequent_itemsets (items, size, support_count, support)
+                    VALUES %s
+                """, [(list(items), len(items), count, count / n_baskets) for items, count in itemsets])
+
+        logger.info(f"Encontrados {len(itemsets)} conjuntos frecuentes de {matrix.n_baskets} ventas")
+        return len(itemsets)
+
+    def get_frequent_itemsets(self, min_size: int = 2, limit: int = 20) -> List[Tuple[List[int], int]]:
+        """Conjuntos frecuentes guardados: [(product_ids, canastas)], los más grandes primero a igual soporte"""
+        with get_cursor() as cur:
+            cur.execute("""
+                SELECT items, support_count
+                FROM frequent_itemsets
+                WHERE size >= %s
+                ORDER BY support_count DESC, size DESC, items
+                LIMIT %s
+            """, (min_size, limit))
+            return [(list(row[0]), row[1]) for row in cur.fetchall()]
+
+    def get_neighbor_index(self) -> Optional[NeighborIndex]:
+        """Índice de vecinos en disco compartido por los workers (None si no existe)"""
+        return open_neighbor_index(Config.RECO_INDEX_PATH)
+
+    # ---------- SIMILITUD DE CONTENIDO ----------
+
+    def get_catalog_texts(self, product_ids: Optional[List[int]] = None) -> List[Dict]:
+        """Texto de los productos (todos o `product_ids`) para el índice de contenido"""
+        query = "SELECT product_id, name, description, brand, category FROM products"
+        params = ()
+        if product_ids is not None:
+            query += " WHERE product_id = ANY(%s)"
+            params = (list(product_ids),)
+        with get_cursor() as cur:
+            cur.execute(query, params)
+            rows = cur.fetchall()
+        return [
+            {"id": row[0], "name": row[1], "description": row[2], "brand": row[3], "category": row[4]}
+            for row in rows
+        ]
+
+    def has_content_similarity(self) -> bool:
+        """¿Ya se calculó product_similarity?"""
+        with get_cursor() as cur:
+            cur.execute("SELECT EXISTS (SELECT 1 FROM product_similarity)")
+            return bool(cur.fetchone()[0])
+
+    @staticmethod
+    def _insert_similarity(cur, neighbors):
+        rows = [
+            (product_id, similar_id, score)
+            for product_id, similar in neighbors
+            for similar_id, score in similar
+        ]
+        if rows:
+            execute_values(cur, """
+                INSERT INTO product_similarity (product_id, similar_id, score)
+                VALUES %s
+            """, rows)
+
+    def rebuild_content_similarity(self, if_empty: bool = False) -> int:
+        """Recalcular product_similarity completa (vocabulario e IDF nuevos).
+
+        Con `if_empty` solo se calcula si la tabla está vacía y ningún otro
+        proceso la está calculando; devuelve 0 si no hizo nada.
+        """
+        with get_cursor(commit=True, own_connection=True) as cur:
+            if if_empty:
+                cur.execute("SELECT pg_try_advisory_xact_lock(hashtext('product_similarity'))")
+                if not cur.fetchone()[0]:
+                    return 0
+                cur.execute("SELECT EXISTS (SELECT 1 FROM product_similarity)")
+                if cur.fetchone()[0]:
+                    return 0
+            else:
+                cur.execute(SIMILARITY_LOCK)
+            # El catálogo se lee ya con el lock tomado: ningún cambio queda fuera
+            index = ContentIndex.fit(self.get_catalog_texts())
+            cur.execute("DELETE FROM product_similarity")
+            neighbors = []
+            for entry in index.top_k(Config.RECO_SIMILAR_K, batch_size=Config.RECO_SIMILAR_BATCH):
+                neighbors.append(entry)
+                if len(neighbors) >= Config.RECO_SIMILAR_BATCH:
+                    self._insert_similarity(cur, neighbors)
+                    neighbors = []
+            self._insert_similarity(cur, neighbors)
+
+        logger.info(f"Similitud de contenido calculada para {len(index)} productos")
+        return len(index)
+
+    def update_content_similarity(self, product_id: int) -> bool:
+        """Actualizar product_similarity tras crear, editar o borrar un producto.
+
+        El índice se arma desde products con el advisory lock tomado, así
+        dos workers no parten de catálogos distintos. Se recalcula la lista
+        del producto y la de quienes lo tenían como vecino; en las demás se
+        agrega solo si supera al último de su top-K. Si la tabla está vacía
+        no hace nada y devuelve False: el cálculo completo es aparte.
+        """
+        k = Config.RECO_SIMILAR_K
+        if not self.has_content_similarity():
+            return False
+
+        with get_cursor(commit=True, own_connection=True) as cur:
+            cur.execute(SIMILARITY_LOCK)
+            index = ContentIndex.fit(self.get_catalog_texts())
+            cur.execute("SELECT product_id FROM product_similarity WHERE similar_id = %s", (product_id,))
+            recompute = {row[0] for row in cur.fetchall()} | {product_id}
+            cur.execute("""
+                DELETE FROM product_similarity
+                WHERE product_id = ANY(%s) OR similar_id = %s
+            """, (list(recompute), product_id))
+            self._insert_similarity(cur, index.top_k(k, recompute, batch_size=Config.RECO_SIMILAR_BATCH))
+
+            scores = {
+                other_id: score for other_id, score in index.scores_for(product_id).items()
+                if other_id not in recompute
+            }
+            if not scores:
+                return True
+
+            cur.execute("""
+                SELECT product_id, COUNT(*), MIN(score)
+                FROM product_similarity
+                WHERE product_id = ANY(%s)
+                GROUP BY product_id
+            """, (list(scores),))
+            lists = {row[0]: (row[1], row[2]) for row in cur.fetchall()}
+            entering = [
+                (other_id, [(product_id, score)])
+                for other_id, score in scores.items()
+                if lists.get(other_id, (0, 0))[0] < k or score > lists[other_id][1]
+            ]
+            self._insert_similarity(cur, entering)
+            if entering:
+                # Las listas que ya tenían K pierden a su último vecino
+                cur.execute("""
+                    DELETE FROM product_similarity ps
+                    USING (
+                        SELECT product_id, similar_id,
+                               ROW_NUMBER() OVER (PARTITION BY product_id
+                                                  ORDER BY score DESC, similar_id) AS rn
+                        FROM product_similarity
+                        WHERE product_id = ANY(%s)
+                    ) ranked
+                    WHERE ps.product_id = ranked.product_id
+                      AND ps.similar_id = ranked.similar_id
+                      AND ranked.rn > %s
+                """, ([other_id for other_id, _ in entering], k))
+        return True
+
+    def get_similar_products(self, product_id: int, limit: int = 6) -> List[Dict]:
+        """Productos con stock más parecidos por contenido a `product_id`"""
+        with get_cursor() as cur:
+            cur.execute("""
+                SELECT p.product_id, p.name, p.category, p.price, p.current_stock, p.code, ps.score
+                FROM product_similarity ps
+                JOIN products p ON p.product_id = ps.similar_id
+                WHERE ps.product_id = %s AND p.current_stock > 0
+                ORDER BY ps.score DESC, p.product_id
+                LIMIT %s
+            """, (product_id, limit))
+            rows = cur.fetchall()
+        return [
+            {
+                "id": row[0],
+                "name": row[1],
+                "category": row[2] or "General",
+                "price": float(row[3]),
+                "stock": row[4],
+                "code": row[5],
+                "similarity": round(float(row[6]), 4)
+            }
+            for row in rows
+        ]
+
+    def build_upsell_index(self, products: Optional[List[Dict]] = None) -> UpsellIndex:
+        """Índice de upsell sobre los productos con stock; queda como índice del proceso"""
+        index = UpsellIndex(
+            products if products is not None else self.get_all_products(),
+            max_step=Config.UPSELL_MAX_PRICE_STEP,
+            tiers=Config.UPSELL_BRAND_TIERS,
+            min_brands=Config.UPSELL_MIN_BRANDS
+        )
+        upsell.set_cached_index(index)
+        return index
+
+    def get_upsell_items(self, ctx: Optional[RecommendationContext] = None, limit: int = 10) -> List[Dict]:
+        """Mejores oportunidades de upsell del catálogo (mayor margen adicional)"""
+        ctx = ctx or RecommendationContext(self)
+        return ctx.upsell_index.best_upsells(limit)
+
+    def get_product_upsells(self, product_id: int, limit: int = 5,
+                            index: Optional[UpsellIndex] = None) -> Optional[List[Dict]]:
+        """Alternativas de upsell para un producto; None si el producto no existe"""
+        with get_cursor() as cur:
+            cur.execute("""
+                SELECT product_id, name, category, brand, price, cost_price
+                FROM products
+                WHERE product_id = %s
+            """, (product_id,))
+            row = cur.fetchone()
+        if not row:
+            return None
+
+        product = {
+            "id": row[0],
+            "name": row[1],
+            "category": row[2],
+            "brand": row[3],
+            "price": float(row[4]),
+            "cost_price": float(row[5]) if row[5] is not None else None
+        }
+        if product["price"] <= 0:
             return []
-        
-        # Agrupar productos por venta
-        transaction_products = defaultdict(list)
-        for sale in sales_data:
-            transaction_products[sale['sale_id']].append({
-                'product_id': sale['product_id'],
-                'name': sale['product_name'],
-                'category': sale['category']
-            })
-        
-        # Calcular frecuencia de pares
-        product_pairs = Counter()
-        for sale_id, products in transaction_products.items():
-            if len(products) >= 2:
-                for i in range(len(products)):
-                    for j in range(i + 1, len(products)):
-                        pair = tuple(sorted([products[i]['product_id'], products[j]['product_id']]))
-                        product_pairs[pair] += 1
-        
-        logger.info(f"Encontrados {len(product_pairs)} pares de productos de {len(transaction_products)} ventas")
-        return product_pairs.most_common(20)
+        index = index or upsell.get_cached_index() or self.build_upsell_index()
+        # Se piden de más: el índice puede tener stock de la última instantánea
+        candidates = index.candidates(product, limit * 2)
+        if not candidates:
+            return []
+
+        with get_cursor() as cur:
+            cur.execute("""
+                SELECT product_id, current_stock
+                FROM products
+                WHERE product_id = ANY(%s)
+            """, ([c["id"] for c in candidates],))
+            stock = dict(cur.fetchall())
+        return [
+            {**candidate, "stock": stock[candidate["id"]]}
+            for candidate in candidates
+            if stock.get(candidate["id"], 0) > 0
+        ][:limit]
 
     def get_trending_combinations(self) -> List[Dict]:
-        """Combinaciones de productos más vendidas"""
-        conn = self._get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            WITH product_combinations AS (
-                SELECT 
-                    s.sale_id,
-                    STRING_AGG(p.name, ' + ' ORDER BY p.name) as combo_name,
-                    COUNT(DISTINCT sd.product_id) as product_count,
-                    SUM(sd.quantity) as total_quantity,
-                    SUM(sd.subtotal) as total_revenue
-                FROM sales s
-                JOIN sale_details sd ON s.sale_id = sd.sale_id
-                JOIN products p ON sd.product_id = p.product_id
-                WHERE s.date >= CURRENT_DATE - INTERVAL '90 days'
-                GROUP BY s.sale_id
-                HAVING COUNT(DISTINCT sd.product_id) >= 2
-            )
-            SELECT 
-                combo_name,
-                COUNT(*) as sales_count,
-                SUM(total_revenue) as total_revenue,
-                AVG(total_quantity) as avg_quantity
-            FROM product_combinations
-            GROUP BY combo_name
-            ORDER BY sales_count DESC, total_revenue DESC
-            LIMIT 10
-        """)
-        
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
+        """Combinaciones de productos más vendidas (conjuntos frecuentes)"""
+        with get_cursor() as cur:
+            # Primero el top 10 de conjuntos; nombres, ingreso y unidades (en las
+            # ventas que contienen el conjunto completo) solo para esos 10
+            cur.execute("""
+                SELECT
+                    names.combo_name,
+                    f.support_count,
+                    stats.total_revenue,
+                    stats.avg_quantity
+                FROM (
+                    SELECT items, size, support_count
+                    FROM frequent_itemsets
+                    WHERE size >= 2
+                    ORDER BY support_count DESC, size DESC, items
+                    LIMIT 10
+                ) f
+                CROSS JOIN LATERAL (
+                    SELECT STRING_AGG(p.name, ' + ' ORDER BY p.name) AS combo_name
+                    FROM products p
+                    WHERE p.product_id = ANY(f.items)
+                ) names
+                CROSS JOIN LATERAL (
+                    SELECT SUM(b.revenue) AS total_revenue, AVG(b.quantity) AS avg_quantity
+                    FROM (
+                        SELECT SUM(sd.subtotal) AS revenue, SUM(sd.quantity) AS quantity
+                        FROM sale_details sd
+                        JOIN sales s ON s.sale_id = sd.sale_id
+                        WHERE sd.product_id = ANY(f.items) AND s.date >= %s
+                        GROUP BY sd.sale_id
+                        HAVING COUNT(DISTINCT sd.product_id) = f.size
+                    ) b
+                ) stats
+                ORDER BY f.support_count DESC, f.size DESC, f.items
+            """, (days_ago_start(Config.FP_WINDOW_DAYS),))
+            rows = cur.fetchall()
+        
+        if not rows:
+            # Sin minería todavía: canastas idénticas agrupadas en SQL
+            return self._get_basket_combinations()
         
-        combos = []
-        for row in rows:
-            combos.append({
+        return [
+            {
                 "combo": row[0],
                 "sales": row[1],
-                "revenue": float(row[2] or 0),  # Convertir a float
-                "avg_quantity": float(row[3] or 0)  # Convertir a float
-            })
-        
-        return combos
+                "revenue": float(row[2] or 0),
+                "avg_quantity": float(row[3] or 0)
+            }
+            for row in rows
+        ]
 
     def get_performance_metrics(self) -> Dict:
         """Métricas de rendimiento del sistema - CORREGIDO"""
-        conn = self._get_connection()
-        cur = conn.cursor()
-        
-        # Ventas con múltiples productos
-        cur.execute("""
-            SELECT COUNT(*) as multi_product_sales
-            FROM (
-                SELECT s.sale_id
-                FROM sales s
-                JOIN sale_details sd ON s.sale_id = sd.sale_id
-                WHERE s.date >= CURRENT_DATE - INTERVAL '30 days'
-                GROUP BY s.sale_id
-                HAVING COUNT(DISTINCT sd.product_id) >= 2
-            ) as multi_product
-        """)
-        multi_product_sales = cur.fetchone()[0] or 0
-        
-        # Total de ventas
-        cur.execute("""
-            SELECT COUNT(*) as total_sales
-            FROM sales 
-            WHERE date >= CURRENT_DATE - INTERVAL '30 days'
-        """)
-        total_sales = cur.fetchone()[0] or 1
-        
+        # Una sola pasada sobre sales usando los totales por venta (item_count)
+        with get_cursor() as cur:
+            cur.execute("""
+                SELECT 
+                    COUNT(*) FILTER (WHERE item_count >= 2) as multi_product_sales,
+                    COUNT(*) as total_sales,
+                    AVG(total) as avg_ticket
+                FROM sales 
+                WHERE date >= %s
+            """, (days_ago_start(30),))
+            row = cur.fetchone()
+        
+        multi_product_sales = row[0] or 0
+        total_sales = row[1] or 1
         # Ticket promedio - CONVERTIR EXPLÍCITAMENTE A FLOAT
-        cur.execute("""
-            SELECT AVG(total) as avg_ticket
-            FROM sales 
-            WHERE date >= CURRENT_DATE - INTERVAL '30 days'
-        """)
-        avg_ticket_result = cur.fetchone()[0]
-        avg_ticket = float(avg_ticket_result) if avg_ticket_result else 0.0
-        
-        cur.close()
-        conn.close()
+        avg_ticket = float(row[2]) if row[2] else 0.0
         
         # Calcular métricas - USAR FLOATS EXPLÍCITOS
         cross_sell_rate = (multi_product_sales / total_sales * 100) if total_sales > 0 else 0
@@ -221,24 +520,34 @@ class RecommendationSystem:
 
     # ---------- RECOMENDACIONES ESPECÍFICAS ----------
 
-    def get_product_recommendations(self) -> List[Dict]:
+    def get_product_recommendations(self, ctx: Optional[RecommendationContext] = None) -> List[Dict]:
         """Generar recomendaciones de productos"""
-        products = self.get_all_products()
-        frequent_pairs = self.get_frequently_bought_together()
+        ctx = ctx or RecommendationContext(self)
+        products = ctx.products
+        frequent_pairs = ctx.frequent_pairs
         
         if not frequent_pairs:
             return self._get_fallback_recommendations(products)
         
+        index = ctx.index
+        # Con RECO_PAIR_HALF_LIFE_DAYS los pares vienen ordenados por puntaje con
+        # decaimiento, no por frecuencia: el máximo se calcula una vez aquí
+        max_freq = max(frequency for _, frequency in frequent_pairs) or 1
         recommendations = []
         used_products = set()
         
         for (product1_id, product2_id), frequency in frequent_pairs:
-            product1 = next((p for p in products if p['id'] == product1_id), None)
-            product2 = next((p for p in products if p['id'] == product2_id), None)
+            product1 = index.get(product1_id)
+            product2 = index.get(product2_id)
             
             if product1 and product2 and product1_id not in used_products:
-                max_freq = max([freq for _, freq in frequent_pairs]) if frequent_pairs else 1
-                confidence = min(95.0, (frequency / max_freq) * 100)  # Usar float
+                # Confianza de la regla producto2 → producto1: P(producto1 | producto2);
+                # si el par no aparece en la ventana de canastas, frecuencia relativa
+                rule = ctx.rule(product2_id, product1_id)
+                if rule:
+                    confidence = min(95.0, rule["confidence"] * 100)
+                else:
+                    confidence = min(95.0, (frequency / max_freq) * 100)  # Usar float
                 
                 recommendations.append({
                     "id": product1['id'],
@@ -257,32 +566,35 @@ class RecommendationSystem:
         
         return recommendations
 
-    def get_bundle_suggestions(self) -> List[Dict]:
+    def get_bundle_suggestions(self, ctx: Optional[RecommendationContext] = None) -> List[Dict]:
         """Sugerencias de bundles basadas en datos reales"""
-        frequent_pairs = self.get_frequently_bought_together()
-        products = self.get_all_products()
+        ctx = ctx or RecommendationContext(self)
+        # Conjuntos frecuentes (2 a FP_MAX_LENGTH productos); sin minería todavía, los pares
+        candidates = ctx.itemsets or [(list(pair), frequency) for pair, frequency in ctx.frequent_pairs]
+        products = ctx.products
         
-        if not frequent_pairs:
+        if not candidates:
             return self._get_fallback_bundles(products)
         
+        index = ctx.index
         bundles = []
         used_combinations = set()
         
-        for (product1_id, product2_id), frequency in frequent_pairs[:6]:
-            product1 = next((p for p in products if p['id'] == product1_id), None)
-            product2 = next((p for p in products if p['id'] == product2_id), None)
+        for product_ids, frequency in candidates[:6]:
+            items = [index.get(product_id) for product_id in product_ids]
             
-            if product1 and product2:
-                combo_id = tuple(sorted([product1_id, product2_id]))
+            if all(items):
+                combo_id = tuple(sorted(product_ids))
                 if combo_id not in used_combinations:
-                    individual_price = product1['price'] + product2['price']  # Ya son floats
+                    individual_price = sum(item['price'] for item in items)  # Ya son floats
                     bundle_price = individual_price * 0.88
                     popularity = min(95.0, frequency * 8)  # Usar float
+                    names = [item['name'] for item in items]
                     
                     bundles.append({
                         "id": len(bundles) + 1,
-                        "name": f"Bundle {product1['name']} + {product2['name']}",
-                        "items": [product1['name'], product2['name']],
+                        "name": f"Bundle {' + '.join(names)}",
+                        "items": names,
                         "price": round(bundle_price, 2),
                         "originalPrice": round(individual_price, 2),
                         "popularity": popularity,
@@ -293,19 +605,20 @@ class RecommendationSystem:
         
         return bundles
 
-    def get_cross_sell_opportunities(self) -> List[Dict]:
+    def get_cross_sell_opportunities(self, ctx: Optional[RecommendationContext] = None) -> List[Dict]:
         """Oportunidades de cross-sell"""
-        frequent_pairs = self.get_frequently_bought_together()
-        products = self.get_all_products()
+        ctx = ctx or RecommendationContext(self)
+        frequent_pairs = ctx.frequent_pairs
         
         if not frequent_pairs:
             return self._get_fallback_cross_sell()
         
+        index = ctx.index
         opportunities = []
         
         for (product1_id, product2_id), frequency in frequent_pairs[:4]:
-            product1 = next((p for p in products if p['id'] == product1_id), None)
-            product2 = next((p for p in products if p['id'] == product2_id), None)
+            product1 = index.get(product1_id)
+            product2 = index.get(product2_id)
             
             if product1 and product2:
                 opportunities.append({
@@ -321,18 +634,15 @@ class RecommendationSystem:
 
     def search_product_recommendations(self, query: str) -> Dict:
         """Buscar producto y obtener recomendaciones específicas"""
-        conn = self._get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT product_id, name, category, price, current_stock
-            FROM products 
-            WHERE name ILIKE %s OR code ILIKE %s
-            LIMIT 1
-        """, (f"%{query}%", f"%{query}%"))
-        
-        row = cur.fetchone()
-        cur.close()
-        conn.close()
+        with get_cursor() as cur:
+            cur.execute("""
+                SELECT product_id, name, category, price, current_stock
+                FROM products 
+                WHERE name ILIKE %s OR code ILIKE %s
+                LIMIT 1
+            """, (f"%{query}%", f"%{query}%"))
+        
+            row = cur.fetchone()
         
         if not row:
             return {
@@ -359,35 +669,152 @@ class RecommendationSystem:
             "recommendations": recommendations
         }
 
-    def _get_specific_recommendations(self, product_id: int) -> List[Dict]:
+    def get_cart_recommendations(self, product_ids: List[int], limit: int = 8,
+                                 index: Optional[NeighborIndex] = None) -> List[Dict]:
+        """Sugerencias para toda la canasta desde el índice de vecinos.
+
+        Los vecinos de cada producto del carrito se combinan por producto
+        (confianza combinada 1 - Π(1 - confianza)), sin repetir ni incluir lo
+        que ya está en el carrito, y solo con stock.
+        """
+        index = index if index is not None else self.get_neighbor_index()
+        cart = list(dict.fromkeys(product_ids))
+        if index is None or not cart:
+            return []
+        in_cart = set(cart)
+
+        # candidato → (1 - confianza acumulada, mejor confianza, producto que la aporta)
+        candidates: Dict[int, List] = {}
+        for source_id in cart:
+            for neighbor in index.neighbors_of(source_id):
+                other_id = neighbor["id"]
+                if other_id in in_cart:
+                    continue
+                entry = candidates.setdefault(other_id, [1.0, 0.0, source_id])
+                entry[0] *= 1.0 - neighbor["confidence"]
+                if neighbor["confidence"] > entry[1]:
+                    entry[1], entry[2] = neighbor["confidence"], source_id
+        if not candidates:
+            return []
+
+        with get_cursor() as cur:
+            cur.execute("""
+                SELECT product_id, name, category, price, current_stock, code
+                FROM products
+                WHERE product_id = ANY(%s)
+            """, (list(candidates) + cart,))
+            rows = {row[0]: row for row in cur.fetchall()}
+
+        ranked = sorted(candidates.items(), key=lambda item: (item[1][0], -item[1][1], item[0]))
+        recommendations = []
+        for other_id, (miss, _, source_id) in ranked:
+            row = rows.get(other_id)
+            if not row or row[4] <= 0:
+                continue
+            source = rows.get(source_id)
+            recommendations.append({
+                "id": row[0],
+                "name": row[1],
+                "category": row[2] or "General",
+                "price": float(row[3]),
+                "confidence": round(min(95.0, (1.0 - miss) * 100), 1),
+                "reason": f"Frecuentemente comprado con {source[1]}" if source else "Comprado junto con tu carrito",
+                "stock": row[4],
+                "code": row[5]
+            })
+            if len(recommendations) >= limit:
+                break
+
+        return recommendations
+
+    def _get_specific_recommendations(self, product_id: int,
+                                      ctx: Optional[RecommendationContext] = None) -> List[Dict]:
         """Obtener recomendaciones para un producto específico"""
-        frequent_pairs = self.get_frequently_bought_together()
-        products = self.get_all_products()
+        ctx = ctx or RecommendationContext(self)
+        index = ctx.index
         
         recommendations = []
         
-        for (prod1_id, prod2_id), frequency in frequent_pairs:
-            if prod1_id == product_id or prod2_id == product_id:
-                other_id = prod2_id if prod1_id == product_id else prod1_id
-                other_product = next((p for p in products if p['id'] == other_id), None)
-                
-                if other_product and other_product['current_stock'] > 0:
-                    confidence = min(95.0, frequency * 12)  # Usar float
-                    recommendations.append({
-                        "id": other_product['id'],
-                        "name": other_product['name'],
-                        "category": other_product['category'] or "General",
-                        "price": other_product['price'],  # Ya es float
-                        "confidence": confidence
-                    })
+        # Vecinos directos del producto en product_pairs (no solo el top global);
+        # se piden de más porque algunos pueden estar sin stock
+        for other_id, frequency in self.get_product_neighbors(product_id, limit=18):
+            other_product = index.get(other_id)
+            
+            if other_product and other_product['current_stock'] > 0:
+                confidence = min(95.0, frequency * 12)  # Usar float
+                recommendations.append({
+                    "id": other_product['id'],
+                    "name": other_product['name'],
+                    "category": other_product['category'] or "General",
+                    "price": other_product['price'],  # Ya es float
+                    "confidence": confidence
+                })
             
             if len(recommendations) >= 6:
                 break
         
+        # Poco o ningún historial de ventas: completar con productos parecidos por contenido
+        if len(recommendations) < 6:
+            seen = {r["id"] for r in recommendations}
+            for similar in self.get_similar_products(product_id, limit=6):
+                if similar["id"] in seen:
+                    continue
+                recommendations.append({
+                    "id": similar["id"],
+                    "name": similar["name"],
+                    "category": similar["category"],
+                    "price": similar["price"],
+                    "confidence": round(min(95.0, similar["similarity"] * 100), 1)
+                })
+                if len(recommendations) >= 6:
+                    break
+        
         return recommendations
 
     # ---------- MÉTODOS DE RESPALDO ----------
 
+    def _get_basket_combinations(self) -> List[Dict]:
+        """Combinaciones de respaldo: canastas con exactamente los mismos productos"""
+        with get_cursor() as cur:
+            cur.execute("""
+                WITH product_combinations AS (
+                    SELECT 
+                        s.sale_id,
+                        STRING_AGG(p.name, ' + ' ORDER BY p.name) as combo_name,
+                        COUNT(DISTINCT sd.product_id) as product_count,
+                        SUM(sd.quantity) as total_quantity,
+                        SUM(sd.subtotal) as total_revenue
+                    FROM sales s
+                    JOIN sale_details sd ON s.sale_id = sd.sale_id
+                    JOIN products p ON sd.product_id = p.product_id
+                    WHERE s.date >= %s
+                    GROUP BY s.sale_id
+                    HAVING COUNT(DISTINCT sd.product_id) >= 2
+                )
+                SELECT 
+                    combo_name,
+                    COUNT(*) as sales_count,
+                    SUM(total_revenue) as total_revenue,
+                    AVG(total_quantity) as avg_quantity
+                FROM product_combinations
+                GROUP BY combo_name
+                ORDER BY sales_count DESC, total_revenue DESC
+                LIMIT 10
+            """, (days_ago_start(90),))
+        
+            rows = cur.fetchall()
+        
+        combos = []
+        for row in rows:
+            combos.append({
+                "combo": row[0],
+                "sales": row[1],
+                "revenue": float(row[2] or 0),  # Convertir a float
+                "avg_quantity": float(row[3] or 0)  # Convertir a float
+            })
+        
+        return combos
+
     def _get_fallback_recommendations(self, products: List[Dict]) -> List[Dict]:
         """Recomendaciones de respaldo"""
         if not products:
@@ -448,11 +875,14 @@ class RecommendationSystem:
         """Obtener todas las recomendaciones del sistema"""
         logger.info("Generando recomendaciones con datos reales...")
         
+        # Una sola lectura de productos/ventas y un solo cálculo de pares
+        ctx = RecommendationContext(self)
+        
         return {
-            "productRecommendations": self.get_product_recommendations(),
-            "bundleSuggestions": self.get_bundle_suggestions(),
-            "crossSellOpportunities": self.get_cross_sell_opportunities(),
-            "upsellItems": [],
+            "productRecommendations": self.get_product_recommendations(ctx),
+            "bundleSuggestions": self.get_bundle_suggestions(ctx),
+            "crossSellOpportunities": self.get_cross_sell_opportunities(ctx),
+            "upsellItems": self.get_upsell_items(ctx),
             "trendingCombos": self.get_trending_combinations(),
             "performanceMetrics": self.get_performance_metrics()
         }
\ No newline at end of file
@@ -1,73 +1,81 @@
 # models/sale.py
-import psycopg2
-from config import Config
+from database.connection import get_cursor
 
 class Sale:
-    def __init__(self, sale_id=None, date=None, user_id=None, total=0):
+    def __init__(self, sale_id=None, date=None, user_id=None, total=0, payment_method="Efectivo",
+                 item_count=0, units=0):
         self.sale_id = sale_id
         self.date = date
         self.user_id = user_id
         self.total = total
+        self.payment_method = payment_method
+        # Mantenidos por trigger desde sale_details (solo lectura)
+        self.item_count = item_count
+        self.units = units
 
-    # Obtener todas las ventas
+    # Obtener todas las ventas (o una página keyset con after/limit)
     @staticmethod
-    def get_all():
-        conn = psycopg2.connect(**Config.get_database_config())
-        cur = conn.cursor()
-        cur.execute("SELECT Sale_ID, Date, User_ID, Total FROM Sales ORDER BY Sale_ID")
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
+    def get_all(after=None, limit=None):
+        query = "SELECT Sale_ID, Date, User_ID, Total, Payment_Method, Item_Count, Units FROM Sales"
+        params = []
+        if after is not None:
+            query += " WHERE Sale_ID > %s"
+            params.append(after)
+        query += " ORDER BY Sale_ID"
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit)
+
+        with get_cursor() as cur:
+            cur.execute(query, params)
+            rows = cur.fetchall()
         return [Sale(*row) for row in rows]
 
     # Obtener una venta por ID
     @staticmethod
     def get_by_id(sale_id):
-        conn = psycopg2.connect(**Config.get_database_config())
-        cur = conn.cursor()
-        cur.execute("SELECT Sale_ID, Date, User_ID, Total FROM Sales WHERE Sale_ID = %s", (sale_id,))
-        row = cur.fetchone()
-        cur.close()
-        conn.close()
+        with get_cursor() as cur:
+            cur.execute("SELECT Sale_ID, Date, User_ID, Total, Payment_Method, Item_Count, Units FROM Sales WHERE Sale_ID = %s", (sale_id,))
+            row = cur.fetchone()
         return Sale(*row) if row else None
 
     # Crear una nueva venta
     def save(self):
-        conn = psycopg2.connect(**Config.get_database_config())
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO Sales (User_ID, Total) VALUES (%s, %s) RETURNING Sale_ID, Date",
-            (self.user_id, self.total)
-        )
-        row = cur.fetchone()
-        self.sale_id, self.date = row
-        conn.commit()
-        cur.close()
-        conn.close()
+        with get_cursor(commit=True) as cur:
+            cur.execute(
+                "INSERT INTO Sales (User_ID, Total, Payment_Method) VALUES (%s, %s, %s) RETURNING Sale_ID, Date",
+                (self.user_id, self.total, self.payment_method)
+            )
+            row = cur.fetchone()
+            self.sale_id, self.date = row
         return self
 
-    # Actualizar una venta
+    # Actualizar una venta (con detalles, el total lo calcula el trigger de sale_details)
     def update(self, data):
-        conn = psycopg2.connect(**Config.get_database_config())
-        cur = conn.cursor()
-        cur.execute(
-            "UPDATE Sales SET User_ID = %s, Total = %s WHERE Sale_ID = %s RETURNING Sale_ID",
-            (data.get("User_ID", self.user_id), data.get("Total", self.total), self.sale_id)
-        )
-        row = cur.fetchone()
-        conn.commit()
-        cur.close()
-        conn.close()
+        with get_cursor(commit=True) as cur:
+            cur.execute(
+                """
+                UPDATE Sales
+                SET User_ID = %s,
+                    Total = CASE WHEN Item_Count > 0 THEN Total ELSE %s END,
+                    Payment_Method = %s
+                WHERE Sale_ID = %s
+                RETURNING Sale_ID
+                """,
+                (
+                    data.get("User_ID", self.user_id),
+                    data.get("Total", self.total),
+                    data.get("Payment_Method", self.payment_method),
+                    self.sale_id
+                )
+            )
+            row = cur.fetchone()
         return bool(row)
 
     # Eliminar una venta
     @staticmethod
     def delete(sale_id):
-        conn = psycopg2.connect(**Config.get_database_config())
-        cur = conn.cursor()
-        cur.execute("DELETE FROM Sales WHERE Sale_ID = %s RETURNING Sale_ID", (sale_id,))
-        row = cur.fetchone()
-        conn.commit()
-        cur.close()
-        conn.close()
+        with get_cursor(commit=True) as cur:
+            cur.execute("DELETE FROM Sales WHERE Sale_ID = %s RETURNING Sale_ID", (sale_id,))
+            row = cur.fetchone()
         return bool(row)
\ No newline at end of file
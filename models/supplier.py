@@ -1,4 +1,3 @@
-import psycopg2
 from config import Config
 
 class Supplier:
@@ -0,0 +1,219 @@
+"""
+Motor de upsell: alternativas más caras, con stock, de la misma categoría
+y nivel de marca, ordenadas por margen (precio - cost_price).
+
+Los productos se agrupan por (categoría, nivel de marca) en listas
+ordenadas por precio. Para un producto, el rango de candidatos
+(precio, precio × (1 + max_step)] se ubica con bisect y el de mayor margen
+dentro del rango sale de una sparse table (máximo por rango en O(1)); los
+siguientes se extraen partiendo el rango, sin recorrerlo completo. Cada
+consulta cuesta O(log n + limit · log limit), sin importar el tamaño del
+catálogo.
+
+El nivel de marca (0 = económica) es el tercil de precios de la categoría
+en el que cae la mediana de precios de la marca; los productos sin marca
+usan su propio precio. Las categorías con pocas marcas forman un solo nivel.
+"""
+import heapq
+import os
+import threading
+from bisect import bisect_right
+from statistics import median
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+NO_MARGIN = float("-inf")
+
+
+def margin_of(product: Dict) -> float:
+    """Margen unitario; -inf si no hay costo registrado"""
+    cost = product.get("cost_price")
+    if cost is None:
+        return NO_MARGIN
+    return float(product["price"]) - float(cost)
+
+
+class _PriceGroup:
+    """Productos de un (categoría, nivel) ordenados por precio, con máximo de margen por rango"""
+
+    def __init__(self, products: List[Dict]):
+        products = sorted(products, key=lambda p: (p["price"], p["id"]))
+        self.prices = [float(p["price"]) for p in products]
+        self.ids = [p["id"] for p in products]
+        self.margins = np.array([margin_of(p) for p in products], dtype=np.float64)
+
+        # table[j][i] = posición del mayor margen en [i, i + 2^j)
+        n = len(products)
+        self.table = [np.arange(n, dtype=np.int32)]
+        width = 1
+        while width * 2 <= n:
+            prev = self.table[-1]
+            left, right = prev[:n - width * 2 + 1], prev[width:n - width + 1]
+            self.table.append(np.where(self.margins[left] >= self.margins[right], left, right))
+            width *= 2
+
+    def best(self, lo: int, hi: int) -> int:
+        """Posición del mayor margen en [lo, hi) (hi > lo)"""
+        level = (hi - lo).bit_length() - 1
+        a = int(self.table[level][lo])
+        b = int(self.table[level][hi - (1 << level)])
+        return a if self.margins[a] >= self.margins[b] else b
+
+    def price_range(self, price: float, max_price: float) -> Tuple[int, int]:
+        """Posiciones con precio en (price, max_price]"""
+        return bisect_right(self.prices, price), bisect_right(self.prices, max_price)
+
+
+class UpsellIndex:
+    """Índice de upsell sobre los productos con stock"""
+
+    def __init__(self, products: Iterable[Dict], max_step: float = 0.5,
+                 tiers: int = 3, min_brands: int = 3):
+        self.max_step = max_step
+        self.products: Dict[int, Dict] = {}
+        by_category: Dict[str, List[Dict]] = {}
+        for product in products:
+            if product.get("price") and product["price"] > 0:
+                self.products[product["id"]] = product
+                by_category.setdefault(self._category(product), []).append(product)
+
+        self._cuts: Dict[str, List[float]] = {}
+        self._brand_tier: Dict[Tuple[str, str], int] = {}
+        groups: Dict[Tuple[str, int], List[Dict]] = {}
+        for category, members in by_category.items():
+            self._fit_tiers(category, members, tiers, min_brands)
+            for product in members:
+                groups.setdefault((category, self.tier_of(product)), []).append(product)
+        self._groups = {key: _PriceGroup(members) for key, members in groups.items()}
+
+    @staticmethod
+    def _category(product: Dict) -> str:
+        return (product.get("category") or "General").strip().lower()
+
+    @staticmethod
+    def _brand(product: Dict) -> str:
+        return (product.get("brand") or "").strip().lower()
+
+    def _fit_tiers(self, category: str, members: List[Dict], tiers: int, min_brands: int):
+        brand_prices: Dict[str, List[float]] = {}
+        for product in members:
+            brand = self._brand(product)
+            if brand:
+                brand_prices.setdefault(brand, []).append(float(product["price"]))
+        if tiers <= 1 or len(brand_prices) < min_brands:
+            return
+
+        prices = np.array([float(p["price"]) for p in members])
+        self._cuts[category] = np.quantile(prices, [i / tiers for i in range(1, tiers)]).tolist()
+        for brand, values in brand_prices.items():
+            self._brand_tier[(category, brand)] = bisect_right(self._cuts[category], median(values))
+
+    def tier_of(self, product: Dict) -> int:
+        """Nivel de marca del producto dentro de su categoría (0 = económico)"""
+        category = self._category(product)
+        cuts = self._cuts.get(category)
+        if not cuts:
+            return 0
+        tier = self._brand_tier.get((category, self._brand(product)))
+        return tier if tier is not None else bisect_right(cuts, float(product["price"]))
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def candidates(self, product: Dict, limit: int = 5) -> List[Dict]:
+        """Hasta `limit` alternativas más caras con mayor margen que `product`.
+
+        `product` puede no estar en el índice (p. ej. sin stock): basta con
+        id, price, category, brand y cost_price.
+        """
+        group = self._groups.get((self._category(product), self.tier_of(product)))
+        if group is None or limit <= 0:
+            return []
+        price = float(product["price"])
+        lo, hi = group.price_range(price, price * (1 + self.max_step))
+        own_margin = margin_of(product)
+
+        # Rangos pendientes ordenados por el mayor margen que contienen
+        heap = []
+
+        def push(a, b):
+            if a < b:
+                best = group.best(a, b)
+                heapq.heappush(heap, (-group.margins[best], group.prices[best], best, a, b))
+
+        push(lo, hi)
+        upsells = []
+        while heap and len(upsells) < limit:
+            negative_margin, _, best, a, b = heapq.heappop(heap)
+            margin = -negative_margin
+            if margin == NO_MARGIN or margin <= max(own_margin, 0.0):
+                break
+            candidate = self.products[group.ids[best]]
+            if candidate["id"] != product.get("id"):
+                upsells.append(self._entry(product, candidate, margin, own_margin))
+            push(a, best)
+            push(best + 1, b)
+        return upsells
+
+    @staticmethod
+    def _entry(product: Dict, candidate: Dict, margin: float, own_margin: float) -> Dict:
+        price = float(product["price"])
+        return {
+            "id": candidate["id"],
+            "name": candidate["name"],
+            "category": candidate.get("category") or "General",
+            "price": float(candidate["price"]),
+            "stock": candidate.get("current_stock"),
+            "code": candidate.get("code"),
+            "priceIncrease": round((float(candidate["price"]) - price) / price * 100, 1),
+            "margin": round(margin, 2),
+            "extraMargin": round(margin - max(own_margin, 0.0), 2)
+        }
+
+    def best_upsells(self, limit: int = 10) -> List[Dict]:
+        """Mejores oportunidades del catálogo: una por producto, por margen adicional"""
+        opportunities = []
+        used_targets = set()
+        for product in self.products.values():
+            best = self.candidates(product, limit=1)
+            if best:
+                opportunities.append((best[0]["extraMargin"], product, best[0]))
+
+        opportunities.sort(key=lambda entry: (-entry[0], entry[1]["id"]))
+        items = []
+        for _, product, upsell in opportunities:
+            if upsell["id"] in used_targets:
+                continue
+            used_targets.add(upsell["id"])
+            items.append({
+                "id": len(items) + 1,
+                "productId": product["id"],
+                "product": product["name"],
+                "productPrice": float(product["price"]),
+                "upgradeId": upsell["id"],
+                "upgrade": upsell["name"],
+                "upgradePrice": upsell["price"],
+                "category": upsell["category"],
+                "priceIncrease": upsell["priceIncrease"],
+                "extraMargin": upsell["extraMargin"]
+            })
+            if len(items) >= limit:
+                break
+        return items
+
+
+_index = None
+_index_pid = None
+_index_lock = threading.Lock()
+
+
+def get_cached_index() -> Optional[UpsellIndex]:
+    """Índice de upsell del proceso actual, si ya se calculó"""
+    return _index if _index_pid == os.getpid() else None
+
+
+def set_cached_index(index: Optional[UpsellIndex]):
+    global _index, _index_pid
+
+    with _index_lock:
+        _index, _index_pid = index, os.getpid()
@@ -1,5 +1,4 @@
-import psycopg2
-from config import Config
+from database.connection import get_cursor
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 import json
@@ -34,33 +33,37 @@ class User:
 
     # ---------- CRUD COMPLETO ----------
     @staticmethod
-    def get_all():
-        """Obtener todos los usuarios"""
-        conn = psycopg2.connect(**Config.get_database_config())
-        cur = conn.cursor()
-        cur.execute("""
+    def get_all(after=None, limit=None):
+        """Obtener todos los usuarios, o una página keyset (id > after)"""
+        query = """
             SELECT id, nombre, email, password, rol, two_factor_enabled, 
                    two_factor_secret, created_at, updated_at
-            FROM users ORDER BY id
-        """)
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
+            FROM users
+        """
+        params = []
+        if after is not None:
+            query += " WHERE id > %s"
+            params.append(after)
+        query += " ORDER BY id"
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit)
+
+        with get_cursor() as cur:
+            cur.execute(query, params)
+            rows = cur.fetchall()
         return [User(*row) for row in rows]
 
     @staticmethod
     def find_by_id(user_id):
         """Buscar usuario por ID"""
-        conn = psycopg2.connect(**Config.get_database_config())
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT id, nombre, email, password, rol, two_factor_enabled, 
-                   two_factor_secret, created_at, updated_at
-            FROM users WHERE id=%s
-        """, (user_id,))
-        row = cur.fetchone()
-        cur.close()
-        conn.close()
+        with get_cursor() as cur:
+            cur.execute("""
+                SELECT id, nombre, email, password, rol, two_factor_enabled, 
+                       two_factor_secret, created_at, updated_at
+                FROM users WHERE id=%s
+            """, (user_id,))
+            row = cur.fetchone()
         if row:
             return User(*row)
         return None
@@ -68,25 +71,21 @@ class User:
     @staticmethod
     def find_by_email(email):
         """Buscar usuario por email - ESTE ES EL QUE FALTA"""
-        conn = psycopg2.connect(**Config.get_database_config())
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT id, nombre, email, password, rol, two_factor_enabled, 
-                   two_factor_secret, created_at, updated_at
-            FROM users WHERE email=%s
-        """, (email,))
-        row = cur.fetchone()
-        cur.close()
-        conn.close()
+        with get_cursor() as cur:
+            cur.execute("""
+                SELECT id, nombre, email, password, rol, two_factor_enabled, 
+                       two_factor_secret, created_at, updated_at
+                FROM users WHERE email=%s
+            """, (email,))
+            row = cur.fetchone()
         if row:
             return User(*row)
         return None
 
     def save(self):
         """Guardar nuevo usuario"""
-        conn = psycopg2.connect(**Config.get_database_config())
-        cur = conn.cursor()
-        try:
+        # get_cursor hace rollback y relanza IntegrityError (email duplicado)
+        with get_cursor(commit=True) as cur:
             cur.execute("""
                 INSERT INTO users (nombre, email, password, rol, two_factor_enabled, two_factor_secret)
                 VALUES (%s, %s, %s, %s, %s, %s) 
@@ -97,20 +96,11 @@ class User:
             self.id = result[0]
             self.created_at = result[1]
             self.updated_at = result[2]
-            conn.commit()
-            return self.id
-        except psycopg2.IntegrityError as e:
-            conn.rollback()
-            raise e
-        finally:
-            cur.close()
-            conn.close()
+        return self.id
 
     def update(self):
         """Actualizar usuario existente"""
-        conn = psycopg2.connect(**Config.get_database_config())
-        cur = conn.cursor()
-        try:
+        with get_cursor(commit=True) as cur:
             cur.execute("""
                 UPDATE users
                 SET nombre=%s, email=%s, password=%s, rol=%s, 
@@ -122,25 +112,14 @@ class User:
             result = cur.fetchone()
             if result:
                 self.updated_at = result[0]
-            conn.commit()
-            return self.id
-        except psycopg2.IntegrityError as e:
-            conn.rollback()
-            raise e
-        finally:
-            cur.close()
-            conn.close()
+        return self.id
 
     @staticmethod
     def delete(user_id):
         """Eliminar usuario"""
-        conn = psycopg2.connect(**Config.get_database_config())
-        cur = conn.cursor()
-        cur.execute("DELETE FROM users WHERE id=%s RETURNING id", (user_id,))
-        row = cur.fetchone()
-        conn.commit()
-        cur.close()
-        conn.close()
+        with get_cursor(commit=True) as cur:
+            cur.execute("DELETE FROM users WHERE id=%s RETURNING id", (user_id,))
+            row = cur.fetchone()
         return bool(row)
 
     # ---------- AUTH ----------
@@ -186,22 +165,16 @@ class User:
     def update_password(email, new_password):
         """Actualizar contraseña de usuario"""
         try:
-            conn = psycopg2.connect(**Config.get_database_config())
-            cur = conn.cursor()
-        
             password_hash = User.hash_password(new_password)
             
-            cur.execute("""
-                UPDATE users 
-                SET password = %s, updated_at = NOW()
-                WHERE email = %s
-                RETURNING id
-            """, (password_hash, email))
-        
-            row = cur.fetchone()
-            conn.commit()
-            cur.close()
-            conn.close()
+            with get_cursor(commit=True) as cur:
+                cur.execute("""
+                    UPDATE users 
+                    SET password = %s, updated_at = NOW()
+                    WHERE email = %s
+                    RETURNING id
+                """, (password_hash, email))
+                row = cur.fetchone()
         
             return bool(row)
         except Exception as e:
@@ -211,15 +184,12 @@ class User:
     @staticmethod
     def get_all_with_roles():
         """Obtener usuarios con información básica"""
-        conn = psycopg2.connect(**Config.get_database_config())
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT id, nombre, email, rol, created_at 
-            FROM users ORDER BY id
-        """)
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
+        with get_cursor() as cur:
+            cur.execute("""
+                SELECT id, nombre, email, rol, created_at 
+                FROM users ORDER BY id
+            """)
+            rows = cur.fetchall()
         return [
             {
                 "id": row[0], 
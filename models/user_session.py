@@ -1,5 +1,4 @@
-import psycopg2
-from config import Config
+from database.connection import get_cursor
 from datetime import datetime, timedelta, timezone
 import json
 from utils.audit_helper import log_event
@@ -20,47 +19,36 @@ class UserSession:
         self.last_activity = last_activity
 
     def save(self):
-        conn = psycopg2.connect(**Config.get_database_config())
-        cur = conn.cursor()
-        cur.execute("""
-            INSERT INTO user_sessions 
-            (user_id, session_token, created_at, expires_at, is_active, ip_address, user_agent, location_data, last_activity)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            RETURNING id
-        """, (self.user_id, self.session_token, self.created_at, self.expires_at, 
-              self.is_active, self.ip_address, self.user_agent, self.location_data, self.last_activity))
-        self.id = cur.fetchone()[0]
-        conn.commit()
-        cur.close()
-        conn.close()
+        with get_cursor(commit=True) as cur:
+            cur.execute("""
+                INSERT INTO user_sessions 
+                (user_id, session_token, created_at, expires_at, is_active, ip_address, user_agent, location_data, last_activity)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                RETURNING id
+            """, (self.user_id, self.session_token, self.created_at, self.expires_at, 
+                  self.is_active, self.ip_address, self.user_agent, self.location_data, self.last_activity))
+            self.id = cur.fetchone()[0]
         return self.id
 
     def update(self):
-        conn = psycopg2.connect(**Config.get_database_config())
-        cur = conn.cursor()
-        cur.execute("""
-            UPDATE user_sessions 
-            SET is_active=%s, last_activity=%s
-            WHERE id=%s
-        """, (self.is_active, self.last_activity, self.id))
-        conn.commit()
-        cur.close()
-        conn.close()
+        with get_cursor(commit=True) as cur:
+            cur.execute("""
+                UPDATE user_sessions 
+                SET is_active=%s, last_activity=%s
+                WHERE id=%s
+            """, (self.is_active, self.last_activity, self.id))
 
     @staticmethod
     def find_by_token(session_token):
         print(f"🔍 Buscando sesión con token: {session_token[:20]}...")  # DEBUG
-        conn = psycopg2.connect(**Config.get_database_config())
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT id, user_id, session_token, created_at, expires_at, 
-                is_active, ip_address, user_agent, location_data, last_activity
-            FROM user_sessions 
-            WHERE session_token=%s AND is_active=true AND expires_at > NOW()
-        """, (session_token,))
-        row = cur.fetchone()
-        cur.close()
-        conn.close()
+        with get_cursor() as cur:
+            cur.execute("""
+                SELECT id, user_id, session_token, created_at, expires_at, 
+                    is_active, ip_address, user_agent, location_data, last_activity
+                FROM user_sessions 
+                WHERE session_token=%s AND is_active=true AND expires_at > NOW()
+            """, (session_token,))
+            row = cur.fetchone()
     
         print(f"📋 Resultado de BD: {row}")  # DEBUG
         if row:
@@ -69,35 +57,28 @@ class UserSession:
 
     @staticmethod
     def find_active_by_user(user_id):
-        conn = psycopg2.connect(**Config.get_database_config())
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT id, user_id, session_token, created_at, expires_at, 
-                is_active, ip_address, user_agent, location_data, last_activity
-            FROM user_sessions 
-            WHERE user_id=%s AND expires_at > NOW() 
-            ORDER BY created_at DESC
-        """, (user_id,))
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
+        with get_cursor() as cur:
+            cur.execute("""
+                SELECT id, user_id, session_token, created_at, expires_at, 
+                    is_active, ip_address, user_agent, location_data, last_activity
+                FROM user_sessions 
+                WHERE user_id=%s AND expires_at > NOW() 
+                ORDER BY created_at DESC
+            """, (user_id,))
+            rows = cur.fetchall()
         return [UserSession(*row) for row in rows]
 
     @staticmethod
     def invalidate_session(session_token):
         """ELIMINA físicamente la sesión de la base de datos"""
         try:
-            conn = psycopg2.connect(**Config.get_database_config())
-            cur = conn.cursor()
-            cur.execute("""
-                DELETE FROM user_sessions 
-                WHERE session_token=%s AND is_active=true
-                RETURNING id
-            """, (session_token,))
-            row = cur.fetchone()
-            conn.commit()
-            cur.close()
-            conn.close()
+            with get_cursor(commit=True) as cur:
+                cur.execute("""
+                    DELETE FROM user_sessions 
+                    WHERE session_token=%s AND is_active=true
+                    RETURNING id
+                """, (session_token,))
+                row = cur.fetchone()
         
             print(f"🗑️ Sesión eliminada: {session_token[:20]}...")
             return bool(row)
@@ -109,16 +90,12 @@ class UserSession:
     def invalidate_all_user_sessions(user_id):
         """Elimina TODAS las sesiones de un usuario"""
         try:
-            conn = psycopg2.connect(**Config.get_database_config())
-            cur = conn.cursor()
-            cur.execute("""
-                DELETE FROM user_sessions 
-                WHERE user_id=%s
-            """, (user_id,))
-            deleted_count = cur.rowcount
-            conn.commit()
-            cur.close()
-            conn.close()
+            with get_cursor(commit=True) as cur:
+                cur.execute("""
+                    DELETE FROM user_sessions 
+                    WHERE user_id=%s
+                """, (user_id,))
+                deleted_count = cur.rowcount
 
             print(f"🗑️ Todas las sesiones eliminadas para usuario {user_id}: {deleted_count}")
             return deleted_count
@@ -129,32 +106,24 @@ class UserSession:
     @staticmethod
     def cleanup_expired():
         """Marcar como inactivas las sesiones expiradas"""
-        conn = psycopg2.connect(**Config.get_database_config())
-        cur = conn.cursor()
-        cur.execute("""
-            UPDATE user_sessions 
-            SET is_active=false 
-            WHERE expires_at <= NOW() AND is_active=true
-        """)
-        conn.commit()
-        cur.close()
-        conn.close()
+        with get_cursor(commit=True) as cur:
+            cur.execute("""
+                UPDATE user_sessions 
+                SET is_active=false 
+                WHERE expires_at <= NOW() AND is_active=true
+            """)
 
     @staticmethod
     def cleanup_old_sessions(days_old=2):
         """Eliminar sesiones inactivas o expiradas más viejas de X días"""
         try:
-            conn = psycopg2.connect(**Config.get_database_config())
-            cur = conn.cursor()
-            cur.execute("""
-                DELETE FROM user_sessions 
-                WHERE (is_active = false OR expires_at < NOW()) 
-                AND created_at < NOW() - INTERVAL '%s days'
-            """, (days_old,))
-            deleted_count = cur.rowcount
-            conn.commit()
-            cur.close()
-            conn.close()
+            with get_cursor(commit=True) as cur:
+                cur.execute("""
+                    DELETE FROM user_sessions 
+                    WHERE (is_active = false OR expires_at < NOW()) 
+                    AND created_at < NOW() - INTERVAL '%s days'
+                """, (days_old,))
+                deleted_count = cur.rowcount
         
             print(f"🧹 Sesiones antiguas eliminadas: {deleted_count}")
             return deleted_count
@@ -165,34 +134,26 @@ class UserSession:
     @staticmethod
     def refresh_session(session_token, extension_hours=24):
         """Renovar una sesión extendiendo su tiempo de expiración"""
-        conn = psycopg2.connect(**Config.get_database_config())
-        cur = conn.cursor()
         new_expires_at = datetime.now(tz=timezone.utc) + timedelta(hours=extension_hours)
-        cur.execute("""
-            UPDATE user_sessions 
-            SET expires_at=%s, last_activity=NOW()
-            WHERE session_token=%s AND is_active=true
-            RETURNING id
-        """, (new_expires_at, session_token))
-        row = cur.fetchone()
-        conn.commit()
-        cur.close()
-        conn.close()
+        with get_cursor(commit=True) as cur:
+            cur.execute("""
+                UPDATE user_sessions 
+                SET expires_at=%s, last_activity=NOW()
+                WHERE session_token=%s AND is_active=true
+                RETURNING id
+            """, (new_expires_at, session_token))
+            row = cur.fetchone()
         return bool(row)
 
     @staticmethod
     def update_last_activity(session_token):
         """Actualizar la última actividad de una sesión"""
-        conn = psycopg2.connect(**Config.get_database_config())
-        cur = conn.cursor()
-        cur.execute("""
-            UPDATE user_sessions 
-            SET last_activity=NOW()
-            WHERE session_token=%s AND is_active=true
-        """, (session_token,))
-        conn.commit()
-        cur.close()
-        conn.close()
+        with get_cursor(commit=True) as cur:
+            cur.execute("""
+                UPDATE user_sessions 
+                SET last_activity=NOW()
+                WHERE session_token=%s AND is_active=true
+            """, (session_token,))
 
     @staticmethod
     def get_session_info(session_token):
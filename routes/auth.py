@@ -5,6 +5,7 @@ from flask_mail import Message
 from extensions import mail 
 import jwt
 from config import Config
+from database.connection import get_cursor
 from models.user_session import UserSession
 
 EMAIL_DESC = "Correo electrónico"
@@ -440,18 +441,14 @@ class DebugToken(Resource):
     def get(self, token):
         """Debug: Verificar token"""
         try:
-            conn = psycopg2.connect(**Config.DATABASE)
-            cur = conn.cursor()
-            
-            cur.execute("""
-                SELECT email, expira_en, NOW() as current_time
-                FROM password_resets 
-                WHERE token = %s
-            """, (token,))
-            
-            row = cur.fetchone()
-            cur.close()
-            conn.close()
+            with get_cursor() as cur:
+                cur.execute("""
+                    SELECT email, expira_en, NOW() as current_time
+                    FROM password_resets 
+                    WHERE token = %s
+                """, (token,))
+                
+                row = cur.fetchone()
             
             if row:
                 return {
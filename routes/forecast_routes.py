@@ -1,15 +1,47 @@
+from datetime import datetime
 from flask_restx import Namespace, Resource, fields
-from services.forecast_service import get_forecast_data, export_forecast
+from services.forecast_service import get_forecast_data, get_forecast_accuracy, export_forecast
 
 api = Namespace("ml/forecast", description="Predicción de Demanda con ML")
 
 # Modelos para Swagger
+accuracy_metrics_model = api.model("ForecastAccuracyMetrics", {
+    "products": fields.Integer(description="Productos evaluados"),
+    "mape": fields.Float(description="MAPE (%) en días con venta"),
+    "smape": fields.Float(description="sMAPE (%)"),
+    "bias": fields.Float(description="Sesgo (%): positivo si se predijo de más"),
+    "wape": fields.Float(description="Error absoluto ponderado por unidades (%)"),
+    "accuracy": fields.Float(description="100 - WAPE")
+})
+
+category_accuracy_model = api.inherit("CategoryForecastAccuracy", accuracy_metrics_model, {
+    "category": fields.String(description="Categoría")
+})
+
+backtest_model = api.inherit("ForecastBacktest", accuracy_metrics_model, {
+    "horizon": fields.Integer(description="Días predichos en cada pliegue"),
+    "folds": fields.Integer(description="Orígenes evaluados"),
+    "evaluatedAt": fields.String(description="Momento del backtesting"),
+    "stale": fields.Boolean(description="Calculado antes de hoy; se está recalculando"),
+    "categories": fields.List(fields.Nested(category_accuracy_model))
+})
+
+cache_model = api.model("ForecastCache", {
+    "version": fields.Integer(description="Versión de los datos con que se calculó"),
+    "builtAt": fields.String(description="Momento del cálculo"),
+    "ageSeconds": fields.Float(description="Antigüedad del resultado"),
+    "buildSeconds": fields.Float(description="Duración del cálculo"),
+    "hit": fields.Boolean(description="Servido desde la caché sin recalcular")
+})
+
 forecast_model = api.model("Forecast", {
     "products": fields.List(fields.Raw),
     "timeline": fields.List(fields.Raw),
     "seasonalPatterns": fields.List(fields.Raw),
     "recommendations": fields.List(fields.Raw),
-    "accuracy": fields.Float
+    "accuracy": fields.Float(description="Precisión del último backtesting (100 - WAPE)"),
+    "backtest": fields.Nested(backtest_model, allow_null=True),
+    "cache": fields.Nested(cache_model, allow_null=True)
 })
 
 @api.route("/")
@@ -21,6 +53,19 @@ class Forecast(Resource):
         period = request.args.get('period', 'week')
         return get_forecast_data(period)
 
+@api.route("/accuracy")
+class ForecastAccuracy(Resource):
+    @api.doc(params={"limit": "Productos con mayor error a listar (1-200, por defecto 20)"})
+    def get(self):
+        """Precisión real de la predicción (backtesting con origen móvil)"""
+        from flask import request
+        limit = request.args.get('limit', 20, type=int)
+        
+        if not 1 <= limit <= 200:
+            return {"error": "limit debe ser un entero entre 1 y 200"}, 400
+        
+        return get_forecast_accuracy(limit)
+
 @api.route("/export")
 class ForecastExport(Resource):
     def get(self):
@@ -1,6 +1,9 @@
 from flask_restx import Namespace, Resource, fields
 from services.ml_service import (
     get_all_recommendations,
+    get_cart_recommendations,
+    get_similar_products,
+    get_product_upsells,
     search_product_recommendations,
     create_bundle
 )
@@ -49,13 +52,46 @@ performance_metrics_model = api.model("PerformanceMetrics", {
     "revenueIncrease": fields.Float(description="Incremento de ingresos")
 })
 
+snapshot_model = api.model("RecommendationSnapshot", {
+    "version": fields.Integer(description="Versión de la instantánea en este worker"),
+    "builtAt": fields.String(description="Momento del cálculo (ISO 8601, UTC)"),
+    "ageSeconds": fields.Float(description="Antigüedad de la instantánea en segundos"),
+    "buildSeconds": fields.Float(description="Duración del cálculo en segundos"),
+    "stale": fields.Boolean(description="Vencida o con datos nuevos; se está sirviendo mientras se recalcula"),
+    "refreshing": fields.Boolean(description="Hay un recálculo en curso")
+})
+
+upsell_item_model = api.model("UpsellItem", {
+    "id": fields.Integer(description="ID de la oportunidad"),
+    "productId": fields.Integer(description="Producto original"),
+    "product": fields.String(description="Nombre del producto original"),
+    "productPrice": fields.Float(description="Precio del producto original"),
+    "upgradeId": fields.Integer(description="Alternativa sugerida"),
+    "upgrade": fields.String(description="Nombre de la alternativa"),
+    "upgradePrice": fields.Float(description="Precio de la alternativa"),
+    "category": fields.String(description="Categoría"),
+    "priceIncrease": fields.Float(description="Aumento de precio (%)"),
+    "extraMargin": fields.Float(description="Margen adicional por unidad")
+})
+
 recommendation_response_model = api.model("RecommendationResponse", {
     "productRecommendations": fields.List(fields.Nested(product_recommendation_model)),
     "bundleSuggestions": fields.List(fields.Nested(bundle_model)),
     "crossSellOpportunities": fields.List(fields.Nested(cross_sell_model)),
-    "upsellItems": fields.List(fields.Raw),
+    "upsellItems": fields.List(fields.Nested(upsell_item_model)),
     "trendingCombos": fields.List(fields.Raw),
-    "performanceMetrics": fields.Nested(performance_metrics_model)
+    "performanceMetrics": fields.Nested(performance_metrics_model),
+    "snapshot": fields.Nested(snapshot_model)
+})
+
+cart_request_model = api.model("CartRecommendationRequest", {
+    "product_ids": fields.List(fields.Integer, required=True, description="Productos en el carrito"),
+    "limit": fields.Integer(description="Máximo de sugerencias (1-50)", default=8)
+})
+
+cart_response_model = api.model("CartRecommendationResponse", {
+    "cart": fields.List(fields.Integer, description="Productos del carrito (sin repetir)"),
+    "recommendations": fields.List(fields.Nested(product_recommendation_model))
 })
 
 # -------------------------
@@ -81,6 +117,56 @@ class ProductRecommendation(Resource):
         
         return search_product_recommendations(query)
 
+@api.route("/recommendations/cart")
+class CartRecommendation(Resource):
+    @api.expect(cart_request_model)
+    @api.response(200, "Sugerencias para el carrito", cart_response_model)
+    def post(self):
+        """Sugerencias para toda la canasta (excluye lo que ya está en el carrito)"""
+        from flask import request
+        data = request.get_json(silent=True) or {}
+        product_ids = data.get("product_ids")
+        
+        if not isinstance(product_ids, list) or not product_ids:
+            return {"error": "Se requiere product_ids con al menos un producto"}, 400
+        if not all(isinstance(pid, int) and not isinstance(pid, bool) for pid in product_ids):
+            return {"error": "product_ids debe ser una lista de enteros"}, 400
+        
+        limit = data.get("limit", 8)
+        if not isinstance(limit, int) or not 1 <= limit <= 50:
+            return {"error": "limit debe ser un entero entre 1 y 50"}, 400
+        
+        return get_cart_recommendations(product_ids, limit)
+
+@api.route("/products/<int:product_id>/similar")
+class SimilarProducts(Resource):
+    @api.doc(params={"limit": "Máximo de productos (1-50, por defecto 6)"})
+    def get(self, product_id):
+        """Productos con stock parecidos por nombre, descripción, marca y categoría"""
+        from flask import request
+        limit = request.args.get("limit", 6, type=int)
+        
+        if not 1 <= limit <= 50:
+            return {"error": "limit debe ser un entero entre 1 y 50"}, 400
+        
+        return get_similar_products(product_id, limit)
+
+@api.route("/products/<int:product_id>/upsell")
+class ProductUpsell(Resource):
+    @api.doc(params={"limit": "Máximo de alternativas (1-50, por defecto 5)"})
+    def get(self, product_id):
+        """Alternativas más caras con stock, misma categoría y nivel de marca, por margen"""
+        from flask import request
+        limit = request.args.get("limit", 5, type=int)
+        
+        if not 1 <= limit <= 50:
+            return {"error": "limit debe ser un entero entre 1 y 50"}, 400
+        
+        result = get_product_upsells(product_id, limit)
+        if result is None:
+            return {"error": "Producto no encontrado"}, 404
+        return result
+
 @api.route("/recommendations/bundle")
 class BundleCreation(Resource):
     def post(self):
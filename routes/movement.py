@@ -1,6 +1,7 @@
 # routes/movements.py
 from flask_restx import Namespace, Resource, fields
 from flask import request
+from utils.pagination import PAGE_PARAMS, page_model, list_response
 from services.movement_service import (
     get_all_movements, get_movement, create_movement,
     update_movement, delete_movement
@@ -21,12 +22,17 @@ movement_model = api.model("Movement", {
     "User_ID": fields.Integer(description="Usuario que hizo el movimiento"),
 })
 
+movement_page_model = page_model(api, "MovementPage", movement_model)
+
 @api.route("/")
 class MovementList(Resource):
-    @api.marshal_list_with(movement_model,mask=False)
+    @api.doc(params=PAGE_PARAMS)
+    @api.response(200, "Lista completa, o página {items, next_cursor} con after/limit", [movement_model])
+    @api.response(400, "Parámetros de paginación inválidos")
     def get(self):
-        """Listar todos los movimientos"""
-        return get_all_movements()
+        """Listar todos los movimientos (paginación keyset opcional)"""
+        return list_response(api, get_all_movements, movement_model, movement_page_model,
+                             key=lambda movement: movement.movement_id)
 
     @api.expect(movement_model, validate=True)
     def post(self):
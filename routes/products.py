@@ -1,5 +1,6 @@
 # app/routes/products.py
 from flask_restx import Namespace, Resource, fields
+from utils.pagination import PAGE_PARAMS, page_model, list_response
 from services.product_service import (
     create_product,
     get_all_products,
@@ -25,6 +26,8 @@ product_model = api.model("Product", {
     "Price": fields.Float(required=True, description="Precio del producto")
 })
 
+product_page_model = page_model(api, "ProductPage", product_model)
+
 
 # -------------------------
 # Endpoints CRUD
@@ -32,10 +35,13 @@ product_model = api.model("Product", {
 
 @api.route("/")
 class ProductList(Resource):
-    @api.marshal_list_with(product_model,mask=False)
+    @api.doc(params=PAGE_PARAMS)
+    @api.response(200, "Lista completa, o página {items, next_cursor} con after/limit", [product_model])
+    @api.response(400, "Parámetros de paginación inválidos")
     def get(self):
-        """Obtener todos los productos"""
-        return get_all_products()
+        """Obtener todos los productos (paginación keyset opcional)"""
+        return list_response(api, get_all_products, product_model, product_page_model,
+                             key=lambda product: product["Product_ID"])
 
     @api.expect(product_model)
     @api.response(201, "Producto creado")
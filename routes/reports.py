@@ -4,7 +4,8 @@ from services.report_service import (
     get_sales_metrics, 
     get_sales_trend, 
     get_sales_by_category, 
-    get_top_products
+    get_top_products,
+    get_dashboard
 )
 
 api = Namespace("reports", description="Sales reports operations")
@@ -35,6 +36,13 @@ product_model = api.model("TopProduct", {
     "cantidad": fields.Integer(description="Cantidad vendida")
 })
 
+dashboard_model = api.model("Dashboard", {
+    "metrics": fields.Nested(metrics_model),
+    "trend": fields.List(fields.Nested(trend_model)),
+    "categories": fields.List(fields.Nested(category_model)),
+    "top_products": fields.List(fields.Nested(product_model))
+})
+
 @api.route("/metrics")
 class SalesMetrics(Resource):
     @api.marshal_with(metrics_model, mask=False)
@@ -66,4 +74,19 @@ class TopProducts(Resource):
     def get(self):
         """Obtener productos más vendidos"""
         limit = request.args.get('limit', 5, type=int)
-        return get_top_products(limit)
\ No newline at end of file
+        return get_top_products(limit)
+
+@api.route("/dashboard")
+class SalesDashboard(Resource):
+    @api.doc(params={
+        "start_date": "Fecha inicial (YYYY-MM-DD)",
+        "end_date": "Fecha final, inclusiva (YYYY-MM-DD)",
+        "limit": "Cantidad de productos en el top (por defecto 5)"
+    })
+    @api.marshal_with(dashboard_model, mask=False)
+    def get(self):
+        """Obtener todos los reportes del dashboard en una sola petición"""
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        limit = request.args.get('limit', 5, type=int)
+        return get_dashboard(start_date, end_date, limit)
@@ -1,7 +1,11 @@
+from flask import request
 from flask_restx import Namespace, Resource, fields
+from utils.pagination import PAGE_PARAMS, page_model, list_response
 from services.sale_detail_service import (
-    create_sale_detail, get_all_sale_details, get_sale_detail, update_sale_detail, delete_sale_detail
+    create_sale_detail, get_all_sale_details, get_sale_detail, update_sale_detail, delete_sale_detail,
+    stream_sale_details
 )
+from utils.export import EXPORT_PARAMS, get_export_format, export_response
 
 NOT_FOUND_MSG = "Sale Detail not found"
 
@@ -16,12 +20,17 @@ sale_detail_model = api.model("SaleDetail", {
     "Subtotal": fields.Float(description="Subtotal (Quantity * Price)")
 })
 
+sale_detail_page_model = page_model(api, "SaleDetailPage", sale_detail_model)
+
 @api.route("/")
 class SaleDetailList(Resource):
-    @api.marshal_list_with(sale_detail_model,mask=False)
+    @api.doc(params=PAGE_PARAMS)
+    @api.response(200, "Lista completa, o página {items, next_cursor} con after/limit", [sale_detail_model])
+    @api.response(400, "Parámetros de paginación inválidos")
     def get(self):
-        """Listar todos los detalles de venta"""
-        return get_all_sale_details()
+        """Listar todos los detalles de venta (paginación keyset opcional)"""
+        return list_response(api, get_all_sale_details, sale_detail_model, sale_detail_page_model,
+                             key=lambda detail: detail.detail_id)
 
     @api.expect(sale_detail_model)
     @api.marshal_with(sale_detail_model, code=201)
@@ -30,6 +39,21 @@ class SaleDetailList(Resource):
         return create_sale_detail(api.payload), 201
 
 
+@api.route("/export")
+class SaleDetailExport(Resource):
+    @api.doc(params={**EXPORT_PARAMS, "sale_id": "Exportar solo los detalles de esta venta"})
+    @api.response(200, "Archivo CSV o NDJSON enviado en streaming")
+    @api.response(400, "Formato de salida inválido")
+    def get(self):
+        """Exportar detalles de venta en streaming (memoria constante)"""
+        try:
+            fmt = get_export_format(request.args)
+        except ValueError as e:
+            api.abort(400, str(e))
+        chunks = stream_sale_details(fmt, request.args.get('sale_id', type=int))
+        return export_response(chunks, fmt, "detalles_venta")
+
+
 @api.route("/<int:detail_id>")
 @api.response(404, NOT_FOUND_MSG)
 class SaleDetailResource(Resource):
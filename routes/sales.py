@@ -1,5 +1,6 @@
 # routes/sales.py
 from flask_restx import Namespace, Resource, fields
+from utils.pagination import PAGE_PARAMS, page_model, list_response
 from services.sale_service import create_sale, get_all_sales, get_sale, update_sale, delete_sale
 
 
@@ -10,15 +11,23 @@ sale_model = api.model("Sale", {
     "Sale_ID": fields.Integer(readOnly=True, description="ID de la venta"),
     "Date": fields.String(description="Fecha de la venta"),
     "User_ID": fields.Integer(required=True, description="ID del usuario que hizo la venta"),
-    "Total": fields.Float(description="Total de la venta")
+    "Total": fields.Float(description="Total de la venta (suma de los detalles si los tiene)"),
+    "Payment_Method": fields.String(description="Método de pago", default="Efectivo"),
+    "Item_Count": fields.Integer(readOnly=True, attribute="item_count", description="Renglones de la venta"),
+    "Units": fields.Integer(readOnly=True, attribute="units", description="Unidades vendidas")
 })
 
+sale_page_model = page_model(api, "SalePage", sale_model)
+
 @api.route("/")
 class SalesList(Resource):
-    @api.marshal_list_with(sale_model,mask=False)
+    @api.doc(params=PAGE_PARAMS)
+    @api.response(200, "Lista completa, o página {items, next_cursor} con after/limit", [sale_model])
+    @api.response(400, "Parámetros de paginación inválidos")
     def get(self):
-        """Listar todas las ventas"""
-        return get_all_sales()
+        """Listar todas las ventas (paginación keyset opcional)"""
+        return list_response(api, get_all_sales, sale_model, sale_page_model,
+                             key=lambda sale: sale.sale_id)
 
     @api.expect(sale_model)
     @api.marshal_with(sale_model, code=201)
@@ -1,5 +1,7 @@
 from flask_restx import Namespace, Resource, fields
-from services.sale_service import get_sales_with_details, get_sales_by_filters
+from flask import request
+from services.sale_service import get_sales_with_details, get_sales_by_filters, stream_sales_report
+from utils.export import EXPORT_PARAMS, get_export_format, export_response
 
 api = Namespace("sales-report", description="Sales report operations")
 
@@ -25,11 +27,48 @@ class SalesReportList(Resource):
 
 @api.route("/filtered")
 class SalesReportFiltered(Resource):
+    @api.doc(params={
+        "start_date": "Fecha inicial (YYYY-MM-DD o ISO)",
+        "end_date": "Fecha final, inclusiva (YYYY-MM-DD o ISO)",
+        "seller_id": "ID del vendedor",
+        "payment_method": "Método de pago ('all' para todos)"
+    })
+    @api.response(400, "Formato de fecha inválido")
     @api.marshal_list_with(sales_report_model, mask=False)
     def get(self):
-        """Obtener ventas filtradas por fecha y método de pago"""
+        """Obtener ventas filtradas por fecha, vendedor y método de pago"""
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
         payment_method = request.args.get('payment_method')
+        seller_id = request.args.get('seller_id', type=int)
         
-        return get_sales_by_filters(start_date, end_date, payment_method)
\ No newline at end of file
+        try:
+            return get_sales_by_filters(start_date, end_date, payment_method, seller_id)
+        except ValueError:
+            api.abort(400, "Formato de fecha inválido, use YYYY-MM-DD")
+
+@api.route("/export")
+class SalesReportExport(Resource):
+    @api.doc(params={
+        **EXPORT_PARAMS,
+        "start_date": "Fecha inicial (YYYY-MM-DD o ISO)",
+        "end_date": "Fecha final, inclusiva (YYYY-MM-DD o ISO)",
+        "seller_id": "ID del vendedor",
+        "payment_method": "Método de pago ('all' para todos)"
+    })
+    @api.response(200, "Archivo CSV o NDJSON enviado en streaming")
+    @api.response(400, "Formato de salida o de fecha inválido")
+    def get(self):
+        """Exportar el reporte de ventas en streaming (memoria constante)"""
+        try:
+            fmt = get_export_format(request.args)
+            chunks = stream_sales_report(
+                fmt,
+                request.args.get('start_date'),
+                request.args.get('end_date'),
+                request.args.get('payment_method'),
+                request.args.get('seller_id', type=int)
+            )
+        except ValueError as e:
+            api.abort(400, str(e))
+        return export_response(chunks, fmt, "reporte_ventas")
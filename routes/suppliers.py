@@ -1,4 +1,5 @@
 from flask_restx import Namespace, Resource, fields
+from utils.pagination import PAGE_PARAMS, page_model, list_response
 from services.supplier_service import (
     get_all_suppliers,
     get_supplier,
@@ -21,12 +22,17 @@ supplier_model = api.model("Supplier", {
     "address": fields.String(description="Dirección")
 })
 
+supplier_page_model = page_model(api, "SupplierPage", supplier_model)
+
 @api.route("/")
 class SupplierList(Resource):
-    @api.marshal_list_with(supplier_model, mask=False)
+    @api.doc(params=PAGE_PARAMS)
+    @api.response(200, "Lista completa, o página {items, next_cursor} con after/limit", [supplier_model])
+    @api.response(400, "Parámetros de paginación inválidos")
     def get(self):
-        """Obtener todos los proveedores"""
-        return get_all_suppliers()
+        """Obtener todos los proveedores (paginación keyset opcional)"""
+        return list_response(api, get_all_suppliers, supplier_model, supplier_page_model,
+                             key=lambda supplier: supplier["supplier_id"])
 
     @api.expect(supplier_model)
     @api.response(201, "Proveedor creado")
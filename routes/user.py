@@ -1,4 +1,5 @@
 from flask_restx import Namespace, Resource, fields
+from utils.pagination import PAGE_PARAMS, page_model, list_response
 from services.user_service import (
     register_user,
     get_all_users,
@@ -49,6 +50,8 @@ user_update_model = api.model("UserUpdate", {
     "two_factor_secret": fields.String(description="Secreto 2FA")
 })
 
+user_page_model = page_model(api, "UserPage", user_model)
+
 role_assignment_model = api.model("RoleAssignment", {
     "user_id": fields.Integer(required=True, description="ID del usuario"),
     "role": fields.String(required=True, description="Nuevo rol")
@@ -56,10 +59,13 @@ role_assignment_model = api.model("RoleAssignment", {
 
 @api.route("/")
 class UserList(Resource):
-    @api.marshal_list_with(user_model)
+    @api.doc(params=PAGE_PARAMS)
+    @api.response(200, "Lista completa, o página {items, next_cursor} con after/limit", [user_model])
+    @api.response(400, "Parámetros de paginación inválidos")
     def get(self):
-        """Obtener todos los usuarios"""
-        return get_all_users()
+        """Obtener todos los usuarios (paginación keyset opcional)"""
+        return list_response(api, get_all_users, user_model, user_page_model,
+                             key=lambda user: user["id"])
 
     @api.expect(user_register_model)
     @api.response(201, "Usuario registrado")
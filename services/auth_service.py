@@ -3,11 +3,11 @@ import secrets
 import time
 import jwt
 import datetime
-import psycopg2
 import requests
 import json
 from flask import request
 from config import Config
+from database.connection import get_cursor, get_connection, release_connection
 from models.user import User
 from models.user_session import UserSession
 from werkzeug.security import check_password_hash
@@ -360,17 +360,13 @@ class AuthService:
     def force_logout_all_sessions():
         """Forzar cierre de todas las sesiones (útil para desarrollo)"""
         try:
-            conn = psycopg2.connect(**Config.DATABASE)
-            cur = conn.cursor()
-            cur.execute("""
-                UPDATE user_sessions 
-                SET is_active=false 
-                WHERE is_active=true
-            """)
-            count = cur.rowcount
-            conn.commit()
-            cur.close()
-            conn.close()
+            with get_cursor(commit=True) as cur:
+                cur.execute("""
+                    UPDATE user_sessions 
+                    SET is_active=false 
+                    WHERE is_active=true
+                """)
+                count = cur.rowcount
 
             log_event("FORCE_LOGOUT_ALL", "SYSTEM", "SUCCESS", f"Sesiones cerradas: {count}")
             return count
@@ -382,19 +378,16 @@ class AuthService:
     def get_all_active_sessions():
         """Obtener todas las sesiones activas en el sistema"""
         try:
-            conn = psycopg2.connect(**Config.DATABASE)
-            cur = conn.cursor()
-            cur.execute("""
-                SELECT us.id, us.user_id, u.nombre, u.email, us.ip_address, 
-                       us.created_at, us.last_activity, us.expires_at, us.session_token
-                FROM user_sessions us
-                JOIN users u ON us.user_id = u.id
-                WHERE us.is_active=true AND us.expires_at > NOW()
-                ORDER BY us.created_at DESC
-            """)
-            rows = cur.fetchall()
-            cur.close()
-            conn.close()
+            with get_cursor() as cur:
+                cur.execute("""
+                    SELECT us.id, us.user_id, u.nombre, u.email, us.ip_address, 
+                           us.created_at, us.last_activity, us.expires_at, us.session_token
+                    FROM user_sessions us
+                    JOIN users u ON us.user_id = u.id
+                    WHERE us.is_active=true AND us.expires_at > NOW()
+                    ORDER BY us.created_at DESC
+                """)
+                rows = cur.fetchall()
 
             sessions = []
             for row in rows:
@@ -519,16 +512,12 @@ class AuthService:
             expira_en = datetime.datetime.now() + datetime.timedelta(minutes=30)
             
             # 4. Guardar en BD
-            conn = psycopg2.connect(**Config.DATABASE)
-            cur = conn.cursor()
-            cur.execute("DELETE FROM password_resets WHERE email = %s", (email,))
-            cur.execute(
-                "INSERT INTO password_resets (email, token, expira_en) VALUES (%s, %s, %s)",
-                (email, token, expira_en)
-            )
-            conn.commit()
-            cur.close()
-            conn.close()
+            with get_cursor(commit=True) as cur:
+                cur.execute("DELETE FROM password_resets WHERE email = %s", (email,))
+                cur.execute(
+                    "INSERT INTO password_resets (email, token, expira_en) VALUES (%s, %s, %s)",
+                    (email, token, expira_en)
+                )
             
             print(f"✅ Token guardado en BD")
             
@@ -617,7 +606,7 @@ class AuthService:
     def reset_password(token, new_password):
         """Restablecer contraseña con token válido - VERSIÓN CON MAILGUN"""
         try:
-            conn = psycopg2.connect(**Config.DATABASE)
+            conn = get_connection()
             cur = conn.cursor()
             
             print(f"🔄 Reset password con token: {token[:20]}...")
@@ -632,7 +621,7 @@ class AuthService:
             row = cur.fetchone()
             if not row:
                 cur.close()
-                conn.close()
+                release_connection(conn)
                 print(f"❌ Token inválido o expirado: {token[:20]}...")
                 return {"error": "Token inválido o expirado"}, 400
 
@@ -643,7 +632,7 @@ class AuthService:
             is_valid, password_error = AuthService.validate_password_strength(new_password)
             if not is_valid:
                 cur.close()
-                conn.close()
+                release_connection(conn)
                 print(f"❌ Contraseña débil: {password_error}")
                 return {"error": password_error}, 400
 
@@ -651,7 +640,7 @@ class AuthService:
             user = User.find_by_email(email_db)
             if not user:
                 cur.close()
-                conn.close()
+                release_connection(conn)
                 print(f"❌ Usuario no encontrado: {email_db}")
                 return {"error": "Usuario no encontrado"}, 404
 
@@ -678,7 +667,7 @@ class AuthService:
             
             conn.commit()
             cur.close()
-            conn.close()
+            release_connection(conn)
 
             # Enviar email de confirmación con Mailgun
             try:
@@ -754,7 +743,7 @@ class AuthService:
     def reset_password(token, new_password):
         """Restablecer contraseña con token válido - Versión mejorada"""
         try:
-            conn = psycopg2.connect(**Config.DATABASE)
+            conn = get_connection()
             cur = conn.cursor()
         
             # Buscar token válido y no expirado
@@ -767,7 +756,7 @@ class AuthService:
             row = cur.fetchone()
             if not row:
                 cur.close()
-                conn.close()
+                release_connection(conn)
                 return {"error": "Token inválido o expirado"}, 400
 
             email_db, expira_en = row[0], row[1]
@@ -776,14 +765,14 @@ class AuthService:
             is_valid, password_error = AuthService.validate_password_strength(new_password)
             if not is_valid:
                 cur.close()
-                conn.close()
+                release_connection(conn)
                 return {"error": password_error}, 400
 
             # Buscar usuario
             user = User.find_by_email(email_db)
             if not user:
                 cur.close()
-                conn.close()
+                release_connection(conn)
                 return {"error": "Usuario no encontrado"}, 404
 
             # Actualizar contraseña - Diferentes enfoques:
@@ -793,7 +782,7 @@ class AuthService:
                 success = User.update_password(email_db, new_password)
                 if not success:
                     cur.close()
-                    conn.close()
+                    release_connection(conn)
                     return {"error": "Error al actualizar contraseña"}, 500
                 
             # Opción B: Actualizar directamente
@@ -810,7 +799,7 @@ class AuthService:
             cur.execute("DELETE FROM password_resets WHERE token = %s", (token,))
             conn.commit()
             cur.close()
-            conn.close()
+            release_connection(conn)
 
             # Enviar email de confirmación
             try:
@@ -0,0 +1,172 @@
+"""
+Caché de resultados de /ml/forecast por período.
+
+Cada resultado lleva su sello: la versión 'forecast' de data_version (la
+suben los triggers al confirmar escrituras en ventas, movimientos,
+productos o el backtesting) y el día de la tienda (la historia se cierra a
+diario). Comprobar el sello es una lectura por clave primaria; si no
+cambió se responde desde la memoria del worker.
+
+El último resultado de cada período se guarda también en forecast_results,
+así un worker que no lo tiene en memoria lo lee del que lo calculó. Con el
+sello vencido, el cálculo se hace con un advisory lock por período: lo
+hace un solo worker (y un solo hilo) a la vez, y los que esperan el lock
+leen al obtenerlo el resultado que este guardó.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+from psycopg2.extras import Json
+from database.connection import get_cursor
+from models.Forecast import PERIOD_DAYS, DemandForecast
+from utils.store_time import store_today
+
+logger = logging.getLogger(__name__)
+
+
+class CachedForecast:
+    """Resultado de calculate_demand_forecast para un período y sello"""
+
+    def __init__(self, stamp, data: Dict, built_at: float, build_seconds: float):
+        self.stamp = stamp
+        self.data = data
+        self.built_at = built_at
+        self.build_seconds = build_seconds
+
+    def age(self, now: Optional[float] = None) -> float:
+        return max(0.0, (now or time.time()) - self.built_at)
+
+
+class ForecastResultStore:
+    """Resultados en forecast_results, compartidos por todos los workers"""
+
+    @contextmanager
+    def flight(self, period: str):
+        """Cursor propio con el advisory lock del período (se libera al confirmar)"""
+        with get_cursor(commit=True, own_connection=True) as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (f"forecast:{period}",))
+            yield cur
+
+    def load(self, period: str, stamp, cur=None) -> Optional[CachedForecast]:
+        """Resultado guardado para `period` si tiene el sello `stamp`"""
+        query = """
+            SELECT data, built_at, build_seconds FROM forecast_results
+            WHERE period = %s AND version IS NOT DISTINCT FROM %s AND day IS NOT DISTINCT FROM %s
+        """
+        params = (period, stamp[0], stamp[1])
+        if cur is None:
+            with get_cursor() as own:
+                own.execute(query, params)
+                row = own.fetchone()
+        else:
+            cur.execute(query, params)
+            row = cur.fetchone()
+        if row is None:
+            return None
+        return CachedForecast(stamp, row[0], row[1].timestamp(), row[2])
+
+    def save(self, period: str, entry: CachedForecast, cur):
+        cur.execute("""
+            INSERT INTO forecast_results (period, version, day, data, built_at, build_seconds)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON CONFLICT (period) DO UPDATE SET
+                version = EXCLUDED.version, day = EXCLUDED.day, data = EXCLUDED.data,
+                built_at = EXCLUDED.built_at, build_seconds = EXCLUDED.build_seconds
+        """, (
+            period, entry.stamp[0], entry.stamp[1], Json(entry.data),
+            datetime.fromtimestamp(entry.built_at, timezone.utc), entry.build_seconds
+        ))
+
+
+class ForecastCache:
+    """Resultados por período en memoria y en forecast_results, con un cálculo a la vez por período"""
+
+    def __init__(self, compute=None, stamp=None, store=None):
+        self._compute = compute or compute_forecast
+        self._stamp = stamp or forecast_stamp
+        self._store = store or ForecastResultStore()
+        self._entries: Dict[str, CachedForecast] = {}
+        self._flights: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, period: str) -> Tuple[CachedForecast, bool]:
+        """(resultado vigente, True si no hubo que calcularlo en esta petición)"""
+        # Un período desconocido se predice como 'week': misma entrada
+        period = period if period in PERIOD_DAYS else 'week'
+        stamp = self._stamp()
+        entry = self._entries.get(period)
+        if entry is not None and entry.stamp == stamp:
+            return entry, True
+
+        with self._lock:
+            flight = self._flights.setdefault(period, threading.Lock())
+        with flight:
+            # Mientras se esperaba, otro hilo pudo calcularlo con el sello actual
+            stamp = self._stamp()
+            entry = self._entries.get(period)
+            if entry is None or entry.stamp != stamp:
+                entry = self._store.load(period, stamp)
+            if entry is not None:
+                self._entries[period] = entry
+                return entry, True
+
+            with self._store.flight(period) as cur:
+                # Mientras se esperaba el lock, otro worker pudo guardarlo
+                entry = self._store.load(period, stamp, cur)
+                if entry is not None:
+                    self._entries[period] = entry
+                    return entry, True
+
+                started = time.time()
+                data = self._compute(period)
+                # Se guarda con el sello leído antes de calcular: si los datos
+                # cambiaron durante el cálculo, la próxima lectura lo recalcula
+                entry = CachedForecast(stamp, data, time.time(), time.time() - started)
+                self._store.save(period, entry, cur)
+            self._entries[period] = entry
+            logger.info(f"Predicción '{period}' (versión {stamp[0]}) calculada en {entry.build_seconds:.2f}s")
+        return entry, False
+
+
+def compute_forecast(period: str) -> Dict:
+    return DemandForecast().calculate_demand_forecast(period)
+
+
+def forecast_stamp():
+    """(versión 'forecast' de data_version, día de la tienda)"""
+    with get_cursor() as cur:
+        cur.execute("SELECT version FROM data_version WHERE name = 'forecast'")
+        row = cur.fetchone()
+    return (row[0] if row else None, store_today())
+
+
+def cache_metadata(entry: CachedForecast, hit: bool) -> Dict:
+    """Versión y antigüedad del resultado para la respuesta"""
+    return {
+        "version": entry.stamp[0],
+        "builtAt": datetime.fromtimestamp(entry.built_at, timezone.utc).isoformat(),
+        "ageSeconds": round(entry.age(), 1),
+        "buildSeconds": round(entry.build_seconds, 3),
+        "hit": hit
+    }
+
+
+_cache = None
+_cache_pid = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ForecastCache:
+    """Caché del proceso actual (se recrea tras un fork)"""
+    global _cache, _cache_pid
+
+    pid = os.getpid()
+    with _cache_lock:
+        if _cache is None or _cache_pid != pid:
+            _cache = ForecastCache()
+            _cache_pid = pid
+    return _cache
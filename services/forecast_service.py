@@ -1,11 +1,61 @@
+import logging
+import threading
 from models.Forecast import DemandForecast
+from services.forecast_cache import cache_metadata, get_cache
+
+logger = logging.getLogger(__name__)
+
+# Un solo backtesting en segundo plano por proceso
+_backtest_lock = threading.Lock()
+_backtest_running = False
+
+def _run_backtest():
+    global _backtest_running
+    try:
+        DemandForecast().run_backtest()
+    except Exception:
+        logger.exception("Error en el backtesting de la predicción de demanda")
+    finally:
+        with _backtest_lock:
+            _backtest_running = False
+
+def refresh_backtest_in_background(summary) -> bool:
+    """Recalcular forecast_accuracy en un hilo si falta o es de un día anterior"""
+    global _backtest_running
+    if summary is not None and not summary.get("stale"):
+        return False
+    with _backtest_lock:
+        if _backtest_running:
+            return False
+        _backtest_running = True
+    threading.Thread(target=_run_backtest, name="forecast-backtest", daemon=True).start()
+    return True
 
 def get_forecast_data(period: str = 'week'):
-    """Obtener datos de predicción de demanda"""
+    """Predicción de demanda desde la caché por período (se recalcula si cambiaron los datos)"""
+    entry, hit = get_cache().get(period)
+    result = {**entry.data, "cache": cache_metadata(entry, hit)}
+    # La precisión sale del último backtesting guardado; si falta o venció se
+    # recalcula aparte (sin ventas no hay timeline ni nada que evaluar)
+    if result["timeline"]:
+        refresh_backtest_in_background(result.get("backtest"))
+    return result
+
+def get_forecast_accuracy(limit: int = 20):
+    """Precisión real (backtesting) total, por categoría y productos con mayor error"""
     forecast = DemandForecast()
-    return forecast.calculate_demand_forecast(period)
+    summary = forecast.get_accuracy_summary()
+    refresh_backtest_in_background(summary)
+    return {
+        "summary": summary,
+        "products": forecast.get_product_accuracy(limit) if summary else []
+    }
+
+def run_backtest():
+    """Backtesting completo ahora (CLI)"""
+    return DemandForecast().run_backtest()
 
 def export_forecast():
-    """Exportar predicción a CSV"""
-    forecast = DemandForecast()
-    return forecast.export_forecast_data()
\ No newline at end of file
+    """Exportar a CSV la predicción mensual de la caché"""
+    entry, _ = get_cache().get('month')
+    return DemandForecast().export_forecast_data(entry.data)
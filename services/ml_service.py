@@ -1,15 +1,92 @@
+import logging
+import threading
+from database.connection import run_after_commit
 from models.recommendation import RecommendationSystem
+from services.recommendation_snapshot import (
+    data_fingerprint, ensure_neighbor_index, get_store, mark_stale, snapshot_metadata
+)
+
+logger = logging.getLogger(__name__)
+
+# Un solo cálculo inicial de product_similarity en segundo plano por proceso
+# (entre procesos lo evita el advisory lock de rebuild_content_similarity)
+_similarity_lock = threading.Lock()
+_similarity_running = False
+
+def _run_similarity_rebuild():
+    global _similarity_running
+    try:
+        RecommendationSystem().rebuild_content_similarity(if_empty=True)
+    except Exception:
+        logger.exception("Error al calcular la similitud de contenido")
+    finally:
+        with _similarity_lock:
+            _similarity_running = False
+
+def rebuild_similarity_in_background() -> bool:
+    """Calcular product_similarity en un hilo si todavía no existe"""
+    global _similarity_running
+    with _similarity_lock:
+        if _similarity_running:
+            return False
+        _similarity_running = True
+    threading.Thread(target=_run_similarity_rebuild, name="content-similarity", daemon=True).start()
+    return True
 
 def get_all_recommendations():
-    """Obtener todas las recomendaciones"""
-    recommender = RecommendationSystem()
-    return recommender.get_all_recommendations()
+    """Recomendaciones desde la instantánea en memoria (se recalcula en segundo plano)"""
+    store = get_store()
+    snapshot = store.get()
+    return {**snapshot.data, "snapshot": snapshot_metadata(snapshot, store)}
 
 def search_product_recommendations(query: str):
     """Buscar recomendaciones para un producto específico"""
     recommender = RecommendationSystem()
     return recommender.search_product_recommendations(query)
 
+def get_cart_recommendations(product_ids: list, limit: int = 8):
+    """Sugerencias para el carrito desde el índice de vecinos compartido"""
+    recommender = RecommendationSystem()
+    index = recommender.get_neighbor_index()
+    if index is None:
+        # Primer uso sin índice en disco: se genera una vez para todos los workers
+        index = ensure_neighbor_index(data_fingerprint())
+    return {
+        "cart": list(dict.fromkeys(product_ids)),
+        "recommendations": recommender.get_cart_recommendations(product_ids, limit, index=index)
+    }
+
+def get_similar_products(product_id: int, limit: int = 6):
+    """Productos parecidos por contenido (vacío mientras se calcula el índice)"""
+    recommender = RecommendationSystem()
+    similar = recommender.get_similar_products(product_id, limit)
+    if not similar and not recommender.has_content_similarity():
+        rebuild_similarity_in_background()
+    return {"product_id": product_id, "similar": similar}
+
+def get_product_upsells(product_id: int, limit: int = 5):
+    """Alternativas más caras y de mayor margen para un producto; None si no existe"""
+    upsells = RecommendationSystem().get_product_upsells(product_id, limit)
+    if upsells is None:
+        return None
+    return {"product_id": product_id, "upsells": upsells}
+
+def product_changed(product_id: int):
+    """Actualizar la similitud de contenido del producto (tras el commit)"""
+    if not RecommendationSystem().update_content_similarity(product_id):
+        rebuild_similarity_in_background()
+
+def rebuild_content_similarity():
+    """Recalcular la similitud de contenido de todo el catálogo"""
+    return RecommendationSystem().rebuild_content_similarity()
+
+def refresh_frequent_itemsets():
+    """Recalcular los conjuntos frecuentes que usan los bundles"""
+    recommender = RecommendationSystem()
+    count = recommender.refresh_frequent_itemsets()
+    run_after_commit(mark_stale)
+    return count
+
 def create_bundle(items: list):
     """Crear un nuevo bundle (para implementar después)"""
     return {
@@ -1,8 +1,8 @@
 # services/movement_service.py
 from models.movement import Movement
 
-def get_all_movements():
-    return Movement.get_all()
+def get_all_movements(after=None, limit=None):
+    return Movement.get_all(after, limit)
 
 def get_movement(movement_id):
     return Movement.find_by_id(movement_id)
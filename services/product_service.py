@@ -1,4 +1,12 @@
 from models.Product import Product
+from database.connection import run_after_commit
+from services.ml_service import product_changed
+from services.recommendation_snapshot import mark_stale
+
+def _catalog_changed(product_id):
+    """Invalidar recomendaciones y actualizar la similitud del producto tras el commit"""
+    run_after_commit(mark_stale)
+    run_after_commit(lambda: product_changed(product_id))
 
 def create_product(data):
     product = Product(
@@ -19,10 +27,11 @@ def create_product(data):
         location=data.get('Location')
     )
     product_id = product.save()
+    _catalog_changed(product_id)
     return Product.find_by_id(product_id).to_dict()
 
-def get_all_products():
-    products = Product.get_all()
+def get_all_products(after=None, limit=None):
+    products = Product.get_all(after, limit)
     return [product.to_dict() for product in products]
 
 def get_product(product_id):
@@ -48,8 +57,11 @@ def update_product(product_id, data):
         product.supplier = data.get('Supplier', product.supplier)
         product.location = data.get('Location', product.location)
         product.update()
+        _catalog_changed(product_id)
         return product.to_dict()
     return None
 
 def delete_product(product_id):
-    return Product.delete(product_id)
\ No newline at end of file
+    deleted = Product.delete(product_id)
+    _catalog_changed(product_id)
+    return deleted
\ No newline at end of file
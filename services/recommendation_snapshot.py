@@ -0,0 +1,261 @@
+"""
+Instantánea precalculada de /ml/recommendations.
+
+Cada worker guarda en memoria la última instantánea (versión, momento de
+cálculo y resultado) y la sirve sin tocar la base de datos. Se recalcula en
+un hilo de fondo:
+
+- cada RECO_SNAPSHOT_REFRESH_SECONDS como máximo;
+- cuando cambian los datos: cada RECO_SNAPSHOT_CHECK_SECONDS se compara una
+  huella barata de la base (versiones 'sales' y 'recommendations' de
+  data_version, que suben los triggers al confirmar cualquier escritura),
+  y los servicios del mismo proceso avisan con mark_stale() tras el commit.
+
+Mientras se calcula la siguiente se sigue sirviendo la anterior; solo la
+primera petición del worker espera el cálculo.
+
+Antes de cada cálculo se asegura el índice de vecinos en disco para la
+huella actual. Lo genera un solo worker (con un lock de archivo); los
+demás, y los workers reciclados, solo lo abren con mmap.
+"""
+import logging
+import os
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from config import Config
+from database.connection import get_cursor
+from models.neighbor_index import NeighborIndex, build_neighbor_arrays, open_neighbor_index, write_neighbor_index
+from models.recommendation import RecommendationSystem
+from utils.store_time import store_today
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin lock entre procesos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class Snapshot:
+    """Resultado de un cálculo completo de recomendaciones"""
+
+    def __init__(self, version: int, data: Dict, fingerprint, built_at: float, build_seconds: float):
+        self.version = version
+        self.data = data
+        self.fingerprint = fingerprint
+        self.built_at = built_at
+        self.build_seconds = build_seconds
+
+    def age(self, now: Optional[float] = None) -> float:
+        return max(0.0, (now or time.time()) - self.built_at)
+
+
+class SnapshotStore:
+    """Instantánea del proceso actual y su recálculo en segundo plano"""
+
+    def __init__(self, build=None, fingerprint=None):
+        self._build = build or build_recommendations
+        self._fingerprint = fingerprint or data_fingerprint
+        self._snapshot: Optional[Snapshot] = None
+        self._version = 0
+        self._stale = False
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._building = False
+        self._scheduler = None
+
+    @property
+    def snapshot(self) -> Optional[Snapshot]:
+        return self._snapshot
+
+    @property
+    def building(self) -> bool:
+        return self._building
+
+    def mark_stale(self):
+        """Los datos cambiaron: la próxima lectura dispara un recálculo"""
+        self._stale = True
+
+    def is_stale(self, now: Optional[float] = None) -> bool:
+        snapshot = self._snapshot
+        return (
+            snapshot is None
+            or self._stale
+            or snapshot.age(now) >= Config.RECO_SNAPSHOT_REFRESH_SECONDS
+        )
+
+    def refresh(self) -> Optional[Snapshot]:
+        """Recalcular ya; si otro hilo está calculando, esperar su resultado"""
+        version = self._version
+        with self._build_lock:
+            if self._version != version:
+                return self._snapshot
+            self._building = True
+            try:
+                self._stale = False
+                fingerprint = self._fingerprint()
+                started = time.time()
+                data = self._build(fingerprint)
+                with self._lock:
+                    self._version += 1
+                    self._snapshot = Snapshot(
+                        self._version, data, fingerprint, time.time(), time.time() - started
+                    )
+                logger.info(f"Instantánea de recomendaciones v{self._version} "
+                            f"calculada en {self._snapshot.build_seconds:.2f}s")
+            except Exception:
+                # Se reintenta en la siguiente revisión; se sigue sirviendo la anterior
+                self._stale = True
+                logger.exception("Error calculando la instantánea de recomendaciones")
+            finally:
+                self._building = False
+        return self._snapshot
+
+    def refresh_in_background(self) -> bool:
+        """Lanzar un recálculo en un hilo si no hay otro en curso"""
+        with self._lock:
+            if self._building:
+                return False
+            self._building = True
+        threading.Thread(target=self.refresh, name="reco-snapshot", daemon=True).start()
+        return True
+
+    def check(self):
+        """Revisión periódica: recalcula si venció o si cambió la huella de datos"""
+        snapshot = self._snapshot
+        if not self.is_stale():
+            try:
+                if self._fingerprint() == snapshot.fingerprint:
+                    return
+            except Exception:
+                logger.exception("Error leyendo la huella de datos de recomendaciones")
+                return
+        self.refresh_in_background()
+
+    def get(self) -> Snapshot:
+        """Instantánea vigente; la primera vez se calcula en esta petición"""
+        self.start_scheduler()
+        if self._snapshot is None:
+            self.refresh()
+            if self._snapshot is None:
+                raise RuntimeError("No se pudo calcular la instantánea de recomendaciones")
+        elif self.is_stale():
+            self.refresh_in_background()
+        return self._snapshot
+
+    def start_scheduler(self):
+        """Hilo de revisión periódica (uno por proceso)"""
+        if Config.RECO_SNAPSHOT_CHECK_SECONDS <= 0:
+            return
+        pid = os.getpid()
+        with self._lock:
+            if self._scheduler == pid:
+                return
+            self._scheduler = pid
+        threading.Thread(target=self._schedule_loop, name="reco-scheduler", daemon=True).start()
+
+    def _schedule_loop(self):
+        while True:
+            time.sleep(Config.RECO_SNAPSHOT_CHECK_SECONDS)
+            self.check()
+
+
+def build_recommendations(fingerprint) -> Dict:
+    """Asegurar el índice de vecinos de esta huella y calcular todas las secciones"""
+    try:
+        ensure_neighbor_index(fingerprint)
+    except Exception:
+        # Sin índice las reglas salen de los pares en memoria
+        logger.exception("Error generando el índice de vecinos")
+    return RecommendationSystem().get_all_recommendations()
+
+
+def index_version(fingerprint) -> int:
+    """Versión del índice: versión de ventas de la huella + día de la tienda (la ventana avanza).
+
+    Los cambios de catálogo no regeneran el índice: solo depende de las ventas.
+    """
+    key = f"{fingerprint[0]!r}|{store_today().isoformat()}"
+    return zlib.crc32(key.encode("utf-8"))
+
+
+def ensure_neighbor_index(fingerprint, path: Optional[str] = None) -> NeighborIndex:
+    """Índice de vecinos al día con `fingerprint`; lo genera si hace falta.
+
+    El lock de archivo evita que varios workers lo calculen a la vez: el que
+    espera vuelve a revisar y, si otro ya lo escribió, solo lo abre.
+    """
+    path = path or Config.RECO_INDEX_PATH
+    version = index_version(fingerprint)
+
+    index = open_neighbor_index(path)
+    if index is not None and index.data_version == version:
+        return index
+
+    with open(f"{path}.lock", "a") as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            index = open_neighbor_index(path)
+            if index is not None and index.data_version == version:
+                return index
+
+            stats = RecommendationSystem().get_pair_statistics()
+            write_neighbor_index(path, build_neighbor_arrays(stats, Config.RECO_INDEX_NEIGHBORS), version)
+            logger.info(f"Índice de vecinos escrito en {path} ({len(stats)} pares)")
+        finally:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+    return open_neighbor_index(path)
+
+
+def data_fingerprint():
+    """Huella de los datos de recomendación: (versión de ventas, versión del resto).
+
+    Las suben triggers en cualquier worker, también con ediciones y bajas.
+    """
+    with get_cursor() as cur:
+        cur.execute("""
+            SELECT
+                (SELECT version FROM data_version WHERE name = 'sales'),
+                (SELECT version FROM data_version WHERE name = 'recommendations')
+        """)
+        return tuple(cur.fetchone())
+
+
+def snapshot_metadata(snapshot: Snapshot, store: SnapshotStore) -> Dict:
+    """Versión y antigüedad de la instantánea para la respuesta"""
+    return {
+        "version": snapshot.version,
+        "builtAt": datetime.fromtimestamp(snapshot.built_at, timezone.utc).isoformat(),
+        "ageSeconds": round(snapshot.age(), 1),
+        "buildSeconds": round(snapshot.build_seconds, 3),
+        "stale": store.is_stale(),
+        "refreshing": store.building
+    }
+
+
+_store = None
+_store_pid = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> SnapshotStore:
+    """Almacén del proceso actual (se recrea tras un fork)"""
+    global _store, _store_pid
+
+    pid = os.getpid()
+    with _store_lock:
+        if _store is None or _store_pid != pid:
+            _store = SnapshotStore()
+            _store_pid = pid
+    return _store
+
+
+def mark_stale():
+    """Avisar que cambiaron ventas o productos en este proceso (llamar tras el commit)"""
+    if _store is not None and _store_pid == os.getpid():
+        _store.mark_stale()
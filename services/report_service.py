@@ -1,56 +1,45 @@
-from config import Config
-import psycopg2
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from config import Config
+from database.connection import get_cursor
+from database.rollups import UNCATEGORIZED
+from utils.store_time import store_today, store_tz
 
-def get_db_connection():
-    """Obtener conexión a la base de datos usando la configuración correcta"""
-    db_config = Config.get_database_config()
-    
-    try:
-        connection = psycopg2.connect(
-            host=db_config['host'],
-            port=db_config['port'],
-            database=db_config['database'],
-            user=db_config['user'],
-            password=db_config['password']
-        )
-        return connection
-    except Exception as e:
-        print(f"Error conectando a la base de datos: {e}")
-        raise
+def _to_day(value):
+    """'YYYY-MM-DD' o ISO datetime → día de la tienda (los resúmenes son por día)"""
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(store_tz())
+    return moment.date()
 
 def get_sales_metrics(start_date=None, end_date=None):
-    """Obtener métricas generales de ventas - CORREGIDO"""
+    """Obtener métricas generales de ventas desde el resumen diario"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Construir query con filtros de fecha si se proporcionan
         query = """
             SELECT 
-                COALESCE(SUM(total), 0) as total_ventas,
-                COUNT(*) as total_transacciones,
-                COALESCE(AVG(total), 0) as ticket_promedio,
-                COALESCE(SUM(
-                    (SELECT COUNT(*) FROM sale_details WHERE sale_details.sale_id = sales.sale_id)
-                ), 0) as total_productos
-            FROM sales
+                COALESCE(SUM(revenue), 0) as total_ventas,
+                COALESCE(SUM(transactions), 0) as total_transacciones,
+                COALESCE(SUM(revenue) / NULLIF(SUM(transactions), 0), 0) as ticket_promedio,
+                COALESCE(SUM(items), 0) as total_productos
+            FROM sales_daily
             WHERE 1=1
         """
         
         params = []
         if start_date:
-            query += " AND date >= %s"
-            params.append(start_date)
+            query += " AND day >= %s"
+            params.append(_to_day(start_date))
         if end_date:
-            query += " AND date <= %s"
-            params.append(end_date)
+            query += " AND day <= %s"
+            params.append(_to_day(end_date))
             
-        cursor.execute(query, params)
-        result = cursor.fetchone()
-        
-        cursor.close()
-        conn.close()
+        with get_cursor() as cursor:
+            cursor.execute(query, params)
+            result = cursor.fetchone()
         
         return {
             "total_ventas": float(result[0]) if result[0] else 0.0,
@@ -69,32 +58,23 @@ def get_sales_metrics(start_date=None, end_date=None):
         }
 
 def get_sales_trend(start_date=None, end_date=None):
-    """Obtener tendencia de ventas por día - CORREGIDO"""
+    """Obtener tendencia de ventas por día desde el resumen diario"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
         # Si no se proporcionan fechas, usar último mes
         if not start_date or not end_date:
-            end_date = datetime.now().strftime('%Y-%m-%d')
-            start_date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+            end_date = store_today().strftime('%Y-%m-%d')
+            start_date = (store_today() - timedelta(days=30)).strftime('%Y-%m-%d')
         
         query = """
-            SELECT 
-                DATE(date) as fecha,
-                COALESCE(SUM(total), 0) as ventas,
-                COUNT(*) as cantidad
-            FROM sales
-            WHERE DATE(date) BETWEEN %s AND %s
-            GROUP BY DATE(date)
-            ORDER BY DATE(date)
+            SELECT day as fecha, revenue as ventas, transactions as cantidad
+            FROM sales_daily
+            WHERE day BETWEEN %s AND %s AND transactions > 0
+            ORDER BY day
         """
         
-        cursor.execute(query, (start_date, end_date))
-        results = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
+        with get_cursor() as cursor:
+            cursor.execute(query, (_to_day(start_date), _to_day(end_date)))
+            results = cursor.fetchall()
         
         return [
             {
@@ -110,31 +90,29 @@ def get_sales_trend(start_date=None, end_date=None):
         return []
 
 def get_sales_by_category():
-    """Obtener ventas por categoría - CORREGIDO"""
+    """Obtener ventas por categoría desde los totales por categoría"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
+        # Las categorías sin ventas se incluyen con 0, como antes
         query = """
-            SELECT 
-                p.category as nombre,
-                COALESCE(SUM(sd.subtotal), 0) as valor,
-                COALESCE(SUM(sd.quantity), 0) as cantidad
-            FROM products p
-            LEFT JOIN sale_details sd ON p.product_id = sd.product_id
-            GROUP BY p.category
+            SELECT nombre, SUM(valor) as valor, SUM(cantidad) as cantidad
+            FROM (
+                SELECT category as nombre, revenue as valor, units as cantidad
+                FROM sales_total_category
+                UNION ALL
+                SELECT DISTINCT COALESCE(NULLIF(category, ''), %s), 0, 0
+                FROM products
+            ) t
+            GROUP BY nombre
             ORDER BY valor DESC
         """
         
-        cursor.execute(query)
-        results = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
+        with get_cursor() as cursor:
+            cursor.execute(query, (UNCATEGORIZED,))
+            results = cursor.fetchall()
         
         return [
             {
-                "nombre": row[0] or "Sin categoría",
+                "nombre": row[0] or UNCATEGORIZED,
                 "valor": float(row[1]),
                 "cantidad": row[2]
             }
@@ -146,28 +124,22 @@ def get_sales_by_category():
         return []
 
 def get_top_products(limit=5):
-    """Obtener productos más vendidos - CORREGIDO"""
+    """Obtener productos más vendidos desde los totales por producto"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
         query = """
             SELECT 
                 p.name as nombre,
-                COALESCE(SUM(sd.subtotal), 0) as ventas,
-                COALESCE(SUM(sd.quantity), 0) as cantidad
+                COALESCE(t.revenue, 0) as ventas,
+                COALESCE(t.units, 0) as cantidad
             FROM products p
-            LEFT JOIN sale_details sd ON p.product_id = sd.product_id
-            GROUP BY p.product_id, p.name
+            LEFT JOIN sales_total_product t ON t.product_id = p.product_id
             ORDER BY cantidad DESC, ventas DESC
             LIMIT %s
         """
         
-        cursor.execute(query, (limit,))
-        results = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
+        with get_cursor() as cursor:
+            cursor.execute(query, (limit,))
+            results = cursor.fetchall()
         
         return [
             {
@@ -180,4 +152,44 @@ def get_top_products(limit=5):
         
     except Exception as e:
         print(f"Error en get_top_products: {e}")
-        return []
\ No newline at end of file
+        return []
+
+# ---------- DASHBOARD ----------
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+def dashboard_workers():
+    """Hilos del dashboard: se deja al menos una conexión del pool para las requests"""
+    return max(1, min(Config.REPORTS_DASHBOARD_WORKERS, Config.DB_POOL_MAX_SIZE - 1))
+
+def _get_executor():
+    """Pool de hilos acotado del proceso actual (se recrea tras un fork)"""
+    global _executor, _executor_pid
+
+    pid = os.getpid()
+    with _executor_lock:
+        if _executor is None or _executor_pid != pid:
+            _executor = ThreadPoolExecutor(
+                max_workers=dashboard_workers(),
+                thread_name_prefix="reports"
+            )
+            _executor_pid = pid
+    return _executor
+
+def get_dashboard(start_date=None, end_date=None, limit=5):
+    """Métricas, tendencia, categorías y top de productos en una sola llamada.
+
+    Las consultas corren en paralelo en hilos; cada una toma su propia
+    conexión del pool (fuera de la request no hay unidad de trabajo), así
+    la latencia es la de la consulta más lenta y no la suma.
+    """
+    executor = _get_executor()
+    futures = {
+        "metrics": executor.submit(get_sales_metrics, start_date, end_date),
+        "trend": executor.submit(get_sales_trend, start_date, end_date),
+        "categories": executor.submit(get_sales_by_category),
+        "top_products": executor.submit(get_top_products, limit)
+    }
+    return {name: future.result() for name, future in futures.items()}
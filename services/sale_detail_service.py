@@ -1,5 +1,10 @@
 # services/sale_detail_service.py
 from models.sale_detail import SaleDetail
+from database.connection import run_after_commit, stream_query
+from utils.export import export_chunks
+from services.recommendation_snapshot import mark_stale
+
+SALE_DETAIL_COLUMNS = ["detail_id", "sale_id", "product_id", "quantity", "price", "subtotal"]
 
 def create_sale_detail(data):
     detail = SaleDetail(
@@ -8,10 +13,12 @@ def create_sale_detail(data):
         Quantity=data["Quantity"],
         Price=data["Price"]
     )
-    return detail.save()
+    result = detail.save()
+    run_after_commit(mark_stale)
+    return result
 
-def get_all_sale_details():
-    return SaleDetail.get_all()
+def get_all_sale_details(after=None, limit=None):
+    return SaleDetail.get_all(after, limit)
 
 def get_sale_detail(detail_id):
     return SaleDetail.get_by_id(detail_id)
@@ -21,7 +28,36 @@ def update_sale_detail(detail_id, data):
     if not detail:
         return None
     detail.update(data)
+    run_after_commit(mark_stale)
     return detail
 
 def delete_sale_detail(detail_id):
-    return SaleDetail.delete(detail_id)
+    deleted = SaleDetail.delete(detail_id)
+    run_after_commit(mark_stale)
+    return deleted
+
+def _detail_row_to_dict(row):
+    detail_id, sale_id, product_id, quantity, price, subtotal = row
+    return {
+        "detail_id": detail_id,
+        "sale_id": sale_id,
+        "product_id": product_id,
+        "quantity": quantity,
+        "price": float(price) if price is not None else 0,
+        "subtotal": float(subtotal) if subtotal is not None else 0
+    }
+
+def stream_sale_details(fmt, sale_id=None):
+    """Exportar detalles de venta en streaming (CSV o NDJSON), en orden de ID"""
+    query = "SELECT Detail_ID, Sale_ID, Product_ID, Quantity, Price, Subtotal FROM Sale_Details"
+    params = []
+    if sale_id:
+        query += " WHERE Sale_ID = %s"
+        params.append(sale_id)
+    query += " ORDER BY Detail_ID"
+    
+    batches = (
+        [_detail_row_to_dict(row) for row in rows]
+        for rows in stream_query(query, params)
+    )
+    return export_chunks(batches, fmt, SALE_DETAIL_COLUMNS)
@@ -1,12 +1,20 @@
 # services/sale_service.py
+from datetime import datetime, timedelta
 from models.sale import Sale
+from database.connection import get_cursor, stream_query
+from utils.export import export_chunks
+from utils.store_time import to_db_timestamp
 
 def create_sale(data):
-    sale = Sale(User_ID=data["User_ID"], Total=data.get("Total", 0))
+    sale = Sale(
+        user_id=data["User_ID"],
+        total=data.get("Total", 0),
+        payment_method=data.get("Payment_Method") or "Efectivo"
+    )
     return sale.save()
 
-def get_all_sales():
-    return Sale.get_all()
+def get_all_sales(after=None, limit=None):
+    return Sale.get_all(after, limit)
 
 def get_sale(sale_id):
     return Sale.get_by_id(sale_id)
@@ -24,52 +32,74 @@ def delete_sale(sale_id):
 def get_sales_with_details():
     """Obtener todas las ventas con información completa para reportes"""
     try:
-        sales = Sale.get_all()
-        result = []
-        
-        for sale in sales:
-            # Obtener detalles de la venta
-            from models.sale_detail import SaleDetail
-            from models.Product import Product
-            from models.user import User
-            
-            # Usar el nuevo método que acabamos de crear
-            details = SaleDetail.get_by_sale_id(sale.sale_id)
-            
-            # Para cada detalle, crear un registro completo
-            for detail in details:
-                # Obtener información del producto
-                product = None
-                if hasattr(Product, 'get_by_id'):
-                    product = Product.get_by_id(detail.product_id)
-                
-                # Obtener información del usuario/vendedor
-                user = None
-                if hasattr(User, 'get_by_id'):
-                    user = User.get_by_id(sale.user_id)
-                
-                # Construir el objeto de respuesta
-                sale_data = {
-                    "id": sale.sale_id,
-                    "product_id": detail.product_id,
-                    "product_name": product.name if product else f"Producto {detail.product_id}",
-                    "quantity": detail.quantity,
-                    "unit_price": float(detail.price) if detail.price else 0,
-                    "total": float(detail.subtotal) if detail.subtotal else 0,
-                    "date": sale.date.isoformat() if sale.date else None,
-                    "user_id": sale.user_id,
-                    "seller_name": user.nombre if user else f"Vendedor {sale.user_id}",
-                    "payment_method": "Efectivo"  # Valor por defecto
-                }
-                result.append(sale_data)
-        
-        return result
+        return _fetch_sales_report()
         
     except Exception as e:
         print(f"Error en get_sales_with_details: {e}")
         # En caso de error, devolver datos mock
         return get_mock_sales_data()
 
+def _sales_report_query(start=None, end=None, seller_id=None, payment_method=None):
+    """Una sola consulta con JOIN: el número de queries no depende de las filas.
+
+    Los filtros se traducen a un WHERE parametrizado; el rango de fechas
+    es semiabierto (`start <= date < end`) para aprovechar idx_sales_date.
+    Devuelve (query, params).
+    """
+    conditions = []
+    params = []
+    if start:
+        conditions.append("s.date >= %s")
+        params.append(start)
+    if end:
+        conditions.append("s.date < %s")
+        params.append(end)
+    if seller_id:
+        conditions.append("s.user_id = %s")
+        params.append(seller_id)
+    if payment_method:
+        conditions.append("s.payment_method = %s")
+        params.append(payment_method)
+    
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    
+    query = f"""
+        SELECT 
+            s.sale_id, sd.product_id, p.name, sd.quantity, sd.price,
+            sd.subtotal, s.date, s.user_id, u.nombre, s.payment_method
+        FROM sales s
+        JOIN sale_details sd ON sd.sale_id = s.sale_id
+        LEFT JOIN products p ON p.product_id = sd.product_id
+        LEFT JOIN users u ON u.id = s.user_id
+        {where}
+        ORDER BY s.sale_id, sd.detail_id
+    """
+    return query, params
+
+def _fetch_sales_report(start=None, end=None, seller_id=None, payment_method=None):
+    query, params = _sales_report_query(start, end, seller_id, payment_method)
+    with get_cursor() as cur:
+        cur.execute(query, params)
+        rows = cur.fetchall()
+    
+    return [_report_row_to_dict(row) for row in rows]
+
+def _report_row_to_dict(row):
+    (sale_id, product_id, product_name, quantity, price, subtotal,
+     date, user_id, seller_name, payment_method) = row
+    return {
+        "id": sale_id,
+        "product_id": product_id,
+        "product_name": product_name or f"Producto {product_id}",
+        "quantity": quantity,
+        "unit_price": float(price) if price else 0,
+        "total": float(subtotal) if subtotal else 0,
+        "date": date.isoformat() if date else None,
+        "user_id": user_id,
+        "seller_name": seller_name or f"Vendedor {user_id}",
+        "payment_method": payment_method or "Efectivo"
+    }
+
 def get_mock_sales_data():
     """Datos de ejemplo para desarrollo cuando hay errores"""
     from datetime import datetime, timedelta
@@ -112,24 +142,57 @@ def get_mock_sales_data():
     
     return sales_data
 
-def get_sales_by_filters(start_date=None, end_date=None, payment_method=None):
-    """Obtener ventas filtradas por fecha y método de pago"""
+def _parse_date_bound(value, end=False):
+    """Convierte 'YYYY-MM-DD' o ISO datetime (hora de la tienda) en límite
+    de rango semiabierto comparable con sales.date.
+
+    Una fecha sin hora como límite final incluye el día completo.
+    """
+    if not value:
+        return None
+    bound = datetime.fromisoformat(value)
+    if end and len(value) == 10:
+        bound += timedelta(days=1)
+    elif end:
+        bound += timedelta(microseconds=1)
+    return to_db_timestamp(bound)
+
+def get_sales_by_filters(start_date=None, end_date=None, payment_method=None, seller_id=None):
+    """Obtener ventas filtradas por fecha, vendedor y método de pago.
+
+    Lanza ValueError si alguna fecha no tiene formato ISO.
+    """
+    start = _parse_date_bound(start_date)
+    end = _parse_date_bound(end_date, end=True)
+    if payment_method == "all":
+        payment_method = None
+    
     try:
-        all_sales = get_sales_with_details()
-        filtered_sales = all_sales
-        
-        # Filtrar por fecha
-        if start_date:
-            filtered_sales = [s for s in filtered_sales if s["date"] and s["date"] >= start_date]
-        if end_date:
-            filtered_sales = [s for s in filtered_sales if s["date"] and s["date"] <= end_date]
-        
-        # Filtrar por método de pago
-        if payment_method and payment_method != "all":
-            filtered_sales = [s for s in filtered_sales if s["payment_method"] == payment_method]
-        
-        return filtered_sales
+        return _fetch_sales_report(start, end, seller_id, payment_method)
         
     except Exception as e:
         print(f"Error en get_sales_by_filters: {e}")
-        return get_mock_sales_data()
\ No newline at end of file
+        return get_mock_sales_data()
+
+SALES_REPORT_COLUMNS = [
+    "id", "product_id", "product_name", "quantity", "unit_price",
+    "total", "date", "user_id", "seller_name", "payment_method"
+]
+
+def stream_sales_report(fmt, start_date=None, end_date=None, payment_method=None, seller_id=None):
+    """Exportar el reporte de ventas en streaming (CSV o NDJSON).
+
+    Acepta los mismos filtros que get_sales_by_filters y lanza ValueError
+    antes de tocar la base de datos si alguna fecha es inválida.
+    """
+    start = _parse_date_bound(start_date)
+    end = _parse_date_bound(end_date, end=True)
+    if payment_method == "all":
+        payment_method = None
+    
+    query, params = _sales_report_query(start, end, seller_id, payment_method)
+    batches = (
+        [_report_row_to_dict(row) for row in rows]
+        for rows in stream_query(query, params)
+    )
+    return export_chunks(batches, fmt, SALES_REPORT_COLUMNS)
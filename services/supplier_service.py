@@ -1,14 +1,20 @@
-import psycopg2
-from config import Config
+from database.connection import get_cursor
 from models.supplier import Supplier
 
-def get_all_suppliers():
-    conn = psycopg2.connect(**Config.get_database_config())
-    cur = conn.cursor()
-    cur.execute("SELECT supplier_id, name, phone, contact, email, address FROM suppliers ORDER BY supplier_id")
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+def get_all_suppliers(after=None, limit=None):
+    query = "SELECT supplier_id, name, phone, contact, email, address FROM suppliers"
+    params = []
+    if after is not None:
+        query += " WHERE supplier_id > %s"
+        params.append(after)
+    query += " ORDER BY supplier_id"
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit)
+
+    with get_cursor() as cur:
+        cur.execute(query, params)
+        rows = cur.fetchall()
     
     suppliers = []
     for row in rows:
@@ -17,70 +23,54 @@ def get_all_suppliers():
     return suppliers
 
 def get_supplier(supplier_id):
-    conn = psycopg2.connect(**Config.get_database_config())
-    cur = conn.cursor()
-    cur.execute("SELECT supplier_id, name, phone, contact, email, address FROM suppliers WHERE supplier_id = %s", (supplier_id,))
-    row = cur.fetchone()
-    cur.close()
-    conn.close()
+    with get_cursor() as cur:
+        cur.execute("SELECT supplier_id, name, phone, contact, email, address FROM suppliers WHERE supplier_id = %s", (supplier_id,))
+        row = cur.fetchone()
     if row:
         supplier = Supplier.from_row(row)
         return supplier.to_dict()
     return None
 
 def create_supplier(data):
-    conn = psycopg2.connect(**Config.get_database_config())
-    cur = conn.cursor()
-    
-    cur.execute(
-        """
-        INSERT INTO suppliers (name, phone, contact, email, address)
-        VALUES (%s, %s, %s, %s, %s) RETURNING supplier_id
-        """,
-        (
-            data.get("name"), 
-            data.get("phone"), 
-            data.get("contact"), 
-            data.get("email", ""),  # Valor por defecto vacío
-            data.get("address", "") # Valor por defecto vacío
+    with get_cursor(commit=True) as cur:
+        cur.execute(
+            """
+            INSERT INTO suppliers (name, phone, contact, email, address)
+            VALUES (%s, %s, %s, %s, %s) RETURNING supplier_id
+            """,
+            (
+                data.get("name"), 
+                data.get("phone"), 
+                data.get("contact"), 
+                data.get("email", ""),  # Valor por defecto vacío
+                data.get("address", "") # Valor por defecto vacío
+            )
         )
-    )
-    supplier_id = cur.fetchone()[0]
-    conn.commit()
-    cur.close()
-    conn.close()
+        supplier_id = cur.fetchone()[0]
     return get_supplier(supplier_id)
 
 def update_supplier(supplier_id, data):
-    conn = psycopg2.connect(**Config.get_database_config())
-    cur = conn.cursor()
-    cur.execute(
-        """
-        UPDATE suppliers
-        SET name = %s, phone = %s, contact = %s, email = %s, address = %s
-        WHERE supplier_id = %s RETURNING supplier_id
-        """,
-        (
-            data.get("name"), 
-            data.get("phone"), 
-            data.get("contact"), 
-            data.get("email", ""), 
-            data.get("address", ""), 
-            supplier_id
+    with get_cursor(commit=True) as cur:
+        cur.execute(
+            """
+            UPDATE suppliers
+            SET name = %s, phone = %s, contact = %s, email = %s, address = %s
+            WHERE supplier_id = %s RETURNING supplier_id
+            """,
+            (
+                data.get("name"), 
+                data.get("phone"), 
+                data.get("contact"), 
+                data.get("email", ""), 
+                data.get("address", ""), 
+                supplier_id
+            )
         )
-    )
-    row = cur.fetchone()
-    conn.commit()
-    cur.close()
-    conn.close()
+        row = cur.fetchone()
     return get_supplier(supplier_id) if row else None
 
 def delete_supplier(supplier_id):
-    conn = psycopg2.connect(**Config.get_database_config())
-    cur = conn.cursor()
-    cur.execute("DELETE FROM suppliers WHERE supplier_id = %s RETURNING supplier_id", (supplier_id,))
-    row = cur.fetchone()
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_cursor(commit=True) as cur:
+        cur.execute("DELETE FROM suppliers WHERE supplier_id = %s RETURNING supplier_id", (supplier_id,))
+        row = cur.fetchone()
     return bool(row)
\ No newline at end of file
@@ -26,8 +26,8 @@ def login_user(email, password):
         return user
     return None
 
-def get_all_users():
-    users = User.get_all()
+def get_all_users(after=None, limit=None):
+    users = User.get_all(after, limit)
     return [user.to_dict() for user in users]  # Usar to_dict para serialización
 
 def get_user(user_id):
@@ -9,13 +9,18 @@ sys.path.insert(0, os.path.dirname(__file__) + '/..')
 @pytest.fixture
 def mock_db_connect():
     """Mock para conexión de base de datos"""
+    from database.connection import close_pool
+
+    close_pool()
     with patch('psycopg2.connect') as mock_connect:
         mock_conn = MagicMock()
         mock_cursor = MagicMock()
         
         mock_connect.return_value = mock_conn
         mock_conn.cursor.return_value = mock_cursor
+        mock_conn.closed = 0
         mock_conn.commit = MagicMock()
         mock_conn.close = MagicMock()
         
-        yield mock_connect, mock_conn, mock_cursor
\ No newline at end of file
+        yield mock_connect, mock_conn, mock_cursor
+    close_pool()
\ No newline at end of file
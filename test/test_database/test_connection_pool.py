@@ -0,0 +1,74 @@
+import pytest
+from models.Product import Product
+from models.sale import Sale
+from database.connection import get_pool_stats, get_connection, release_connection
+
+def test_pool_reuses_connection(mock_db_connect):
+    """Varias consultas seguidas reutilizan la misma conexión del pool"""
+    mock_connect, mock_conn, cur = mock_db_connect
+    cur.fetchone.return_value = None
+
+    Product.find_by_id(1)
+    Product.find_by_id(2)
+    Sale.get_by_id(3)
+
+    assert mock_connect.call_count == 1
+    mock_conn.close.assert_not_called()
+
+def test_pool_stats(mock_db_connect):
+    """Las estadísticas reflejan checkouts y conexiones en uso"""
+    _, _, cur = mock_db_connect
+    cur.fetchall.return_value = []
+
+    Sale.get_all()
+    Sale.get_all()
+
+    stats = get_pool_stats()
+    assert stats["initialized"] is True
+    assert stats["checkouts"] == 2
+    assert stats["in_use"] == 0
+    assert stats["created"] == 1
+
+def test_pool_discards_closed_connection(mock_db_connect):
+    """Una conexión cerrada se descarta en el checkout y se abre otra"""
+    mock_connect, mock_conn, _ = mock_db_connect
+
+    conn = get_connection()
+    release_connection(conn)
+    mock_conn.closed = 1
+
+    fresh = mock_connect.return_value = type(mock_conn)()
+    fresh.closed = 0
+    conn = get_connection()
+    release_connection(conn)
+
+    assert conn is fresh
+    assert get_pool_stats()["discarded"] == 1
+
+def test_connection_returned_on_error(mock_db_connect):
+    """Si la consulta falla se hace rollback y la conexión vuelve al pool"""
+    _, mock_conn, cur = mock_db_connect
+    cur.execute.side_effect = Exception("boom")
+
+    with pytest.raises(Exception):
+        Sale.get_all()
+
+    mock_conn.rollback.assert_called()
+    assert get_pool_stats()["in_use"] == 0
+
+def test_pool_checks_replacement_connection(mock_db_connect):
+    """Si la conexión que reemplaza a la descartada tampoco sirve, se descarta también"""
+    mock_connect, mock_conn, _ = mock_db_connect
+
+    conn = get_connection()
+    release_connection(conn)
+    mock_conn.closed = 1
+
+    dead, fresh = type(mock_conn)(), type(mock_conn)()
+    dead.closed, fresh.closed = 1, 0
+    mock_connect.side_effect = [dead, fresh]
+    conn = get_connection()
+    release_connection(conn)
+
+    assert conn is fresh
+    assert get_pool_stats()["discarded"] == 2
@@ -0,0 +1,104 @@
+import threading
+import pytest
+from flask import Flask, jsonify
+from models.sale import Sale
+from models.sale_detail import SaleDetail
+from database.connection import init_app, get_cursor, get_pool_stats, run_after_commit
+
+@pytest.fixture
+def uow_app():
+    app = Flask(__name__)
+    init_app(app)
+
+    @app.route("/sale", methods=["POST"])
+    def create_sale():
+        sale = Sale(user_id=1, total=100).save()
+        SaleDetail(sale_id=sale.sale_id, product_id=2, quantity=1, price=100).save()
+        return jsonify({"sale_id": sale.sale_id})
+
+    @app.route("/fail", methods=["POST"])
+    def fail():
+        Sale(user_id=1, total=100).save()
+        return jsonify({"error": "boom"}), 500
+
+    @app.route("/after/<int:status>", methods=["POST"])
+    def after(status):
+        Sale(user_id=1, total=100).save()
+        run_after_commit(app.config["AFTER_COMMIT"])
+        return jsonify({}), status
+
+    @app.route("/own")
+    def own():
+        with get_cursor() as cur:
+            cur.execute("SELECT 1")
+        with get_cursor(commit=True, own_connection=True) as cur:
+            cur.execute("UPDATE demand_series_state SET closed_through = closed_through")
+        return jsonify({"in_use": get_pool_stats()["in_use"], "commits": app.config["CONN"].commit.call_count})
+
+    @app.route("/ping")
+    def ping():
+        return jsonify({"ok": True})
+
+    return app
+
+def test_request_uses_one_connection_and_one_commit(mock_db_connect, uow_app):
+    """Varias escrituras en una request comparten conexión y un solo commit"""
+    mock_connect, mock_conn, cur = mock_db_connect
+    cur.fetchone.side_effect = [(10, "2025-01-01"), (1, 100)]
+
+    response = uow_app.test_client().post("/sale")
+
+    assert response.status_code == 200
+    assert mock_connect.call_count == 1
+    mock_conn.commit.assert_called_once()
+    assert get_pool_stats()["in_use"] == 0
+
+def test_error_response_rolls_back(mock_db_connect, uow_app):
+    """Una respuesta 5xx revierte la transacción de la request"""
+    _, mock_conn, cur = mock_db_connect
+    cur.fetchone.return_value = (10, "2025-01-01")
+
+    response = uow_app.test_client().post("/fail")
+
+    assert response.status_code == 500
+    mock_conn.commit.assert_not_called()
+    mock_conn.rollback.assert_called()
+    assert get_pool_stats()["in_use"] == 0
+
+def test_request_without_queries_does_not_checkout(mock_db_connect, uow_app):
+    """Las requests que no tocan la BD no toman conexión"""
+    mock_connect, _, _ = mock_db_connect
+
+    uow_app.test_client().get("/ping")
+
+    mock_connect.assert_not_called()
+
+
+@pytest.mark.parametrize("status, runs", [(200, 1), (500, 0)])
+def test_after_commit_callbacks_run_only_on_commit(mock_db_connect, uow_app, status, runs):
+    """run_after_commit se ejecuta tras el commit y se descarta si se revierte"""
+    _, _, cur = mock_db_connect
+    cur.fetchone.return_value = (10, "2025-01-01")
+    done = threading.Event()
+    calls = []
+    uow_app.config["AFTER_COMMIT"] = lambda: (calls.append(1), done.set())
+
+    uow_app.test_client().post(f"/after/{status}")
+
+    done.wait(timeout=2 if runs else 0.1)
+    assert len(calls) == runs
+
+def test_own_connection_commits_inside_request(mock_db_connect, uow_app):
+    """own_connection confirma en otra conexión sin esperar al final de la request"""
+    mock_connect, mock_conn, _ = mock_db_connect
+    second = type(mock_conn)()
+    second.closed = 0
+    mock_connect.side_effect = [mock_conn, second]
+    uow_app.config["CONN"] = second
+
+    data = uow_app.test_client().get("/own").get_json()
+
+    # Confirmada y devuelta antes de responder; la de la request sigue en uso
+    assert data == {"in_use": 1, "commits": 1}
+    assert mock_connect.call_count == 2
+    mock_conn.commit.assert_called_once()
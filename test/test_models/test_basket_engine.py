@@ -0,0 +1,72 @@
+import random
+from collections import Counter
+from itertools import combinations
+import pytest
+from models.basket_engine import BasketMatrix, pair_statistics
+
+def _random_sales(n_baskets=300, n_products=25, seed=7):
+    rng = random.Random(seed)
+    baskets, products = [], []
+    for sale_id in range(n_baskets):
+        for _ in range(rng.randint(1, 6)):
+            baskets.append(sale_id)
+            products.append(rng.randint(1, n_products))
+    return baskets, products
+
+def _counter_pairs(baskets, products):
+    """Conteo de pares con el bucle anidado original (referencia)"""
+    by_sale = {}
+    for sale_id, product_id in zip(baskets, products):
+        by_sale.setdefault(sale_id, set()).add(product_id)
+    pairs = Counter()
+    for items in by_sale.values():
+        for pair in combinations(sorted(items), 2):
+            pairs[pair] += 1
+    return pairs, by_sale
+
+@pytest.mark.parametrize("chunk_baskets", [1, 7, 200_000])
+def test_cooccurrence_matches_nested_loop(chunk_baskets):
+    """La co-ocurrencia por bloques coincide con el conteo par a par"""
+    baskets, products = _random_sales()
+    expected, _ = _counter_pairs(baskets, products)
+
+    matrix = BasketMatrix.from_rows(baskets, products)
+    a, b, count = matrix.cooccurrence(chunk_baskets=chunk_baskets)
+    ids = matrix.product_ids
+
+    result = {(int(ids[x]), int(ids[y])): int(c) for x, y, c in zip(a, b, count)}
+    assert result == dict(expected)
+
+def test_pair_statistics_metrics():
+    """Support, confidence y lift salen de los conteos por canasta"""
+    baskets, products = _random_sales()
+    expected, by_sale = _counter_pairs(baskets, products)
+    n = len(by_sale)
+    item_counts = Counter(p for items in by_sale.values() for p in items)
+
+    stats = pair_statistics(BasketMatrix.from_rows(baskets, products), min_count=2)
+
+    assert len(stats) == sum(1 for c in expected.values() if c >= 2)
+    (x, y), count = expected.most_common(1)[0]
+    rule = stats.rule(y, x)
+    assert rule["count"] == count
+    assert rule["support"] == pytest.approx(count / n)
+    assert rule["confidence"] == pytest.approx(count / item_counts[y])
+    assert rule["lift"] == pytest.approx(count * n / (item_counts[x] * item_counts[y]))
+    assert stats.top(1)[0]["count"] == count
+
+def test_repeated_lines_and_unknown_products():
+    """Un producto repetido en la venta cuenta una vez; pares ausentes dan None"""
+    matrix = BasketMatrix.from_batches([[(1, 10), (1, 10), (1, 20)], [(2, 20)]])
+    stats = pair_statistics(matrix)
+
+    assert matrix.item_counts().tolist() == [1, 2]
+    assert stats.rule(10, 20) == {"count": 1, "support": 0.5, "confidence": 1.0, "lift": 1.0}
+    assert stats.rule(20, 10)["confidence"] == 0.5
+    assert stats.rule(10, 99) is None and stats.rule(10, 10) is None
+
+def test_empty_history():
+    stats = pair_statistics(BasketMatrix.from_batches([]))
+
+    assert len(stats) == 0
+    assert stats.top() == [] and stats.rule(1, 2) is None
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from models.content_similarity import ContentIndex, product_terms
+
+CATALOG = [
+    {"id": 1, "name": "Laptop HP Pavilion 15", "description": "Portátil con SSD", "brand": "HP", "category": "Laptops"},
+    {"id": 2, "name": "Laptop HP Envy 13", "description": "Portátil ultraligera con SSD", "brand": "HP", "category": "Laptops"},
+    {"id": 3, "name": "Laptop Lenovo IdeaPad", "description": "Portátil para oficina", "brand": "Lenovo", "category": "Laptops"},
+    {"id": 4, "name": "Mouse inalámbrico Logitech", "description": "Mouse óptico", "brand": "Logitech", "category": "Accesorios"},
+    {"id": 5, "name": "Teclado inalámbrico Logitech", "description": "Teclado con mouse", "brand": "Logitech", "category": "Accesorios"},
+    {"id": 6, "name": "Cable HDMI", "description": None, "brand": None, "category": None},
+]
+
+def _dense(index):
+    """Matriz TF-IDF densa para comparar contra el cálculo por bloques"""
+    ids = sorted(index._rows)
+    matrix = np.zeros((len(ids), index.idf.size))
+    for i, pid in enumerate(ids):
+        columns, weights = index._rows[pid]
+        matrix[i, columns] = weights
+    return ids, matrix @ matrix.T
+
+def test_product_terms_normalize_and_tag_brand_category():
+    terms = product_terms({"name": "Cámara de Fotos", "brand": "Canon", "category": "Fotografía"})
+
+    assert terms == ["camara", "fotos", "marca:canon", "categoria:fotografia"]
+
+@pytest.mark.parametrize("batch_size", [1, 2, 128])
+def test_top_k_matches_brute_force(batch_size):
+    index = ContentIndex.fit(CATALOG)
+    ids, similarity = _dense(index)
+
+    result = dict(index.top_k(3, batch_size=batch_size))
+
+    assert set(result) == set(ids)
+    for i, pid in enumerate(ids):
+        expected = sorted(
+            ((ids[j], similarity[i, j]) for j in range(len(ids)) if j != i and similarity[i, j] > 0),
+            key=lambda entry: (-entry[1], entry[0])
+        )[:3]
+        assert [other for other, _ in result[pid]] == [other for other, _ in expected]
+        assert [score for _, score in result[pid]] == pytest.approx([score for _, score in expected], rel=1e-5)
+
+def test_most_similar_shares_brand_and_category():
+    index = ContentIndex.fit(CATALOG)
+    neighbors = dict(index.top_k(2))
+
+    assert neighbors[1][0][0] == 2
+    assert neighbors[4][0][0] == 5
+    assert neighbors[6] == []
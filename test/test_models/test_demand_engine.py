@@ -0,0 +1,107 @@
+from datetime import date
+import numpy as np
+import pytest
+from models.demand_engine import BacktestResult, DemandMatrix, accuracy_metrics, holt_winters, rolling_origin
+
+def _reference(y, horizon, alpha, beta, gamma, phi, season=7):
+    """Holt-Winters aditivo amortiguado, una serie, en Python puro"""
+    level = sum(y[:season]) / season
+    trend = (sum(y[season:2 * season]) / season - level) / season
+    seasonal = [value - level for value in y[:season]]
+    for t in range(season, len(y)):
+        s = seasonal[t % season]
+        error = y[t] - (level + phi * trend + s)
+        level, trend = level + phi * trend + alpha * error, phi * trend + alpha * beta * error
+        seasonal[t % season] = s + gamma * error
+    forecast, damping = [], 0.0
+    for h in range(1, horizon + 1):
+        damping += phi ** h
+        forecast.append(level + damping * trend + seasonal[(len(y) + h - 1) % season])
+    return forecast
+
+def _weekly(n_series, n_days, seed=0):
+    rng = np.random.default_rng(seed)
+    week = np.array([1.0, 1.0, 1.1, 1.2, 1.5, 2.0, 0.6])
+    base = rng.uniform(5, 20, (n_series, 1))
+    growth = 1 + np.arange(n_days) / n_days * 0.2
+    return rng.poisson(base * week[np.arange(n_days) % 7] * growth).astype(float)
+
+def test_matches_scalar_reference():
+    values = _weekly(4, 60)
+
+    result = holt_winters(values, 10, alphas=[0.3], betas=[0.05], gammas=[0.2], phi=0.95)
+
+    for i in range(4):
+        expected = np.maximum(_reference(values[i].tolist(), 10, 0.3, 0.05, 0.2, 0.95), 0)
+        assert result.forecast[i] == pytest.approx(expected)
+
+def test_recovers_weekly_pattern_and_intervals_widen():
+    values = _weekly(50, 140)
+
+    result = holt_winters(values, 14, keep_fitted=True)
+
+    # El pico del sábado (columna 5 de cada semana) se repite en la predicción
+    next_weekdays = (140 + np.arange(14)) % 7
+    peak = result.forecast[:, next_weekdays == 5].mean()
+    valley = result.forecast[:, next_weekdays == 6].mean()
+    assert peak > 2.5 * valley
+    spread = result.upper - result.forecast
+    assert np.all(np.diff(spread, axis=1) >= -1e-9)
+    assert np.all(result.lower >= 0) and np.all(result.lower <= result.forecast)
+    assert result.fitted.shape == values.shape
+
+def test_grid_picks_parameters_per_series():
+    flat = np.full((1, 70), 4.0)
+    values = np.vstack([flat, _weekly(1, 70)])
+
+    result = holt_winters(values, 7)
+
+    assert result.forecast[0] == pytest.approx(4.0)
+    assert result.sigma[0] == pytest.approx(0.0)
+    totals = result.totals()
+    assert totals["forecast"][0] == pytest.approx(28.0)
+    assert totals["lower"][1] < totals["forecast"][1] < totals["upper"][1]
+
+def test_demand_matrix_from_rows():
+    start = date(2025, 1, 1)
+    matrix = DemandMatrix.from_rows(
+        [date(2025, 1, 1), date(2025, 1, 1), date(2025, 1, 3), date(2024, 12, 31), date(2025, 1, 2)],
+        [7, 7, 3, 7, 99],
+        [1, 2, 5, 9, 4],
+        start, 3, product_ids=[3, 7, 8]
+    )
+
+    assert matrix.values.tolist() == [[0, 0, 5], [3, 0, 0], [0, 0, 0]]
+    assert matrix.days[-1] == date(2025, 1, 3)
+
+def test_rolling_origin_matches_refitting_each_fold():
+    values = _weekly(6, 84, seed=3)
+
+    backtest = rolling_origin(values, horizon=7, n_folds=4)
+
+    assert backtest.origins == [56, 63, 70, 77]
+    for fold, origin in enumerate(backtest.origins):
+        refit = holt_winters(values[:, :origin], 7)
+        assert backtest.forecasts[fold] == pytest.approx(refit.forecast)
+        assert np.array_equal(backtest.actuals[fold], values[:, origin:origin + 7])
+
+def test_rolling_origin_skips_origins_without_enough_history():
+    backtest = rolling_origin(_weekly(2, 30), horizon=7, n_folds=5)
+
+    assert backtest.origins == [16, 23]
+
+def test_accuracy_metrics():
+    backtest = BacktestResult(
+        [10],
+        forecasts=np.array([[[2.0, 0.0, 3.0], [0.0, 0.0, 0.0]]]),
+        actuals=np.array([[[1.0, 0.0, 3.0], [0.0, 0.0, 0.0]]])
+    )
+
+    sums = backtest.product_sums()
+    metrics = accuracy_metrics(sums)
+
+    assert metrics["mape"][0] == pytest.approx(50.0)      # (100% + 0%) / 2 días con venta
+    assert metrics["smape"][0] == pytest.approx(100 / 3)  # (2/3 + 0) / 2 × 100
+    assert metrics["bias"][0] == pytest.approx(25.0)
+    assert metrics["wape"][0] == pytest.approx(25.0)
+    assert np.isnan(metrics["mape"][1]) and np.isnan(metrics["bias"][1])
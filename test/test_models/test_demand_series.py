@@ -0,0 +1,59 @@
+from datetime import date, timedelta
+from unittest.mock import MagicMock
+import numpy as np
+from models.demand_engine import DemandMatrix
+from models.demand_series import BLOCK_DAYS, DemandSeriesStore, block_start, blocks_to_matrix, dense_blocks
+
+START = block_start(date(2025, 3, 1))
+ROWS = [
+    (START, 1, 2), (START + timedelta(days=3), 1, 1), (START + timedelta(days=30), 1, 4),
+    (START + timedelta(days=5), 2, 7), (START + timedelta(days=40), 3, 0)
+]
+
+def test_block_start_is_aligned():
+    assert (START - date(2000, 1, 3)).days % BLOCK_DAYS == 0
+    assert block_start(START + timedelta(days=BLOCK_DAYS - 1)) == START
+    assert block_start(START + timedelta(days=BLOCK_DAYS)) == START + timedelta(days=BLOCK_DAYS)
+
+def test_dense_blocks_skip_empty_and_days_after_last():
+    blocks = dense_blocks(ROWS, START, START + timedelta(days=29))
+
+    assert [(b[0], b[1]) for b in blocks] == [(START, 1), (START, 2)]
+    assert blocks[0][2][:4] == [2, 0, 0, 1] and len(blocks[0][2]) == BLOCK_DAYS
+
+def test_blocks_round_trip_matches_rows():
+    blocks = dense_blocks(ROWS, START, START + timedelta(days=60))
+    start, n_days = START + timedelta(days=2), 40
+
+    matrix = blocks_to_matrix(blocks, start, n_days, product_ids=[2, 1, 9])
+    expected = DemandMatrix.from_rows(
+        [row[0] for row in ROWS], [row[1] for row in ROWS], [row[2] for row in ROWS],
+        start, n_days, product_ids=[2, 1, 9]
+    )
+
+    assert np.array_equal(matrix.values, expected.values)
+    assert matrix.values[1, 28] == 4 and not matrix.values[2].any()
+
+def test_ensure_closed_is_noop_when_up_to_date():
+    store = DemandSeriesStore()
+    store.closed_through = MagicMock(return_value=date(2025, 3, 10))
+    store.backfill = MagicMock()
+
+    assert store.ensure_closed(until=date(2025, 3, 10)) == date(2025, 3, 10)
+    store.backfill.assert_not_called()
+
+def test_ensure_closed_resyncs_recent_blocks(mock_db_connect, monkeypatch):
+    _, _, cur = mock_db_connect
+    monkeypatch.setattr("models.demand_series.Config.DEMAND_SERIES_RESYNC_DAYS", 3)
+    store = DemandSeriesStore()
+    store.closed_through = MagicMock(return_value=date(2025, 3, 10))
+    cur.fetchone.return_value = (date(2025, 3, 10),)
+    cur.fetchall.return_value = []
+
+    store.ensure_closed(until=date(2025, 3, 12))
+
+    queries = [c[0][0] for c in cur.execute.call_args_list]
+    select = next(c for c in cur.execute.call_args_list if "FROM sales_daily_product" in c[0][0])
+    # Se reescriben los bloques desde el que contiene el 8 de marzo (3 días antes del siguiente)
+    assert select[0][1] == (block_start(date(2025, 3, 8)), date(2025, 3, 12))
+    assert any("demand_series_state" in q and "ON CONFLICT" in q for q in queries)
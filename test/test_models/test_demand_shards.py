@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from models.demand_engine import holt_winters, rolling_origin
+from models.demand_shards import fit_sharded, shard_rows
+
+def _values(n_series=60, n_days=70, seed=0):
+    rng = np.random.default_rng(seed)
+    week = np.array([1.0, 1.0, 1.1, 1.2, 1.5, 2.0, 0.6])
+    return rng.poisson(rng.uniform(1, 10, (n_series, 1)) * week[np.arange(n_days) % 7]).astype(float)
+
+def test_shard_rows_split_groups_deterministically():
+    groups = ["b", "a", "b", None, "a", "b", "b"]
+
+    shards = shard_rows(groups, len(groups), max_rows=2)
+
+    assert [s.tolist() for s in shards] == [[3], [1, 4], [0, 2], [5, 6]]
+    assert sorted(np.concatenate(shards).tolist()) == list(range(7))
+
+@pytest.fixture
+def parallel(monkeypatch):
+    monkeypatch.setattr("models.demand_shards.Config.FORECAST_PARALLEL_MIN_SERIES", 1)
+
+def test_sharded_forecast_matches_single_call(parallel):
+    values = _values()
+    groups = [f"cat{i % 4}" for i in range(values.shape[0])]
+    calls = []
+
+    result = fit_sharded(holt_winters, values, 14, groups=groups, workers=2, max_rows=7,
+                         progress=lambda *args: calls.append(args))
+    expected = holt_winters(values, 14)
+
+    assert np.allclose(result.forecast, expected.forecast)
+    assert np.allclose(result.upper, expected.upper)
+    assert np.array_equal(result.params["alpha"], expected.params["alpha"])
+    assert calls[-1] == (60, 60, len(calls), len(calls)) and len(calls) == 12
+
+def test_sharded_backtest_matches_single_call(parallel):
+    values = _values(seed=1)
+
+    result = fit_sharded(rolling_origin, values, 7, 3, workers=2, max_rows=25)
+    expected = rolling_origin(values, 7, 3)
+
+    assert result.origins == expected.origins
+    assert np.allclose(result.forecasts, expected.forecasts)
+
+def test_single_worker_runs_in_process(parallel, monkeypatch):
+    monkeypatch.setattr("models.demand_shards._get_pool", lambda workers: pytest.fail("no debe usar el pool"))
+
+    result = fit_sharded(holt_winters, _values(), 7, workers=1)
+
+    assert result.forecast.shape == (60, 7)
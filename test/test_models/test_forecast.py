@@ -0,0 +1,62 @@
+from datetime import date
+from unittest.mock import MagicMock, patch
+import numpy as np
+from models.Forecast import DemandForecast
+from models.demand_engine import DemandMatrix
+
+INVENTORY = [
+    {"id": 1, "name": "Mouse", "sku": "M-1", "category": "Accesorios", "current_stock": 5,
+     "minimum_stock": 2, "maximum_stock": 50},
+    {"id": 2, "name": "Cable", "sku": "C-1", "category": "Accesorios", "current_stock": 100,
+     "minimum_stock": 2, "maximum_stock": 200},
+]
+
+def _forecast(values):
+    forecast = DemandForecast()
+    forecast.get_current_inventory = MagicMock(return_value=INVENTORY)
+    # 2025-01-06 es lunes
+    forecast.get_demand_matrix = MagicMock(return_value=DemandMatrix([1, 2], date(2025, 1, 6), values))
+    forecast.get_accuracy_summary = MagicMock(return_value=None)
+    return forecast
+
+def test_forecast_uses_engine_per_product_and_timeline():
+    week = np.array([4, 4, 4, 4, 6, 10, 2], dtype=float)
+    values = np.vstack([np.tile(week, 8), np.zeros(56)])
+
+    result = _forecast(values).calculate_demand_forecast('week')
+
+    mouse, cable = result["products"]
+    assert mouse["predicted_demand"] == 34.0 and mouse["priority"] == "high"
+    assert mouse["lower_bound"] <= mouse["predicted_demand"] <= mouse["upper_bound"]
+    assert cable["predicted_demand"] == 0 and cable["priority"] == "low"
+    # 7 días reales + 7 predichos
+    assert len(result["timeline"]) == 14
+    assert result["timeline"][0]["actual"] == 4 and result["timeline"][-1]["actual"] is None
+    assert result["seasonalPatterns"][0]["name"] == "Pico los Sábado"
+    assert result["seasonalPatterns"][1]["name"] == "Valle los Domingo"
+
+def test_forecast_without_sales_uses_fallback():
+    result = _forecast(np.zeros((2, 56))).calculate_demand_forecast('month')
+
+    assert result["accuracy"] is None and result["timeline"] == []
+
+def test_accuracy_comes_from_backtest_summary():
+    forecast = _forecast(np.ones((2, 56)))
+    forecast.get_accuracy_summary.return_value = {"accuracy": 81.5, "wape": 18.5, "categories": []}
+
+    result = forecast.calculate_demand_forecast('week')
+
+    assert result["accuracy"] == 81.5 and result["backtest"]["wape"] == 18.5
+
+def test_run_backtest_writes_product_sums(mock_db_connect):
+    _, _, cur = mock_db_connect
+    forecast = _forecast(np.vstack([np.tile([4, 4, 4, 4, 6, 10, 2], 12), np.zeros(84)]))
+
+    with patch("models.Forecast.execute_values") as insert:
+        evaluated = forecast.run_backtest(horizon=7, folds=3)
+
+    # El producto sin ventas no se guarda
+    assert evaluated == 1
+    rows = insert.call_args[0][2]
+    assert rows[0][:4] == (1, "Accesorios", 7, 3)
+    assert "DELETE FROM forecast_accuracy" in cur.execute.call_args_list[0][0][0]
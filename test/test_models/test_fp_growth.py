@@ -0,0 +1,45 @@
+import random
+from collections import Counter
+from itertools import combinations
+from models.basket_engine import BasketMatrix
+from models.fp_growth import fp_growth, frequent_itemsets
+
+def _brute_force(transactions, min_count, max_length):
+    """Todos los subconjuntos de cada canasta (referencia)"""
+    counts = Counter()
+    for items in transactions:
+        for size in range(1, max_length + 1):
+            for itemset in combinations(sorted(set(items)), size):
+                counts[itemset] += 1
+    return {itemset: count for itemset, count in counts.items() if count >= min_count}
+
+def test_fp_growth_matches_subset_enumeration():
+    rng = random.Random(3)
+    transactions = [rng.sample(range(12), rng.randint(1, 7)) for _ in range(400)]
+
+    mined = dict(fp_growth(transactions, min_count=4, max_length=4))
+
+    assert mined == _brute_force(transactions, 4, 4)
+    assert any(len(itemset) == 4 for itemset in mined)
+
+def test_max_length_limits_itemsets():
+    transactions = [[1, 2, 3, 4]] * 5
+
+    mined = fp_growth(transactions, min_count=5, max_length=2)
+
+    assert max(len(itemset) for itemset, _ in mined) == 2
+    assert len(mined) == 4 + 6
+
+def test_frequent_itemsets_from_basket_matrix():
+    """Soporte como fracción de canastas; solo conjuntos de 2+ productos"""
+    matrix = BasketMatrix.from_rows(
+        [1, 1, 1, 2, 2, 2, 3, 3, 4],
+        [10, 20, 30, 10, 20, 30, 10, 20, 40]
+    )
+
+    itemsets = frequent_itemsets(matrix, min_support=0.5, max_length=3)
+
+    assert itemsets[0] == ((10, 20), 3)
+    assert ((10, 20, 30), 2) in itemsets
+    assert all(len(items) >= 2 for items, _ in itemsets)
+    assert frequent_itemsets(BasketMatrix.from_rows([], []), 0.1) == []
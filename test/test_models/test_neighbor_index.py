@@ -0,0 +1,66 @@
+import pytest
+from models.basket_engine import BasketMatrix, pair_statistics
+from models.neighbor_index import NeighborIndex, build_neighbor_arrays, open_neighbor_index, write_neighbor_index
+
+# Canastas: {1,2,3}, {1,2}, {1,3}, {2,4}
+SALES = ([1, 1, 1, 2, 2, 3, 3, 4, 4], [1, 2, 3, 1, 2, 1, 3, 2, 4])
+
+def _stats():
+    return pair_statistics(BasketMatrix.from_rows(*SALES))
+
+def test_index_round_trip_matches_pair_statistics(tmp_path):
+    stats = _stats()
+    path = str(tmp_path / "neighbors.bin")
+
+    write_neighbor_index(path, build_neighbor_arrays(stats, k=3), data_version=7)
+    index = NeighborIndex(path)
+
+    assert len(index) == 4 and index.k == 3
+    assert index.data_version == 7 and index.n_baskets == 4
+    for antecedent, consequent in [(1, 2), (2, 1), (3, 1), (2, 4)]:
+        expected = stats.rule(antecedent, consequent)
+        assert index.rule(antecedent, consequent) == pytest.approx(expected)
+    assert index.rule(3, 4) is None and index.rule(99, 1) is None
+
+def test_neighbors_are_truncated_to_k_by_confidence(tmp_path):
+    path = str(tmp_path / "neighbors.bin")
+    write_neighbor_index(path, build_neighbor_arrays(_stats(), k=1))
+
+    index = NeighborIndex(path)
+
+    # P(1 | 3) = 1.0 le gana a cualquier otro vecino de 3
+    assert [n["id"] for n in index.neighbors_of(3)] == [1]
+    # 4 solo aparece con 2
+    assert index.neighbors_of(4) == [{"id": 2, "confidence": 1.0, "lift": pytest.approx(4 / 3), "count": 1}]
+    assert index.neighbors_of(99) == []
+
+def test_open_reloads_replaced_file(tmp_path):
+    path = str(tmp_path / "neighbors.bin")
+    assert open_neighbor_index(path) is None
+
+    write_neighbor_index(path, build_neighbor_arrays(_stats(), k=2), data_version=1)
+    first = open_neighbor_index(path)
+    assert open_neighbor_index(path) is first
+
+    write_neighbor_index(path, build_neighbor_arrays(_stats(), k=2), data_version=2)
+    second = open_neighbor_index(path)
+    assert second is not first and second.data_version == 2
+
+def test_rule_uses_reverse_row_outside_top_k(tmp_path):
+    """Si el consecuente no está en el top-K, el par se resuelve desde la fila del otro"""
+    stats = _stats()
+    path = str(tmp_path / "neighbors.bin")
+    write_neighbor_index(path, build_neighbor_arrays(stats, k=1))
+
+    index = NeighborIndex(path)
+
+    # El top-1 de 2 es 1, pero 2 es el top-1 de 4: P(4 | 2) = 1/3
+    assert index.rule(2, 4) == pytest.approx(stats.rule(2, 4))
+    # Fuera del top-K de ambos
+    assert index.rule(2, 3) is None
+
+def test_old_format_is_treated_as_missing(tmp_path):
+    path = tmp_path / "neighbors.bin"
+    path.write_bytes(b"RNX1" + b"\1\0\0\0" + b"\0" * 56)
+
+    assert open_neighbor_index(str(path)) is None
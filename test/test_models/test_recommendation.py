@@ -0,0 +1,216 @@
+from unittest.mock import MagicMock
+from models.recommendation import RecommendationSystem
+from models.basket_engine import BasketMatrix, pair_statistics
+
+def _products(count):
+    return [
+        {"id": i, "code": f"P{i:03d}", "name": f"Producto {i}", "category": "Audio",
+         "price": 100.0 * i, "current_stock": 10, "barcode": f"750{i:04d}"}
+        for i in range(1, count + 1)
+    ]
+
+# Tres ventas: (1, 2) dos veces y (2, 3) una vez
+PAIRS = [((1, 2), 2), ((2, 3), 1)]
+SALES = ([1, 1, 2, 2, 3, 3], [1, 2, 1, 2, 2, 3])
+
+def _system():
+    system = RecommendationSystem()
+    system.get_all_products = MagicMock(return_value=_products(3))
+    system.get_frequently_bought_together = MagicMock(return_value=PAIRS)
+    system.get_frequent_itemsets = MagicMock(return_value=[])
+    system.get_neighbor_index = MagicMock(return_value=None)
+    system.get_similar_products = MagicMock(return_value=[])
+    system.get_pair_statistics = MagicMock(return_value=pair_statistics(BasketMatrix.from_rows(*SALES)))
+    system.get_product_neighbors = MagicMock(return_value=[(1, 2), (3, 1)])
+    system.get_trending_combinations = MagicMock(return_value=[])
+    system.get_performance_metrics = MagicMock(return_value={})
+    return system
+
+def test_all_recommendations_load_data_once():
+    """Productos e historial se leen una vez para todas las secciones"""
+    system = _system()
+
+    result = system.get_all_recommendations()
+
+    assert system.get_all_products.call_count == 1
+    assert system.get_frequently_bought_together.call_count == 1
+    assert result["productRecommendations"][0]["id"] == 1
+    assert result["bundleSuggestions"][0]["items"] == ["Producto 1", "Producto 2"]
+    assert result["crossSellOpportunities"][0]["conversions"] == 2
+
+def test_product_recommendations_use_rule_confidence():
+    """La confianza es P(producto | acompañante), no la frecuencia relativa"""
+    system = _system()
+
+    recommendations = system.get_product_recommendations()
+
+    # Producto 1 aparece en 2 de las 3 ventas con Producto 2
+    assert recommendations[0]["confidence"] == 66.7
+    # Producto 2 aparece en la única venta con Producto 3
+    assert recommendations[1]["confidence"] == 95.0
+    assert system.get_pair_statistics.call_count == 1
+
+def test_relative_frequency_uses_max_not_first_pair():
+    """Con decaimiento los pares no vienen por frecuencia: el máximo no es el primero"""
+    system = _system()
+    system.get_all_products = MagicMock(return_value=_products(5))
+    system.get_frequently_bought_together = MagicMock(return_value=[((4, 1), 1), ((5, 2), 4)])
+
+    recommendations = system.get_product_recommendations()
+
+    # Sin regla para estos pares: frecuencia relativa a la máxima (4)
+    assert recommendations[0]["confidence"] == 25.0
+    assert recommendations[1]["confidence"] == 95.0
+
+def test_rule_outside_index_top_k_uses_pair_statistics():
+    """Un par que el índice no conoce se lee de los pares en memoria, no de la frecuencia"""
+    system = _system()
+    index = MagicMock()
+    index.rule.return_value = None
+    system.get_neighbor_index = MagicMock(return_value=index)
+
+    recommendations = system.get_product_recommendations()
+
+    assert recommendations[0]["confidence"] == 66.7
+    assert system.get_pair_statistics.call_count == 1
+
+def test_sections_still_work_standalone():
+    """Sin contexto explícito cada sección arma el suyo"""
+    system = _system()
+
+    bundles = system.get_bundle_suggestions()
+
+    assert len(bundles) == 2
+    assert system.get_all_products.call_count == 1
+
+def test_bundles_use_frequent_itemsets():
+    """Con conjuntos minados los bundles pueden tener tres o más productos"""
+    system = _system()
+    system.get_frequent_itemsets.return_value = [([1, 2, 3], 4), ([1, 2], 6)]
+
+    bundles = system.get_bundle_suggestions()
+
+    assert bundles[0]["items"] == ["Producto 1", "Producto 2", "Producto 3"]
+    assert bundles[0]["originalPrice"] == 600.0
+    assert bundles[1]["items"] == ["Producto 1", "Producto 2"]
+    system.get_frequently_bought_together.assert_not_called()
+
+def test_refresh_frequent_itemsets_replaces_table(mock_db_connect, monkeypatch):
+    """La minería reemplaza frequent_itemsets con los conjuntos de 2+ productos"""
+    import models.recommendation as recommendation
+    _, conn, cur = mock_db_connect
+    system = RecommendationSystem()
+    system.get_basket_matrix = MagicMock(return_value=BasketMatrix.from_rows(
+        [1, 1, 1, 2, 2, 2, 3, 3], [1, 2, 3, 1, 2, 3, 1, 2]))
+    inserted = MagicMock()
+    monkeypatch.setattr(recommendation, "execute_values", inserted)
+
+    count = system.refresh_frequent_itemsets(min_support=0.5, max_length=3)
+
+    assert count == 4
+    assert cur.execute.call_args_list[0][0][0] == "DELETE FROM frequent_itemsets"
+    rows = inserted.call_args[0][2]
+    assert rows[0] == ([1, 2], 2, 3, 1.0)
+    assert ([1, 2, 3], 3, 2, 2 / 3) in rows
+    conn.commit.assert_called_once()
+
+def test_product_index_lookups():
+    """El índice resuelve productos por id"""
+    from utils.product_index import ProductIndex
+
+    index = ProductIndex(_products(3))
+
+    assert index.get(2)["name"] == "Producto 2"
+    assert 3 in index and len(index) == 3
+    assert index.get(99) is None and 99 not in index
+
+def test_specific_recommendations_use_neighbors():
+    """Los relacionados son los vecinos del producto en product_pairs"""
+    system = _system()
+
+    recommendations = system._get_specific_recommendations(2)
+
+    assert [r["id"] for r in recommendations] == [1, 3]
+    system.get_product_neighbors.assert_called_once_with(2, limit=18)
+
+def test_pairs_read_top_k_from_table(mock_db_connect, monkeypatch):
+    """Los pares salen de product_pairs; ventana y decaimiento van en SQL"""
+    from config import Config
+    monkeypatch.setattr(Config, "RECO_PAIR_WINDOW_DAYS", 90)
+    monkeypatch.setattr(Config, "RECO_PAIR_HALF_LIFE_DAYS", 30.0)
+    _, _, cur = mock_db_connect
+    cur.fetchall.return_value = [(1, 2, 5), (2, 3, 1)]
+
+    pairs = RecommendationSystem().get_frequently_bought_together(limit=10)
+
+    assert pairs == [((1, 2), 5), ((2, 3), 1)]
+    query, params = cur.execute.call_args[0]
+    assert "FROM product_pairs" in query
+    assert "last_seen >= %s" in query and "power(0.5" in query
+    assert params[-2:] == (30.0, 10)
+
+def test_cart_recommendations_merge_neighbors(mock_db_connect, tmp_path):
+    """Vecinos de todo el carrito combinados, sin repetir, sin lo del carrito y con stock"""
+    from models.neighbor_index import NeighborIndex, build_neighbor_arrays, write_neighbor_index
+    # Canastas: {1,2,3}, {1,2}, {1,3}, {2,4}, {3,5}
+    stats = pair_statistics(BasketMatrix.from_rows(
+        [1, 1, 1, 2, 2, 3, 3, 4, 4, 5, 5], [1, 2, 3, 1, 2, 1, 3, 2, 4, 3, 5]))
+    path = str(tmp_path / "neighbors.bin")
+    write_neighbor_index(path, build_neighbor_arrays(stats, k=5))
+    _, _, cur = mock_db_connect
+    cur.fetchall.return_value = [
+        (1, "Producto 1", "Audio", 100, 5, "P001"),
+        (2, "Producto 2", "Audio", 200, 5, "P002"),
+        (3, "Producto 3", None, 300, 5, "P003"),
+        (4, "Producto 4", "Audio", 400, 0, "P004"),
+        (5, "Producto 5", "Audio", 500, 2, "P005"),
+    ]
+
+    result = RecommendationSystem().get_cart_recommendations([1, 2, 1], limit=5, index=NeighborIndex(path))
+
+    # 3: P(3|1) = 2/3 y P(3|2) = 1/3 → 1 - (1/3)(2/3); 4 sin stock; 5 no es vecino
+    assert [r["id"] for r in result] == [3]
+    assert result[0]["confidence"] == 77.8
+    assert result[0]["reason"] == "Frecuentemente comprado con Producto 1"
+    assert result[0]["category"] == "General"
+    assert sorted(cur.execute.call_args[0][1][0]) == [1, 2, 3, 4]
+
+def test_trending_combinations_limit_before_laterals(mock_db_connect):
+    """Los LATERAL (nombres y ventas) se evalúan solo para el top 10 de conjuntos"""
+    _, _, cur = mock_db_connect
+    cur.fetchall.return_value = [("A + B", 5, 1200.0, 2.5)]
+
+    result = RecommendationSystem().get_trending_combinations()
+
+    query = cur.execute.call_args[0][0]
+    assert query.index("LIMIT 10") < query.index("CROSS JOIN LATERAL")
+    assert result == [{"combo": "A + B", "sales": 5, "revenue": 1200.0, "avg_quantity": 2.5}]
+
+def test_update_content_similarity_refits_from_catalog_under_lock(mock_db_connect):
+    _, _, cur = mock_db_connect
+    system = RecommendationSystem()
+    system.has_content_similarity = MagicMock(return_value=True)
+    system.get_catalog_texts = MagicMock(return_value=[
+        {"id": 1, "name": "Mouse Logitech", "brand": "Logitech", "category": "Accesorios"},
+        {"id": 2, "name": "Teclado Logitech", "brand": "Logitech", "category": "Accesorios"},
+    ])
+    system._insert_similarity = MagicMock()
+    cur.fetchall.return_value = []
+
+    assert system.update_content_similarity(1) is True
+
+    queries = [c[0][0] for c in cur.execute.call_args_list]
+    assert "pg_advisory_xact_lock" in queries[0]
+    # Cada actualización arma el índice con el catálogo completo vigente
+    system.get_catalog_texts.assert_called_once_with()
+
+def test_bootstrap_rebuild_skips_when_another_process_holds_the_lock(mock_db_connect):
+    _, _, cur = mock_db_connect
+    system = RecommendationSystem()
+    system.get_catalog_texts = MagicMock()
+    cur.fetchone.return_value = (False,)
+
+    assert system.rebuild_content_similarity(if_empty=True) == 0
+
+    assert "pg_try_advisory_xact_lock" in cur.execute.call_args_list[0][0][0]
+    system.get_catalog_texts.assert_not_called()
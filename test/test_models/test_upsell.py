@@ -0,0 +1,82 @@
+import random
+import pytest
+from models.upsell import UpsellIndex, margin_of
+
+def _product(pid, price, cost, category="Laptops", brand=None, stock=5):
+    return {"id": pid, "name": f"Producto {pid}", "category": category, "brand": brand,
+            "price": price, "cost_price": cost, "current_stock": stock, "code": f"P{pid}"}
+
+def _brute_force(index, product, limit):
+    """Todos los candidatos del mismo grupo recorridos uno por uno"""
+    own = max(margin_of(product), 0.0)
+    group = [
+        other for other in index.products.values()
+        if index._category(other) == index._category(product)
+        and index.tier_of(other) == index.tier_of(product)
+        and product["price"] < other["price"] <= product["price"] * (1 + index.max_step)
+        and margin_of(other) > own
+    ]
+    group.sort(key=lambda other: (-margin_of(other), other["price"]))
+    return [other["id"] for other in group[:limit]]
+
+def test_candidates_are_pricier_and_ranked_by_margin():
+    index = UpsellIndex([
+        _product(1, 1000, 800),
+        _product(2, 1200, 700),   # margen 500
+        _product(3, 1400, 1300),  # margen 100: menor que el original (200)
+        _product(4, 1450, 850),   # margen 600
+        _product(5, 2000, 500),   # fuera del rango de precio (+50%)
+        _product(6, 1100, 600, category="Accesorios"),
+        _product(7, 1300, None),  # sin costo
+    ])
+
+    upsells = index.candidates(index.products[1], limit=5)
+
+    assert [u["id"] for u in upsells] == [4, 2]
+    assert upsells[0]["extraMargin"] == 400 and upsells[0]["priceIncrease"] == 45.0
+
+def test_brand_tiers_keep_premium_and_budget_apart():
+    budget = [_product(i, 100 + i, 50, brand="Eco") for i in range(1, 4)]
+    middle = [_product(i, 500 + i, 200, brand="Media") for i in range(4, 7)]
+    premium = [_product(i, 700 + i, 100, brand="Premium") for i in range(7, 10)]
+    index = UpsellIndex(budget + middle + premium, max_step=10)
+
+    assert index.tier_of(budget[0]) < index.tier_of(middle[0]) < index.tier_of(premium[0])
+    # Un producto económico no sube a otra marca de otro nivel
+    assert {u["id"] for u in index.candidates(budget[0], limit=10)} == {2, 3}
+
+def test_single_tier_with_few_brands():
+    index = UpsellIndex([_product(1, 100, 90, brand="A"), _product(2, 140, 60, brand="B")])
+
+    assert index.tier_of(index.products[1]) == index.tier_of(index.products[2]) == 0
+    assert [u["id"] for u in index.candidates(index.products[1])] == [2]
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_candidates_match_brute_force(seed):
+    rng = random.Random(seed)
+    brands = ["a", "b", "c", "d", None]
+    products = [
+        _product(pid, round(rng.uniform(10, 1000), 2), rng.choice([None, round(rng.uniform(5, 600), 2)]),
+                 category=rng.choice(["x", "y", "z"]), brand=rng.choice(brands))
+        for pid in range(1, 400)
+    ]
+    index = UpsellIndex(products)
+
+    for product in products[:80]:
+        got = [u["id"] for u in index.candidates(product, limit=4)]
+        assert got == _brute_force(index, product, 4)
+
+def test_best_upsells_one_per_target_by_extra_margin():
+    index = UpsellIndex([
+        _product(1, 1000, 900),
+        _product(2, 1010, 950),
+        _product(3, 1200, 600),
+        _product(4, 50, 40, category="Cables"),
+        _product(5, 60, 20, category="Cables"),
+    ])
+
+    items = index.best_upsells(limit=10)
+
+    # 2 → 3 deja más margen adicional que 1 → 3; cada alternativa aparece una vez
+    assert [(item["productId"], item["upgradeId"]) for item in items] == [(2, 3), (4, 5)]
+    assert items[0]["extraMargin"] == 540
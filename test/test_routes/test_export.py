@@ -0,0 +1,60 @@
+import json
+from datetime import datetime
+import pytest
+from flask import Flask
+from flask_restx import Api
+from routes.sales_report import api as sales_report_ns
+from routes.sale_details import api as sale_details_ns
+from database.connection import get_pool_stats
+
+def _report_row(i):
+    return (i, 1, f"Producto {i}", 2, 10.0, 20.0,
+            datetime(2025, 1, 1, 10, 0), 1, "Carlos Mendoza", "Tarjeta")
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    api = Api(app)
+    api.add_namespace(sales_report_ns, path="/sales-report")
+    api.add_namespace(sale_details_ns, path="/sale-details")
+    return app.test_client()
+
+def test_sales_report_csv_streams_in_batches(mock_db_connect, client):
+    """El CSV se arma lote por lote desde un cursor con nombre"""
+    _, conn, cur = mock_db_connect
+    cur.fetchmany.side_effect = [[_report_row(1), _report_row(2)], [_report_row(3)], []]
+
+    response = client.get("/sales-report/export?format=csv&payment_method=Tarjeta")
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+    assert "attachment" in response.headers["Content-Disposition"]
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0].startswith("id,product_id,product_name")
+    assert len(lines) == 4
+    assert "name" in conn.cursor.call_args.kwargs
+    assert cur.fetchall.call_count == 0
+    _, params = cur.execute.call_args[0]
+    assert params == ["Tarjeta"]
+    assert get_pool_stats()["in_use"] == 0
+
+def test_sale_details_ndjson(mock_db_connect, client):
+    """Cada detalle se envía como una línea JSON"""
+    _, _, cur = mock_db_connect
+    cur.fetchmany.side_effect = [[(1, 10, 5, 2, 15.5, 31.0)], []]
+
+    response = client.get("/sale-details/export?format=ndjson")
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert rows == [{"detail_id": 1, "sale_id": 10, "product_id": 5,
+                     "quantity": 2, "price": 15.5, "subtotal": 31.0}]
+
+def test_export_rejects_invalid_params(mock_db_connect, client):
+    """Formato o fecha inválidos responden 400 sin abrir el cursor"""
+    mock_connect, _, _ = mock_db_connect
+
+    assert client.get("/sales-report/export?format=xml").status_code == 400
+    assert client.get("/sales-report/export?start_date=ayer").status_code == 400
+    assert mock_connect.call_count == 0
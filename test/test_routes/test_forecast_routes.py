@@ -0,0 +1,42 @@
+import pytest
+from flask import Flask
+from flask_restx import Api
+import routes.forecast_routes as forecast_routes
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    api = Api(app)
+    api.add_namespace(forecast_routes.api, path="/ml/forecast")
+    return app.test_client()
+
+def test_forecast_includes_backtest(client, monkeypatch):
+    backtest = {"products": 3, "mape": 20.0, "smape": 18.0, "bias": -2.5, "wape": 15.0, "accuracy": 85.0,
+                "horizon": 7, "folds": 8, "evaluatedAt": "2025-01-01T00:00:00", "stale": False,
+                "categories": [{"category": "Audio", "products": 3, "mape": 20.0, "smape": 18.0,
+                                "bias": -2.5, "wape": 15.0, "accuracy": 85.0}]}
+    monkeypatch.setattr(forecast_routes, "get_forecast_data", lambda period: {
+        "products": [], "timeline": [], "seasonalPatterns": [], "recommendations": [],
+        "accuracy": 85.0, "backtest": backtest
+    })
+
+    data = client.get("/ml/forecast/?period=week").get_json()
+
+    assert data["accuracy"] == 85.0
+    assert data["backtest"]["categories"][0]["category"] == "Audio"
+
+def test_forecast_accuracy_endpoint(client, monkeypatch):
+    monkeypatch.setattr(forecast_routes, "get_forecast_accuracy",
+                        lambda limit: {"summary": None, "products": [], "limit": limit})
+
+    assert client.get("/ml/forecast/accuracy?limit=5").get_json()["limit"] == 5
+    assert client.get("/ml/forecast/accuracy?limit=0").status_code == 400
+
+def test_export_returns_csv_with_dated_filename(client, monkeypatch):
+    monkeypatch.setattr(forecast_routes, "export_forecast", lambda: "Producto,SKU")
+
+    response = client.get("/ml/forecast/export")
+
+    assert response.status_code == 200
+    assert response.get_json()["csv"] == "Producto,SKU"
+    assert response.get_json()["filename"].startswith("prediccion_demanda_")
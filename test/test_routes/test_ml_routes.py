@@ -0,0 +1,57 @@
+import pytest
+from flask import Flask
+from flask_restx import Api
+import routes.ml_routes as ml_routes
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    api = Api(app)
+    api.add_namespace(ml_routes.api, path="/ml")
+    return app.test_client()
+
+def test_cart_recommendations(client, monkeypatch):
+    calls = []
+
+    def fake_cart(product_ids, limit):
+        calls.append((product_ids, limit))
+        return {"cart": product_ids, "recommendations": [{"id": 9, "name": "Mouse"}]}
+
+    monkeypatch.setattr(ml_routes, "get_cart_recommendations", fake_cart)
+
+    response = client.post("/ml/recommendations/cart", json={"product_ids": [1, 2], "limit": 3})
+
+    assert response.status_code == 200
+    assert response.get_json()["recommendations"][0]["id"] == 9
+    assert calls == [([1, 2], 3)]
+
+@pytest.mark.parametrize("body", [
+    {},
+    {"product_ids": []},
+    {"product_ids": ["1"]},
+    {"product_ids": [1], "limit": 0},
+    {"product_ids": [1], "limit": 500}
+])
+def test_cart_recommendations_validation(client, body):
+    response = client.post("/ml/recommendations/cart", json=body)
+
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+def test_similar_products(client, monkeypatch):
+    monkeypatch.setattr(ml_routes, "get_similar_products",
+                        lambda product_id, limit: {"product_id": product_id, "similar": [], "limit": limit})
+
+    response = client.get("/ml/products/5/similar?limit=4")
+
+    assert response.status_code == 200
+    assert response.get_json() == {"product_id": 5, "similar": [], "limit": 4}
+    assert client.get("/ml/products/5/similar?limit=0").status_code == 400
+
+def test_product_upsell(client, monkeypatch):
+    monkeypatch.setattr(ml_routes, "get_product_upsells",
+                        lambda product_id, limit: None if product_id == 404 else {"product_id": product_id, "upsells": []})
+
+    assert client.get("/ml/products/5/upsell?limit=3").get_json() == {"product_id": 5, "upsells": []}
+    assert client.get("/ml/products/404/upsell").status_code == 404
+    assert client.get("/ml/products/5/upsell?limit=99").status_code == 400
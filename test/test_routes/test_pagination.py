@@ -0,0 +1,59 @@
+import pytest
+from flask import Flask
+from flask_restx import Api
+from routes.suppliers import api as suppliers_ns
+
+def _supplier_rows(start, count):
+    return [
+        (i, f"Proveedor {i}", "4610000000", "Contacto", "mail@test.com", "Calle 1")
+        for i in range(start, start + count)
+    ]
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    api = Api(app)
+    api.add_namespace(suppliers_ns, path="/suppliers")
+    return app.test_client()
+
+def test_list_without_params_returns_full_list(mock_db_connect, client):
+    """Sin after/limit se mantiene la respuesta original (lista completa)"""
+    _, _, cur = mock_db_connect
+    cur.fetchall.return_value = _supplier_rows(1, 3)
+
+    response = client.get("/suppliers/")
+
+    assert response.status_code == 200
+    assert len(response.get_json()) == 3
+    query, params = cur.execute.call_args[0]
+    assert "LIMIT" not in query
+    assert params == []
+
+def test_keyset_page_with_next_cursor(mock_db_connect, client):
+    """Se lee limit + 1 filas después del cursor y se devuelve next_cursor"""
+    _, _, cur = mock_db_connect
+    cur.fetchall.return_value = _supplier_rows(11, 3)
+
+    response = client.get("/suppliers/?after=10&limit=2")
+
+    body = response.get_json()
+    assert [s["supplier_id"] for s in body["items"]] == [11, 12]
+    assert body["next_cursor"] == 12
+    query, params = cur.execute.call_args[0]
+    assert "WHERE supplier_id > %s" in query
+    assert params == [10, 3]
+
+def test_last_page_has_no_cursor(mock_db_connect, client):
+    """La última página devuelve next_cursor nulo"""
+    _, _, cur = mock_db_connect
+    cur.fetchall.return_value = _supplier_rows(11, 1)
+
+    body = client.get("/suppliers/?after=10&limit=2").get_json()
+
+    assert len(body["items"]) == 1
+    assert body["next_cursor"] is None
+
+@pytest.mark.parametrize("query", ["limit=0", "limit=100000", "after=abc"])
+def test_invalid_page_params(client, query):
+    """Parámetros inválidos responden 400"""
+    assert client.get(f"/suppliers/?{query}").status_code == 400
@@ -0,0 +1,151 @@
+import threading
+from contextlib import contextmanager
+from unittest.mock import MagicMock
+from services.forecast_cache import ForecastCache, ForecastResultStore, cache_metadata
+
+class SharedStore:
+    """forecast_results y sus advisory locks, compartidos por varios "workers" (cachés)"""
+
+    def __init__(self):
+        self.rows = {}
+        self.locks = {}
+        self.loads = 0
+
+    @contextmanager
+    def flight(self, period):
+        with self.locks.setdefault(period, threading.Lock()):
+            yield None
+
+    def load(self, period, stamp, cur=None):
+        self.loads += 1
+        entry = self.rows.get(period)
+        return entry if entry is not None and entry.stamp == stamp else None
+
+    def save(self, period, entry, cur):
+        self.rows[period] = entry
+
+def _cache(compute, stamp, store=None):
+    return ForecastCache(compute=compute, stamp=stamp, store=store or SharedStore())
+
+def test_repeat_get_is_served_from_memory():
+    compute = MagicMock(side_effect=lambda period: {"period": period})
+    cache = _cache(compute, lambda: (1, "2025-01-01"))
+
+    first, first_hit = cache.get('month')
+    second, second_hit = cache.get('month')
+
+    assert second is first
+    assert (first_hit, second_hit) == (False, True)
+    assert compute.call_count == 1
+    assert cache_metadata(second, True)["version"] == 1
+
+def test_new_version_or_day_recomputes():
+    stamp = MagicMock(return_value=(1, "2025-01-01"))
+    compute = MagicMock(side_effect=lambda period: {"period": period})
+    cache = _cache(compute, stamp)
+    cache.get('week')
+
+    stamp.return_value = (2, "2025-01-01")
+    entry, hit = cache.get('week')
+    assert not hit and entry.stamp == (2, "2025-01-01")
+
+    stamp.return_value = (2, "2025-01-02")
+    assert cache.get('week')[1] is False
+    assert compute.call_count == 3
+
+def test_periods_are_cached_separately_and_unknown_is_week():
+    compute = MagicMock(side_effect=lambda period: {"period": period})
+    cache = _cache(compute, lambda: (1, None))
+
+    assert cache.get('quarter')[0].data == {"period": "quarter"}
+    assert cache.get('week')[0].data == {"period": "week"}
+    assert cache.get('otro')[1] is True
+    assert compute.call_count == 2
+
+def test_concurrent_requests_share_one_computation():
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def compute(period):
+        calls.append(period)
+        started.set()
+        release.wait(timeout=5)
+        return {"period": period}
+
+    cache = _cache(compute, lambda: (1, None))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get('month'))) for _ in range(5)]
+    threads[0].start()
+    started.wait(timeout=5)
+    for thread in threads[1:]:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert calls == ['month']
+    assert len(results) == 5
+    assert len({id(entry) for entry, _ in results}) == 1
+    assert sorted(hit for _, hit in results) == [False, True, True, True, True]
+
+def test_failed_computation_is_not_cached():
+    compute = MagicMock(side_effect=[RuntimeError("db"), {"ok": True}])
+    cache = _cache(compute, lambda: (1, None))
+
+    try:
+        cache.get('week')
+    except RuntimeError:
+        pass
+    assert cache.get('week')[0].data == {"ok": True}
+
+def test_other_worker_reads_the_stored_result():
+    store = SharedStore()
+    compute = MagicMock(side_effect=lambda period: {"period": period})
+    first = _cache(compute, lambda: (1, None), store)
+    second = _cache(compute, lambda: (1, None), store)
+
+    built, _ = first.get('month')
+    entry, hit = second.get('month')
+
+    assert hit and entry.data == built.data
+    assert compute.call_count == 1
+
+def test_concurrent_workers_share_one_computation():
+    """El worker que espera el lock lee el resultado guardado por el que calculó"""
+    store = SharedStore()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def compute(period):
+        calls.append(period)
+        started.set()
+        release.wait(timeout=5)
+        return {"period": period}
+
+    workers = [_cache(compute, lambda: (1, None), store) for _ in range(3)]
+    results = []
+    threads = [threading.Thread(target=lambda w=w: results.append(w.get('week'))) for w in workers]
+    threads[0].start()
+    started.wait(timeout=5)
+    for thread in threads[1:]:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert calls == ['week']
+    assert sorted(hit for _, hit in results) == [False, True, True]
+
+def test_result_store_locks_period_and_matches_stamp(mock_db_connect):
+    _, _, cur = mock_db_connect
+    store = ForecastResultStore()
+    cur.fetchone.return_value = None
+
+    with store.flight('month') as flight_cur:
+        assert store.load('month', (3, None), flight_cur) is None
+
+    lock, select = cur.execute.call_args_list[:2]
+    assert "pg_advisory_xact_lock" in lock[0][0] and lock[0][1] == ("forecast:month",)
+    assert select[0][1] == ('month', 3, None)
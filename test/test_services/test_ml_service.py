@@ -0,0 +1,32 @@
+from unittest.mock import MagicMock
+from services import ml_service
+
+def _recommender(monkeypatch, **methods):
+    recommender = MagicMock(**methods)
+    monkeypatch.setattr(ml_service, "RecommendationSystem", lambda: recommender)
+    background = MagicMock(return_value=True)
+    monkeypatch.setattr(ml_service, "rebuild_similarity_in_background", background)
+    return recommender, background
+
+def test_similar_products_without_table_rebuild_in_background(monkeypatch):
+    """La petición responde vacío y no calcula el catálogo completo"""
+    recommender, background = _recommender(
+        monkeypatch,
+        get_similar_products=MagicMock(return_value=[]),
+        has_content_similarity=MagicMock(return_value=False)
+    )
+
+    assert ml_service.get_similar_products(5, 4) == {"product_id": 5, "similar": []}
+    recommender.rebuild_content_similarity.assert_not_called()
+    background.assert_called_once_with()
+
+def test_product_changed_only_bootstraps_when_table_is_empty(monkeypatch):
+    recommender, background = _recommender(
+        monkeypatch, update_content_similarity=MagicMock(side_effect=[True, False])
+    )
+
+    ml_service.product_changed(1)
+    background.assert_not_called()
+    ml_service.product_changed(1)
+    background.assert_called_once_with()
+    recommender.rebuild_content_similarity.assert_not_called()
@@ -0,0 +1,138 @@
+import threading
+from unittest.mock import MagicMock
+import pytest
+from config import Config
+from services.recommendation_snapshot import SnapshotStore, snapshot_metadata
+
+@pytest.fixture(autouse=True)
+def no_scheduler(monkeypatch):
+    monkeypatch.setattr(Config, "RECO_SNAPSHOT_CHECK_SECONDS", 0)
+    monkeypatch.setattr(Config, "RECO_SNAPSHOT_REFRESH_SECONDS", 900)
+
+def _wait_idle(store):
+    """Esperar el recálculo en segundo plano, si lo hay"""
+    for thread in threading.enumerate():
+        if thread.name == "reco-snapshot":
+            thread.join(timeout=5)
+
+def test_first_get_builds_then_serves_from_memory():
+    build = MagicMock(side_effect=[{"n": 1}, {"n": 2}])
+    store = SnapshotStore(build=build, fingerprint=lambda: (1,))
+
+    first = store.get()
+    second = store.get()
+
+    assert first is second
+    assert first.data == {"n": 1} and first.version == 1
+    assert build.call_count == 1
+
+def test_stale_snapshot_is_served_while_rebuilding():
+    """Con datos nuevos se responde con la anterior y se recalcula en segundo plano"""
+    release = threading.Event()
+    results = iter([{"n": 1}, {"n": 2}])
+
+    def build(fingerprint):
+        data = next(results)
+        if data["n"] == 2:
+            release.wait(timeout=5)
+        return data
+
+    store = SnapshotStore(build=build, fingerprint=lambda: (1,))
+    store.get()
+    store.mark_stale()
+
+    served = store.get()
+    assert served.data == {"n": 1}
+    assert store.building
+    assert snapshot_metadata(served, store)["refreshing"] is True
+
+    release.set()
+    _wait_idle(store)
+    assert store.get().data == {"n": 2}
+    assert store.get().version == 2
+
+def test_check_rebuilds_only_when_fingerprint_changes():
+    fingerprint = MagicMock(return_value=(10, 20, None))
+    build = MagicMock(return_value={})
+    store = SnapshotStore(build=build, fingerprint=fingerprint)
+    store.get()
+
+    store.check()
+    _wait_idle(store)
+    assert build.call_count == 1
+
+    fingerprint.return_value = (11, 21, None)
+    store.check()
+    _wait_idle(store)
+    assert build.call_count == 2
+    assert store.snapshot.fingerprint == (11, 21, None)
+
+def test_expired_snapshot_is_rebuilt(monkeypatch):
+    build = MagicMock(return_value={})
+    store = SnapshotStore(build=build, fingerprint=lambda: (1,))
+    store.get()
+
+    monkeypatch.setattr(Config, "RECO_SNAPSHOT_REFRESH_SECONDS", 0)
+    assert store.is_stale()
+    store.get()
+    _wait_idle(store)
+    assert build.call_count == 2
+
+def test_failed_rebuild_keeps_previous_snapshot():
+    build = MagicMock(side_effect=[{"n": 1}, RuntimeError("db down")])
+    store = SnapshotStore(build=build, fingerprint=lambda: (1,))
+    store.get()
+    store.mark_stale()
+
+    snapshot = store.refresh()
+
+    assert snapshot.data == {"n": 1}
+    assert store.is_stale()
+
+def test_neighbor_index_is_built_once_per_fingerprint(tmp_path, monkeypatch):
+    """El índice en disco se genera una vez; después solo se abre"""
+    from models.basket_engine import BasketMatrix, pair_statistics
+    from models.recommendation import RecommendationSystem
+    from services.recommendation_snapshot import ensure_neighbor_index
+
+    stats = pair_statistics(BasketMatrix.from_rows([1, 1, 2, 2], [1, 2, 1, 3]))
+    get_stats = MagicMock(return_value=stats)
+    monkeypatch.setattr(RecommendationSystem, "get_pair_statistics", get_stats)
+    path = str(tmp_path / "neighbors.bin")
+
+    index = ensure_neighbor_index((5, 8, None), path)
+    assert ensure_neighbor_index((5, 8, None), path) is index
+    assert get_stats.call_count == 1
+    assert index.neighbors_of(2)[0]["id"] == 1
+
+    ensure_neighbor_index((6, 9, None), path)
+    assert get_stats.call_count == 2
+
+def test_catalog_change_does_not_rebuild_neighbor_index(tmp_path, monkeypatch):
+    """El índice de vecinos depende solo de la versión de ventas de la huella"""
+    from models.basket_engine import BasketMatrix, pair_statistics
+    from models.recommendation import RecommendationSystem
+    from services.recommendation_snapshot import ensure_neighbor_index
+
+    stats = pair_statistics(BasketMatrix.from_rows([1, 1], [1, 2]))
+    get_stats = MagicMock(return_value=stats)
+    monkeypatch.setattr(RecommendationSystem, "get_pair_statistics", get_stats)
+    path = str(tmp_path / "neighbors.bin")
+
+    ensure_neighbor_index((3, 1), path)
+    ensure_neighbor_index((3, 2), path)
+
+    assert get_stats.call_count == 1
+
+def test_services_mark_stale_only_after_commit(monkeypatch):
+    """Las escrituras avisan a la instantánea tras el commit, no dentro de la transacción"""
+    import services.sale_detail_service as sale_detail_service
+    from services.recommendation_snapshot import mark_stale
+
+    deferred = []
+    monkeypatch.setattr(sale_detail_service, "run_after_commit", deferred.append)
+    monkeypatch.setattr(sale_detail_service.SaleDetail, "delete", MagicMock(return_value=True))
+
+    sale_detail_service.delete_sale_detail(7)
+
+    assert deferred == [mark_stale]
@@ -0,0 +1,154 @@
+from datetime import date
+from unittest.mock import MagicMock
+from services.report_service import get_sales_by_category, get_sales_metrics, get_sales_trend, get_top_products
+from database.rollups import (
+    create_rollup_schema, create_sale_totals, REBUILD_SQL, SALE_TOTALS_SQL, BACKFILL_SALE_TOTALS_SQL
+)
+
+def test_metrics_read_daily_rollup(mock_db_connect):
+    """Las métricas salen del resumen diario con filtro por día inclusivo"""
+    _, _, cur = mock_db_connect
+    cur.fetchone.return_value = (1500.0, 3, 500.0, 7)
+
+    result = get_sales_metrics("2025-01-01", "2025-01-31T18:00:00")
+
+    query, params = cur.execute.call_args[0]
+    assert "FROM sales_daily" in query
+    assert "sale_details" not in query
+    assert params == [date(2025, 1, 1), date(2025, 1, 31)]
+    assert result == {
+        "total_ventas": 1500.0,
+        "total_transacciones": 3,
+        "ticket_promedio": 500.0,
+        "total_productos": 7
+    }
+
+def test_trend_and_top_products_use_rollups(mock_db_connect):
+    """Tendencia y top de productos no reagregan sales/sale_details"""
+    _, _, cur = mock_db_connect
+    cur.fetchall.return_value = [(date(2025, 1, 2), 250.0, 2)]
+
+    trend = get_sales_trend("2025-01-01", "2025-01-31")
+    query, _ = cur.execute.call_args[0]
+    assert "FROM sales_daily" in query
+    assert trend == [{"fecha": "2025-01-02", "ventas": 250.0, "cantidad": 2}]
+
+    cur.fetchall.return_value = [("Laptop", 15999.99, 4)]
+    get_top_products(3)
+    query, params = cur.execute.call_args[0]
+    assert "sales_total_product" in query
+    assert "sales_daily_product" not in query and "sale_details" not in query
+    assert params == (3,)
+
+def test_categories_read_all_time_totals(mock_db_connect):
+    """Las ventas por categoría leen los totales, no suman los días del historial"""
+    _, _, cur = mock_db_connect
+    cur.fetchall.return_value = [("Audio", 1200.0, 6), (None, 0, 0)]
+
+    result = get_sales_by_category()
+
+    query, _ = cur.execute.call_args[0]
+    assert "FROM sales_total_category" in query
+    assert "sales_daily_category" not in query
+    assert result[1] == {"nombre": "Sin categoría", "valor": 0.0, "cantidad": 0}
+
+def test_schema_backfills_only_empty_rollups():
+    """Al crear el esquema se recalcula solo si hay ventas sin resumen"""
+    cur = MagicMock()
+    # store_day_config() aún no existe; hay ventas y los resúmenes están vacíos
+    cur.fetchone.side_effect = [(False,), (True,)]
+    create_rollup_schema(cur)
+    assert REBUILD_SQL in [c[0][0] for c in cur.execute.call_args_list]
+
+    cur = MagicMock()
+    cur.fetchone.side_effect = [(False,), (False,)]
+    create_rollup_schema(cur)
+    assert REBUILD_SQL not in [c[0][0] for c in cur.execute.call_args_list]
+
+def test_schema_rebuilds_when_timezone_changes(monkeypatch):
+    """Un cambio de zona horaria redefine store_day y recalcula los días"""
+    from config import Config
+    monkeypatch.setattr(Config, "DB_TIMEZONE", "UTC")
+    monkeypatch.setattr(Config, "STORE_TIMEZONE", "America/Mexico_City")
+    cur = MagicMock()
+    cur.fetchone.side_effect = [(True,), ("UTC>UTC",)]
+
+    create_rollup_schema(cur)
+
+    statements = [c[0][0] for c in cur.execute.call_args_list]
+    assert any("'UTC>America/Mexico_City'" in sql for sql in statements)
+    assert not any("REINDEX" in sql for sql in statements)
+    assert REBUILD_SQL in statements
+
+def test_sale_totals_backfill_only_when_columns_are_new():
+    """item_count/units se calculan para el historial solo al agregarlas"""
+    cur = MagicMock()
+    cur.fetchone.return_value = (0,)
+    create_sale_totals(cur)
+    statements = [c[0][0] for c in cur.execute.call_args_list]
+    assert SALE_TOTALS_SQL in statements
+    assert statements[-1] == BACKFILL_SALE_TOTALS_SQL
+
+    cur = MagicMock()
+    cur.fetchone.return_value = (2,)
+    create_sale_totals(cur)
+    statements = [c[0][0] for c in cur.execute.call_args_list]
+    assert BACKFILL_SALE_TOTALS_SQL not in statements
+
+def test_dashboard_runs_queries_concurrently(monkeypatch):
+    """Las cuatro consultas corren a la vez: la barrera solo se libera si coinciden"""
+    import threading
+    import services.report_service as report_service
+
+    barrier = threading.Barrier(4, timeout=5)
+
+    def section(value):
+        def run(*args):
+            barrier.wait()
+            return value
+        return run
+
+    monkeypatch.setattr(report_service, "get_sales_metrics", section({"total_ventas": 1.0}))
+    monkeypatch.setattr(report_service, "get_sales_trend", section([]))
+    monkeypatch.setattr(report_service, "get_sales_by_category", section([{"nombre": "Audio"}]))
+    monkeypatch.setattr(report_service, "get_top_products", section([]))
+
+    result = report_service.get_dashboard("2025-01-01", "2025-01-31", 3)
+
+    assert result == {
+        "metrics": {"total_ventas": 1.0},
+        "trend": [],
+        "categories": [{"nombre": "Audio"}],
+        "top_products": []
+    }
+
+def test_dashboard_workers_leave_a_pool_connection(monkeypatch):
+    """Los hilos del dashboard nunca toman todas las conexiones del pool"""
+    from config import Config
+    from services.report_service import dashboard_workers
+
+    monkeypatch.setattr(Config, "REPORTS_DASHBOARD_WORKERS", 4)
+    monkeypatch.setattr(Config, "DB_POOL_MAX_SIZE", 3)
+    assert dashboard_workers() == 2
+
+    monkeypatch.setattr(Config, "DB_POOL_MAX_SIZE", 1)
+    assert dashboard_workers() == 1
+
+    monkeypatch.setattr(Config, "DB_POOL_MAX_SIZE", 10)
+    assert dashboard_workers() == 4
+
+def test_data_versions_bump_once_per_transaction_at_commit():
+    """Las versiones se suben con triggers diferidos, no por sentencia durante la venta"""
+    from database.rollups import DATA_VERSIONS, create_data_versions
+
+    cur = MagicMock()
+    create_data_versions(cur)
+
+    statements = [c[0][0] for c in cur.execute.call_args_list]
+    assert any("set_config(v_flag, 'on', true)" in sql for sql in statements)
+    triggers = statements[1:]
+    assert len(triggers) == sum(len(tables) for tables in DATA_VERSIONS.values())
+    for sql in triggers:
+        assert "CREATE CONSTRAINT TRIGGER" in sql and "DEFERRABLE INITIALLY DEFERRED" in sql
+        assert "FOR EACH STATEMENT" not in sql.split("AFTER TRUNCATE")[0]
+    assert any("ON sale_details" in sql and "data_version_trg('forecast')" in sql for sql in triggers)
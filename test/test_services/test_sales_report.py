@@ -0,0 +1,79 @@
+from datetime import datetime
+import pytest
+from services.sale_service import get_sales_with_details, get_sales_by_filters
+
+def _report_rows(count):
+    return [
+        (i // 3 + 1, i % 5 + 1, f"Producto {i}", 2, 10.0, 20.0,
+         datetime(2025, 1, 1, 10, 0), 1, "Carlos Mendoza", "Tarjeta")
+        for i in range(count)
+    ]
+
+def test_sales_report_query_count_is_constant(mock_db_connect):
+    """El reporte usa una sola consulta sin importar cuántas filas devuelve"""
+    for count in (3, 300):
+        mock_connect, _, cur = mock_db_connect
+        cur.execute.reset_mock()
+        cur.fetchall.return_value = _report_rows(count)
+
+        result = get_sales_with_details()
+
+        assert len(result) == count
+        assert cur.execute.call_count == 1
+    assert mock_connect.call_count == 1
+
+def test_sales_report_row_format(mock_db_connect):
+    """Cada fila incluye producto y vendedor resueltos por el JOIN"""
+    _, _, cur = mock_db_connect
+    cur.fetchall.return_value = _report_rows(1)
+
+    row = get_sales_with_details()[0]
+
+    assert row["product_name"] == "Producto 0"
+    assert row["seller_name"] == "Carlos Mendoza"
+    assert row["total"] == 20.0
+    assert row["date"] == "2025-01-01T10:00:00"
+
+    assert row["payment_method"] == "Tarjeta"
+
+def test_sales_filters_are_pushed_to_sql(mock_db_connect):
+    """Los filtros se traducen a un WHERE parametrizado con rango semiabierto"""
+    _, _, cur = mock_db_connect
+    cur.fetchall.return_value = []
+
+    get_sales_by_filters("2025-01-01", "2025-01-01", "Tarjeta", seller_id=3)
+
+    query, params = cur.execute.call_args[0]
+    assert "s.date >= %s AND s.date < %s" in query
+    assert "s.user_id = %s" in query
+    assert "s.payment_method = %s" in query
+    assert params == [datetime(2025, 1, 1), datetime(2025, 1, 2), 3, "Tarjeta"]
+
+def test_sales_filters_all_payment_methods(mock_db_connect):
+    """payment_method='all' no agrega condición"""
+    _, _, cur = mock_db_connect
+    cur.fetchall.return_value = []
+
+    get_sales_by_filters(payment_method="all")
+
+    query, params = cur.execute.call_args[0]
+    assert "WHERE" not in query
+    assert params == []
+
+def test_sales_filters_invalid_date():
+    """Una fecha inválida se reporta como ValueError"""
+    with pytest.raises(ValueError):
+        get_sales_by_filters(start_date="01/01/2025")
+
+def test_sales_filters_use_store_timezone(mock_db_connect, monkeypatch):
+    """Los días del filtro son días de la tienda, convertidos a la zona de la BD"""
+    from config import Config
+    monkeypatch.setattr(Config, "STORE_TIMEZONE", "America/Mexico_City")
+    monkeypatch.setattr(Config, "DB_TIMEZONE", "UTC")
+    _, _, cur = mock_db_connect
+    cur.fetchall.return_value = []
+
+    get_sales_by_filters("2025-01-01", "2025-01-01")
+
+    _, params = cur.execute.call_args[0]
+    assert params == [datetime(2025, 1, 1, 6, 0), datetime(2025, 1, 2, 6, 0)]
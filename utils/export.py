@@ -0,0 +1,67 @@
+import csv
+import io
+import json
+from flask import Response
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson"
+}
+
+EXPORT_PARAMS = {
+    "format": "Formato de salida: csv (por defecto) o ndjson"
+}
+
+def get_export_format(args):
+    """
+    Lee ?format= de la request.
+    Lanza ValueError si el formato no está soportado.
+    """
+    fmt = (args.get("format") or "csv").lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Formato no soportado, use: {', '.join(EXPORT_FORMATS)}")
+    return fmt
+
+def _csv_chunks(batches, columns):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+
+    def drain():
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return chunk
+
+    # El encabezado sale antes de la primera lectura: primer byte inmediato
+    writer.writeheader()
+    yield drain()
+    for batch in batches:
+        writer.writerows(batch)
+        yield drain()
+
+def _ndjson_chunks(batches):
+    for batch in batches:
+        yield "".join(
+            json.dumps(item, ensure_ascii=False, default=str) + "\n"
+            for item in batch
+        )
+
+def export_chunks(batches, fmt, columns):
+    """
+    Convierte lotes de dicts en fragmentos CSV o NDJSON (uno por lote).
+    Nunca se materializa el resultado completo.
+    """
+    if fmt == "csv":
+        return _csv_chunks(batches, columns)
+    return _ndjson_chunks(batches)
+
+def export_response(chunks, fmt, filename):
+    """Respuesta en streaming para descargar la exportación"""
+    return Response(
+        chunks,
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{fmt}"',
+            "X-Accel-Buffering": "no"
+        }
+    )
@@ -0,0 +1,60 @@
+from flask import request
+from flask_restx import fields, marshal
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+PAGE_PARAMS = {
+    "after": "Cursor: devolver registros con ID mayor a este valor",
+    "limit": f"Tamaño de página (máximo {MAX_PAGE_SIZE})"
+}
+
+def get_page_args():
+    """
+    Lee ?after=<id>&limit=N de la request.
+    Devuelve (None, None) si no se pidió paginación (respuesta completa).
+    Lanza ValueError si los parámetros no son enteros válidos.
+    """
+    if "after" not in request.args and "limit" not in request.args:
+        return None, None
+
+    after = request.args.get("after", type=int)
+    limit = request.args.get("limit", DEFAULT_PAGE_SIZE, type=int)
+    if ("after" in request.args and after is None) or limit is None:
+        raise ValueError("after y limit deben ser enteros")
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise ValueError(f"limit debe estar entre 1 y {MAX_PAGE_SIZE}")
+    return after, limit
+
+def page_model(api, name, item_model):
+    """Modelo Swagger para una página keyset"""
+    return api.model(name, {
+        "items": fields.List(fields.Nested(item_model)),
+        "next_cursor": fields.Integer(description="Valor para ?after= de la siguiente página (null si no hay más)")
+    })
+
+def build_page(rows, limit, key):
+    """
+    Arma la respuesta a partir de hasta limit + 1 filas leídas en orden de ID.
+    La fila extra solo indica que existe otra página.
+    """
+    has_more = len(rows) > limit
+    items = rows[:limit]
+    return {
+        "items": items,
+        "next_cursor": key(items[-1]) if has_more and items else None
+    }
+
+def list_response(api, fetch, item_model, page_model, key):
+    """
+    Respuesta de un endpoint de listado con paginación keyset opcional.
+    fetch(after, limit) debe devolver filas ordenadas por ID ascendente.
+    """
+    try:
+        after, limit = get_page_args()
+    except ValueError as e:
+        api.abort(400, str(e))
+
+    if limit is None:
+        return marshal(fetch(), item_model)
+    return marshal(build_page(fetch(after, limit + 1), limit, key), page_model)
\ No newline at end of file
@@ -0,0 +1,18 @@
+class ProductIndex:
+    """
+    Índice en memoria de productos (dicts) por id.
+    Se arma una vez en O(n); cada búsqueda es O(1) sin importar el tamaño del catálogo.
+    """
+
+    def __init__(self, products, id_key="id"):
+        self.by_id = {product[id_key]: product for product in products}
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __contains__(self, product_id):
+        return product_id in self.by_id
+
+    def get(self, product_id):
+        """Producto por id, o None"""
+        return self.by_id.get(product_id)
@@ -0,0 +1,48 @@
+"""
+Fechas en la zona horaria de la tienda.
+
+Las columnas TIMESTAMP (sin zona) guardan la hora en Config.DB_TIMEZONE;
+los reportes agrupan por día en Config.STORE_TIMEZONE. Los filtros se
+traducen a rangos semiabiertos sobre la columna cruda
+(`inicio <= date < fin`) para que PostgreSQL use idx_sales_date.
+"""
+import re
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+from config import Config
+
+_TZ_NAME = re.compile(r"^[A-Za-z0-9_+\-/]+$")
+
+def validate_timezone(name):
+    """Devuelve el nombre si es una zona IANA válida; ValueError si no"""
+    if not name or not _TZ_NAME.match(name):
+        raise ValueError(f"Zona horaria inválida: {name!r}")
+    ZoneInfo(name)
+    return name
+
+def store_tz():
+    return ZoneInfo(Config.STORE_TIMEZONE)
+
+def db_tz():
+    return ZoneInfo(Config.DB_TIMEZONE)
+
+def store_now():
+    """Hora actual en la tienda (sin tzinfo)"""
+    return datetime.now(store_tz()).replace(tzinfo=None)
+
+def store_today():
+    return store_now().date()
+
+def to_db_timestamp(value):
+    """Hora de la tienda (o datetime con zona) → valor comparable con sales.date"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=store_tz())
+    return value.astimezone(db_tz()).replace(tzinfo=None)
+
+def day_start(day):
+    """Inicio del día `day` de la tienda, como timestamp de la BD"""
+    return to_db_timestamp(datetime.combine(day, time.min))
+
+def days_ago_start(days):
+    """Inicio del día de hace `days` días (para ventanas tipo 'últimos N días')"""
+    return day_start(store_today() - timedelta(days=days))